@@ -0,0 +1,404 @@
+import json
+
+import pandas as pd
+
+from buku_besar import BukuBesar, arah_saldo, neraca_saldo_dari_bukubesar, posting_jurnal
+from klasifikasi_akun import klasifikasi_neraca
+from periode import IndeksTanggal, potong_periode
+from uang import ke_rupiah
+
+# === Inti akuntansi BUMDes (tanpa UI) ===
+# Semua perhitungan laporan bekerja di DataFrame biasa: tidak ada import streamlit /
+# st_aggrid / session_state, jadi bisa dipakai dari aplikasi, batch job maupun benchmark.
+# Builder PDF (fpdf) baru di-import saat dibutuhkan supaya import modul ini tetap ringan.
+
+
+def terisi(df, kolom):
+    # Baris yang kolom namanya tidak kosong
+    return df[df[kolom].astype(str).str.strip() != ""]
+
+
+def signature_buku_besar(bb: dict) -> str:
+    # Buat tanda tangan sederhana untuk deteksi perubahan.
+    # BukuBesar menyimpan versi & total berjalan sejak posting, jadi cukup dibaca saja.
+    if isinstance(bb, BukuBesar):
+        return repr(bb.signature())
+    items = []
+    for ref, data in (bb or {}).items():
+        items.append({
+            "ref": str(ref),
+            "nama": data.get("nama_akun", ""),
+            "debit": ke_rupiah(data.get("debit", 0)),
+            "kredit": ke_rupiah(data.get("kredit", 0)),
+        })
+    items.sort(key=lambda x: x["ref"])
+    return json.dumps(items, sort_keys=True)
+
+
+# === Jurnal Umum ===
+def jurnal_final(df_periode):
+    # Jurnal periode yang berketerangan + baris TOTAL (None kalau kosong)
+    df_clean = terisi(df_periode, "Keterangan").drop(columns=["id"], errors="ignore")
+    if df_clean.empty:
+        return None
+    total_row = pd.DataFrame({
+        "Tanggal": [""],
+        "Keterangan": ["TOTAL"],
+        "Ref": [""],
+        "Akun": [""],
+        "Debit (Rp)": [df_clean["Debit (Rp)"].sum()],
+        "Kredit (Rp)": [df_clean["Kredit (Rp)"].sum()],
+    })
+    return pd.concat([df_clean, total_row], ignore_index=True)
+
+
+# === Neraca Saldo ===
+def neraca_saldo_final(neraca_saldo):
+    # Neraca Saldo terisi + baris Jumlah, bernomor mulai 1 (None kalau kosong)
+    df_clean = terisi(neraca_saldo, "Akun")
+    if df_clean.empty:
+        return None
+    total_row = pd.DataFrame({
+        "Ref": [""],
+        "Akun": ["Jumlah"],
+        "Debit (Rp)": [df_clean["Debit (Rp)"].sum()],
+        "Kredit (Rp)": [df_clean["Kredit (Rp)"].sum()],
+    })
+    df_final = pd.concat([df_clean, total_row], ignore_index=True)
+    df_final.index = range(1, len(df_final) + 1)
+    df_final.index.name = "No"
+    return df_final
+
+
+# === Laba/Rugi ===
+def laba_rugi(pendapatan, beban):
+    # (tabel laporan laba/rugi, laba bersih); pendapatan = kredit − debit, beban = debit − kredit
+    df_pendapatan_clean = terisi(pendapatan, "Jenis Pendapatan")
+    df_beban_clean = terisi(beban, "Jenis Beban")
+
+    total_pendapatan_debit = df_pendapatan_clean["Debit (Rp)"].sum() if not df_pendapatan_clean.empty else 0
+    total_pendapatan_kredit = df_pendapatan_clean["Kredit (Rp)"].sum() if not df_pendapatan_clean.empty else 0
+    total_pendapatan = total_pendapatan_kredit - total_pendapatan_debit
+
+    total_beban_debit = df_beban_clean["Debit (Rp)"].sum() if not df_beban_clean.empty else 0
+    total_beban_kredit = df_beban_clean["Kredit (Rp)"].sum() if not df_beban_clean.empty else 0
+    total_beban = total_beban_debit - total_beban_kredit
+
+    laba_bersih = total_pendapatan - total_beban
+
+    result_data = []
+    result_data.append({"Keterangan": "Pendapatan:", "Debit": "", "Kredit": ""})
+
+    for idx, row in df_pendapatan_clean.iterrows():
+        debit_val = row["Debit (Rp)"] if row["Debit (Rp)"] != 0 else ""
+        kredit_val = row["Kredit (Rp)"] if row["Kredit (Rp)"] != 0 else ""
+        result_data.append({
+            "Keterangan": f"  {idx+1}. {row['Jenis Pendapatan']}",
+            "Debit": debit_val,
+            "Kredit": kredit_val
+        })
+
+    result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
+    if total_pendapatan >= 0:
+        result_data.append({"Keterangan": "Total Pendapatan", "Debit": "", "Kredit": total_pendapatan})
+    else:
+        result_data.append({"Keterangan": "Total Pendapatan", "Debit": abs(total_pendapatan), "Kredit": ""})
+
+    result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
+    result_data.append({"Keterangan": "Beban-Beban:", "Debit": "", "Kredit": ""})
+
+    for idx, row in df_beban_clean.iterrows():
+        debit_val = row["Debit (Rp)"] if row["Debit (Rp)"] != 0 else ""
+        kredit_val = row["Kredit (Rp)"] if row["Kredit (Rp)"] != 0 else ""
+        result_data.append({
+            "Keterangan": f"  {idx+1}. {row['Jenis Beban']}",
+            "Debit": debit_val,
+            "Kredit": kredit_val
+        })
+
+    result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
+    if total_beban >= 0:
+        result_data.append({"Keterangan": "Total Beban", "Debit": total_beban, "Kredit": ""})
+    else:
+        result_data.append({"Keterangan": "Total Beban", "Debit": "", "Kredit": abs(total_beban)})
+
+    result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
+
+    if laba_bersih >= 0:
+        result_data.append({"Keterangan": "Laba Bersih", "Debit": "", "Kredit": laba_bersih})
+    else:
+        result_data.append({"Keterangan": "Rugi Bersih", "Debit": abs(laba_bersih), "Kredit": ""})
+
+    return pd.DataFrame(result_data), laba_bersih
+
+
+# === Neraca (laporan posisi keuangan) ===
+def neraca_laporan(aktiva_lancar, aktiva_tetap, kewajiban, modal_awal, laba_bersih):
+    # Tabel neraca dua sisi (Aktiva | Passiva); modal akhir = modal awal + laba bersih
+    df_aktiva_lancar_clean = terisi(aktiva_lancar, "Item")
+    df_aktiva_tetap_clean = terisi(aktiva_tetap, "Item")
+    df_kewajiban_clean = terisi(kewajiban, "Item")
+
+    total_aktiva_lancar = df_aktiva_lancar_clean["Jumlah (Rp)"].sum() if not df_aktiva_lancar_clean.empty else 0
+    total_aktiva_tetap = df_aktiva_tetap_clean["Jumlah (Rp)"].sum() if not df_aktiva_tetap_clean.empty else 0
+    total_aktiva = total_aktiva_lancar + total_aktiva_tetap
+
+    total_kewajiban = df_kewajiban_clean["Jumlah (Rp)"].sum() if not df_kewajiban_clean.empty else 0
+
+    modal_akhir = modal_awal + laba_bersih
+    total_passiva = total_kewajiban + modal_akhir
+
+    total_aktiva = ke_rupiah(total_aktiva)
+    total_passiva = ke_rupiah(total_passiva)
+
+    neraca_data = []
+    neraca_data.append({"Aktiva": "Aktiva", "Jumlah1": "", "Passiva": "Passiva", "Jumlah2": ""})
+    neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "", "Jumlah2": ""})
+    neraca_data.append({"Aktiva": "Aktiva Lancar:", "Jumlah1": "", "Passiva": "Kewajiban:", "Jumlah2": ""})
+
+    max_rows = max(len(df_aktiva_lancar_clean), len(df_kewajiban_clean))
+    for i in range(max_rows):
+        aktiva_item = df_aktiva_lancar_clean.iloc[i]["Item"] if i < len(df_aktiva_lancar_clean) else ""
+        aktiva_val = df_aktiva_lancar_clean.iloc[i]["Jumlah (Rp)"] if i < len(df_aktiva_lancar_clean) else ""
+        kewajiban_item = df_kewajiban_clean.iloc[i]["Item"] if i < len(df_kewajiban_clean) else ""
+        kewajiban_val = df_kewajiban_clean.iloc[i]["Jumlah (Rp)"] if i < len(df_kewajiban_clean) else ""
+
+        neraca_data.append({
+            "Aktiva": f"  {aktiva_item}",
+            "Jumlah1": aktiva_val,
+            "Passiva": f"  {kewajiban_item}",
+            "Jumlah2": kewajiban_val
+        })
+
+    neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "", "Jumlah2": ""})
+    neraca_data.append({"Aktiva": "Jml aktiva lancar", "Jumlah1": total_aktiva_lancar, "Passiva": "Ekuitas:", "Jumlah2": ""})
+    neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "  Modal", "Jumlah2": modal_awal})
+    neraca_data.append({"Aktiva": "Aktiva Tetap:", "Jumlah1": "", "Passiva": "  Laba", "Jumlah2": laba_bersih})
+
+    for idx, row in df_aktiva_tetap_clean.iterrows():
+        neraca_data.append({
+            "Aktiva": f"  {row['Item']}",
+            "Jumlah1": row["Jumlah (Rp)"],
+            "Passiva": "",
+            "Jumlah2": ""
+        })
+
+    neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "", "Jumlah2": ""})
+    neraca_data.append({"Aktiva": "Jml Aktiva", "Jumlah1": total_aktiva, "Passiva": "Jml Kewajiban & Ekuitas", "Jumlah2": total_passiva})
+
+    return pd.DataFrame(neraca_data)
+
+
+# === Arus Kas ===
+def arus_kas(operasi, investasi, pendanaan):
+    # Tabel arus kas tiga aktivitas (None kalau ketiganya kosong)
+    df_op = terisi(operasi, "Aktivitas")
+    df_inv = terisi(investasi, "Aktivitas")
+    df_pend = terisi(pendanaan, "Aktivitas")
+    if df_op.empty and df_inv.empty and df_pend.empty:
+        return None
+
+    arus_data = []
+    arus_data.append({"Aktivitas": "Arus Kas Operasi:", "Jumlah": ""})
+    for _, r in df_op.iterrows():
+        arus_data.append({"Aktivitas": f"  {r['Aktivitas']}", "Jumlah": r["Jumlah (Rp)"]})
+    arus_data.append({"Aktivitas": "", "Jumlah": ""})
+    arus_data.append({"Aktivitas": "Arus Kas Investasi:", "Jumlah": ""})
+    for _, r in df_inv.iterrows():
+        arus_data.append({"Aktivitas": f"  {r['Aktivitas']}", "Jumlah": r["Jumlah (Rp)"]})
+    arus_data.append({"Aktivitas": "", "Jumlah": ""})
+    arus_data.append({"Aktivitas": "Arus Kas Pendanaan:", "Jumlah": ""})
+    for _, r in df_pend.iterrows():
+        arus_data.append({"Aktivitas": f"  {r['Aktivitas']}", "Jumlah": r["Jumlah (Rp)"]})
+    return pd.DataFrame(arus_data)
+
+
+# === Pipeline lengkap satu periode ===
+def laporan_keuangan(neraca_saldo):
+    # Neraca Saldo → tabel input laporan (hasil klasifikasi) + ketiga laporan jadi
+    tabel = klasifikasi_neraca(neraca_saldo)
+    df_labarugi, laba_bersih = laba_rugi(tabel["pendapatan"], tabel["beban"])
+    return {
+        **tabel,
+        "laba_rugi": df_labarugi,
+        "laba_bersih": laba_bersih,
+        "neraca": neraca_laporan(
+            tabel["aktiva_lancar"], tabel["aktiva_tetap"], tabel["kewajiban"],
+            tabel["modal_data"]["modal_awal"], laba_bersih,
+        ),
+        "arus_kas": arus_kas(tabel["arus_kas_operasi"], tabel["arus_kas_investasi"], tabel["arus_kas_pendanaan"]),
+    }
+
+
+def proses_periode(jurnal, bulan, tahun, indeks=None, saldo_normal=None):
+    # Jurnal (boleh berisi banyak periode) → semua hasil akuntansi untuk satu bulan;
+    # saldo_normal {Ref: "debit"/"kredit"} dari bagan akun menentukan arah saldo berjalan
+    df_periode = potong_periode(jurnal, indeks or IndeksTanggal(jurnal), bulan, tahun)
+    bb = posting_jurnal(df_periode, saldo_normal)
+    neraca_saldo = neraca_saldo_dari_bukubesar(bb)
+    return {
+        "jurnal": jurnal_final(df_periode),
+        "buku_besar": bb,
+        "neraca_saldo": neraca_saldo_final(neraca_saldo),
+        **laporan_keuangan(neraca_saldo),
+    }
+
+
+# === Laporan komparatif (beberapa periode berdampingan) ===
+# Dibaca dari kubus mutasi periode × akun (JurnalStore.kubus), bukan dari jurnal: tiap
+# kolom periode cukup beberapa baris agregat per akun, berapa pun jumlah barisnya.
+# Setiap periode tetap melewati klasifikasi yang sama dengan laporan satu periode.
+
+# Susunan baris: (label, None) = judul bagian, ("pos", kunci) = rincian per akun,
+# (label, kunci) = baris jumlah
+SUSUNAN_KOMPARATIF = {
+    "laba_rugi": [
+        ("Pendapatan:", None), ("pos", "pendapatan"), ("Total Pendapatan", "pendapatan"),
+        ("Beban-Beban:", None), ("pos", "beban"), ("Total Beban", "beban"),
+        ("Laba (Rugi) Bersih", "laba_bersih"),
+    ],
+    "neraca": [
+        ("Aktiva Lancar:", None), ("pos", "aktiva_lancar"), ("Jml aktiva lancar", "aktiva_lancar"),
+        ("Aktiva Tetap:", None), ("pos", "aktiva_tetap"), ("Jml aktiva tetap", "aktiva_tetap"),
+        ("Jml Aktiva", "aktiva"),
+        ("Kewajiban:", None), ("pos", "kewajiban"), ("Jml Kewajiban", "kewajiban"),
+        ("Ekuitas:", None), ("  Modal", "modal_awal"), ("  Laba", "laba_bersih"),
+        ("Jml Kewajiban & Ekuitas", "passiva"),
+    ],
+    "arus_kas": [
+        ("Arus Kas Operasi:", None), ("pos", "arus_kas_operasi"), ("Jml Arus Kas Operasi", "arus_kas_operasi"),
+        ("Arus Kas Investasi:", None), ("pos", "arus_kas_investasi"), ("Jml Arus Kas Investasi", "arus_kas_investasi"),
+        ("Arus Kas Pendanaan:", None), ("pos", "arus_kas_pendanaan"), ("Jml Arus Kas Pendanaan", "arus_kas_pendanaan"),
+        ("Kenaikan (Penurunan) Kas Bersih", "kas_bersih"),
+    ],
+}
+
+
+def daftar_periode(bulan, tahun, jumlah, langkah="bulan"):
+    # Periode "YYYY-MM" berurutan yang berakhir di bulan/tahun terpilih;
+    # langkah "bulan" = bulan ke bulan (MoM), "tahun" = bulan yang sama tiap tahun (YoY)
+    akhir = pd.Period(year=int(tahun), month=int(bulan), freq="M")
+    geser = 12 if langkah == "tahun" else 1
+    return [str(akhir - geser * i) for i in reversed(range(int(jumlah)))]
+
+
+def neraca_saldo_kubus(kubus, periode):
+    # Baris kubus satu periode → Neraca Saldo (Ref, Akun, Debit, Kredit); akun dengan
+    # Ref sama digabung seperti buku besar (kunci Ref, atau nama akun kalau Ref kosong)
+    df = kubus[kubus["periode"] == str(periode)]
+    ref = df["Ref"].fillna("").astype(str).str.strip()
+    nama = df["Akun"].fillna("").astype(str).str.strip()
+    grup = pd.DataFrame({
+        "kunci": ref.where(ref != "", nama), "Ref": ref, "Akun": nama,
+        "Debit (Rp)": df["Debit (Rp)"], "Kredit (Rp)": df["Kredit (Rp)"],
+    }).groupby("kunci", sort=False)
+    return pd.DataFrame({
+        "Ref": grup["Ref"].first(), "Akun": grup["Akun"].first(),
+        "Debit (Rp)": grup["Debit (Rp)"].sum(), "Kredit (Rp)": grup["Kredit (Rp)"].sum(),
+    }).reset_index(drop=True)
+
+
+def _per_nama(nama, nilai):
+    # {nama pos: jumlah}, urutan kemunculan dipertahankan
+    if not len(nama):
+        return {}
+    jumlah = pd.Series(ke_rupiah(pd.Series(list(nilai))).to_numpy(), index=list(nama)).groupby(level=0, sort=False).sum()
+    return {str(k): int(v) for k, v in jumlah.items()}
+
+
+def pos_laporan(neraca_saldo):
+    # Neraca Saldo satu periode → ({bagian: {pos: nilai}}, {kunci jumlah: nilai})
+    tabel = klasifikasi_neraca(neraca_saldo)
+    pend = terisi(tabel["pendapatan"], "Jenis Pendapatan")
+    beban = terisi(tabel["beban"], "Jenis Beban")
+    pos = {
+        "pendapatan": _per_nama(pend["Jenis Pendapatan"], pend["Kredit (Rp)"] - pend["Debit (Rp)"]),
+        "beban": _per_nama(beban["Jenis Beban"], beban["Debit (Rp)"] - beban["Kredit (Rp)"]),
+    }
+    for bagian, kolom in (("aktiva_lancar", "Item"), ("aktiva_tetap", "Item"), ("kewajiban", "Item"),
+                          ("arus_kas_operasi", "Aktivitas"), ("arus_kas_investasi", "Aktivitas"),
+                          ("arus_kas_pendanaan", "Aktivitas")):
+        df = terisi(tabel[bagian], kolom)
+        pos[bagian] = _per_nama(df[kolom], df["Jumlah (Rp)"])
+    jumlah = {bagian: sum(isi.values()) for bagian, isi in pos.items()}
+    modal_awal = int(tabel["modal_data"]["modal_awal"])
+    laba_bersih = jumlah["pendapatan"] - jumlah["beban"]
+    jumlah.update(
+        laba_bersih=laba_bersih,
+        modal_awal=modal_awal,
+        aktiva=jumlah["aktiva_lancar"] + jumlah["aktiva_tetap"],
+        passiva=jumlah["kewajiban"] + modal_awal + laba_bersih,
+        kas_bersih=jumlah["arus_kas_operasi"] + jumlah["arus_kas_investasi"] + jumlah["arus_kas_pendanaan"],
+    )
+    return pos, jumlah
+
+
+def laporan_komparatif(kubus, periode):
+    # Kubus + daftar periode → {"laba_rugi" | "neraca" | "arus_kas": tabel}; kolom
+    # "Keterangan" lalu satu kolom per periode ("YYYY-MM"), pos yang tidak ada = 0
+    periode = [str(p) for p in periode]
+    per_periode = [pos_laporan(neraca_saldo_kubus(kubus, p)) for p in periode]
+    hasil = {}
+    for laporan, susunan in SUSUNAN_KOMPARATIF.items():
+        baris = []
+        for label, kunci in susunan:
+            if label == "pos":
+                nama_pos = dict.fromkeys(n for pos, _ in per_periode for n in pos[kunci])
+                baris += [{"Keterangan": f"  {n}", **{p: pos[kunci].get(n, 0) for p, (pos, _) in zip(periode, per_periode)}}
+                          for n in nama_pos]
+            elif kunci is None:
+                baris.append({"Keterangan": label, **dict.fromkeys(periode, "")})
+            else:
+                baris.append({"Keterangan": label, **{p: jumlah[kunci] for p, (_, jumlah) in zip(periode, per_periode)}})
+        hasil[laporan] = pd.DataFrame(baris, columns=["Keterangan"] + periode)
+    return hasil
+
+
+# === Saldo akun: saldo awal (tutup buku) + mutasi bulan berjalan ===
+def periode_sebelumnya(periode):
+    return str(pd.Period(str(periode), freq="M") - 1)
+
+
+def saldo_berjalan(saldo_awal, mutasi, saldo_normal=None):
+    # Dua Neraca Saldo (kumulatif s.d. bulan lalu dan mutasi bulan ini, mis. dari
+    # neraca_saldo_kubus) → saldo awal, mutasi debit/kredit dan saldo akhir per akun.
+    # Saldo bertanda menurut saldo normal akun (kredit-normal: kredit − debit).
+    kolom = ["Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
+    awal = saldo_awal[kolom].assign(**{"Debit (Rp)": 0, "Kredit (Rp)": 0},
+                                    **{"Saldo Awal (Rp)": saldo_awal["Debit (Rp)"] - saldo_awal["Kredit (Rp)"]})
+    gabung = pd.concat([awal, mutasi[kolom].assign(**{"Saldo Awal (Rp)": 0})], ignore_index=True)
+    if gabung.empty:
+        return pd.DataFrame(columns=["Ref", "Akun", "Saldo Awal (Rp)", "Debit (Rp)", "Kredit (Rp)", "Saldo Akhir (Rp)"])
+    ref = gabung["Ref"].fillna("").astype(str).str.strip()
+    grup = gabung.groupby(ref.where(ref != "", gabung["Akun"].astype(str).str.strip()), sort=False)
+    hasil = pd.DataFrame({
+        "Ref": grup["Ref"].first(),
+        "Akun": grup["Akun"].first(),
+        "Saldo Awal (Rp)": grup["Saldo Awal (Rp)"].sum(),
+        "Debit (Rp)": grup["Debit (Rp)"].sum(),
+        "Kredit (Rp)": grup["Kredit (Rp)"].sum(),
+    })
+    arah = arah_saldo(hasil.index.tolist(), hasil["Akun"].tolist(), saldo_normal)
+    hasil["Saldo Awal (Rp)"] = ke_rupiah(hasil["Saldo Awal (Rp)"]) * arah
+    hasil["Saldo Akhir (Rp)"] = hasil["Saldo Awal (Rp)"] + arah * (ke_rupiah(hasil["Debit (Rp)"]) - ke_rupiah(hasil["Kredit (Rp)"]))
+    return hasil.reset_index(drop=True)
+
+
+def pdf_periode(hasil, bulan, tahun):
+    # Semua PDF laporan satu periode → {nama file: bytes}; laporan kosong dilewati.
+    # Buku besar (bisa sangat besar) berupa iterator potongan bytes yang baru dirender
+    # saat dibaca, supaya bisa langsung ditulis ke file tanpa menampung seluruh dokumen.
+    import laporan_pdf
+
+    pdf = {}
+    if hasil["jurnal"] is not None:
+        pdf[f"jurnal_umum_{bulan}_{tahun}.pdf"] = laporan_pdf.buat_pdf(hasil["jurnal"], bulan, tahun)
+    if hasil["buku_besar"]:
+        pdf[f"buku_besar_{bulan}_{tahun}.pdf"] = laporan_pdf.alirkan_pdf_buku_besar(hasil["buku_besar"])
+    if hasil["neraca_saldo"] is not None:
+        pdf[f"neraca_saldo_{bulan}_{tahun}.pdf"] = laporan_pdf.buat_pdf_neraca(hasil["neraca_saldo"], bulan, tahun)
+    pdf[f"laporan_labarugi_{bulan}_{tahun}.pdf"] = laporan_pdf.buat_pdf_labarugi(hasil["laba_rugi"], bulan, tahun)
+    pdf[f"laporan_neraca_{bulan}_{tahun}.pdf"] = laporan_pdf.buat_pdf_neraca_lap(hasil["neraca"], bulan, tahun)
+    if hasil["arus_kas"] is not None:
+        pdf[f"arus_kas_{bulan}_{tahun}.pdf"] = laporan_pdf.buat_pdf_ak(hasil["arus_kas"], bulan, tahun)
+    return pdf
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from klasifikasi_akun import kategori_akun
+
+# === Bagan Akun (Chart of Accounts) ===
+# Daftar akun resmi: Ref → nama, jenis dan saldo normal. Baris jurnal di database
+# hanya menyimpan akun_id; di memori kolom Ref/Akun berupa categorical, jadi teks
+# akun tidak diulang di setiap baris dan group-by cukup memakai kode integer.
+
+SALDO_NORMAL = {
+    "aktiva_lancar": "debit",
+    "aktiva_tetap": "debit",
+    "beban": "debit",
+    "kewajiban": "kredit",
+    "modal": "kredit",
+    "pendapatan": "kredit",
+}
+
+KOLOM_AKUN = ["id", "Ref", "Akun", "Jenis", "Saldo Normal"]
+
+
+def jenis_akun(ref, nama):
+    # Jenis & saldo normal awal untuk akun baru, pakai aturan yang sama dengan laporan
+    jenis = kategori_akun(pd.Series(list(nama), dtype=object), pd.Series(list(ref), dtype=object))
+    return jenis.tolist(), jenis.map(SALDO_NORMAL).fillna("debit").tolist()
+
+
+def kategorikan(df, kolom=("Ref", "Akun")):
+    # Kolom teks akun → categorical (satu salinan teks per akun, bukan per baris)
+    df = df.copy()
+    for col in kolom:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def tanpa_kategori(df):
+    # Untuk grid: AgGrid meng-cast balik ke dtype asal, dan categorical akan membuang
+    # nama akun baru yang diketik user, jadi kirim sebagai teks biasa
+    kolom = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    if not kolom:
+        return df
+    return df.astype({col: str for col in kolom})
+
+
+class BaganAkun:
+    def __init__(self, df):
+        self.tabel = df[KOLOM_AKUN].reset_index(drop=True)
+        # Nama resmi per Ref = pasangan (Ref, Akun) pertama yang terdaftar
+        resmi = self.tabel[self.tabel["Ref"].str.strip() != ""].drop_duplicates("Ref")
+        self.nama_ref = dict(zip(resmi["Ref"], resmi["Akun"]))
+        self.saldo_ref = dict(zip(resmi["Ref"], resmi["Saldo Normal"]))
+
+        # akun_id → posisi di tabel (+1); posisi 0 dipakai untuk baris tanpa akun
+        ids = self.tabel["id"].to_numpy(dtype=np.int64)
+        self._posisi = np.zeros((ids.max() + 1) if len(ids) else 1, dtype=np.int64)
+        self._posisi[ids] = np.arange(1, len(ids) + 1)
+
+    def __len__(self):
+        return len(self.tabel)
+
+    def daftar(self):
+        # Satu baris per Ref (bagan akun yang ditampilkan), diurutkan menurut Ref
+        ada_ref = self.tabel["Ref"].str.strip() != ""
+        return (
+            self.tabel[ada_ref].drop_duplicates("Ref").sort_values("Ref", kind="stable")
+            .drop(columns="id").reset_index(drop=True)
+        )
+
+    def daftar_nama(self):
+        # Sumber tunggal pilihan akun untuk dropdown (agSelectCellEditor)
+        nama = pd.concat([self.daftar()["Akun"], self.tabel["Akun"]])
+        nama = nama[nama.str.strip() != ""]
+        return list(dict.fromkeys(nama.tolist()))
+
+    def saldo_normal(self, ref):
+        return self.saldo_ref.get(ref, "debit")
+
+    def kolom_akun(self, akun_id):
+        # akun_id per baris jurnal (NA = tanpa akun) → kolom Ref & Akun categorical
+        akun_id = pd.array(akun_id, dtype="Int64").to_numpy(dtype=np.int64, na_value=0)
+        akun_id = np.where((akun_id > 0) & (akun_id < len(self._posisi)), akun_id, 0)
+        baris = self._posisi[akun_id]
+        hasil = []
+        for col in ["Ref", "Akun"]:
+            kode, kategori = pd.factorize(pd.concat([pd.Series([""]), self.tabel[col]], ignore_index=True))
+            hasil.append(pd.Categorical.from_codes(kode[baris], categories=kategori))
+        return hasil
@@ -0,0 +1,262 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from akuntansi import laporan_keuangan
+from buku_besar import neraca_saldo_dari_bukubesar, perbarui_buku_besar, posting_jurnal
+from klasifikasi_akun import klasifikasi_neraca
+from laporan_pdf import buat_pdf, buat_pdf_ak, buat_pdf_buku_besar, buat_pdf_labarugi, buat_pdf_neraca, buat_pdf_neraca_lap
+from periode import IndeksTanggal, potong_periode
+
+# === Benchmark pipeline Jurnal → Buku Besar → Neraca Saldo → Laporan ===
+# Jurnal sintetis BUMDes (akun & keterangan khas desa) dibuat dengan ukuran tertentu,
+# lalu tiap tahap diukur waktunya (terbaik dari beberapa ulangan) dan puncak memorinya
+# (tracemalloc, pass terpisah supaya tidak memperlambat pengukuran waktu).
+# Hasil disimpan sebagai JSON dan bisa dibandingkan dengan baseline.
+#
+#   python benchmark.py --ukuran 10000 100000 --keluaran hasil.json
+#   python benchmark.py --baseline baseline.json          # exit 1 kalau ada regresi
+
+UKURAN_DEFAULT = [10_000, 100_000, 1_000_000]
+TAHAP_PERSIAPAN = {"posting_buku_besar", "indeks_periode", "neraca_saldo", "laporan_keuangan", "posting_buku_besar_bulan"}
+AMBANG_REGRESI = 1.25
+SELISIH_MINIMUM = 0.005  # detik; selisih di bawah ini dianggap derau pengukuran
+
+AKUN_BUMDES = [
+    ("101", "Kas"), ("102", "Kas Kecil"), ("103", "Bank BRI"), ("104", "Bank BNI"),
+    ("111", "Piutang Usaha"), ("112", "Piutang Anggota Simpan Pinjam"),
+    ("113", "Perlengkapan Kantor"), ("114", "Persediaan Pupuk"),
+    ("121", "Peralatan Kantor"), ("122", "Gedung Kios Desa"),
+    ("123", "Kendaraan Operasional"), ("124", "Peralatan Unit Air Bersih"),
+    ("201", "Utang Usaha"), ("202", "Utang Bank"), ("203", "Utang Gaji Pegawai"),
+    ("301", "Modal Penyertaan Desa"), ("302", "Modal Masyarakat"),
+    ("401", "Pendapatan Sewa Kios"), ("402", "Pendapatan Unit Air Bersih"),
+    ("403", "Penjualan Pupuk"), ("404", "Pendapatan Jasa Simpan Pinjam"),
+    ("405", "Pendapatan Wisata Desa"), ("406", "Penerimaan Retribusi Pasar"),
+    ("501", "Beban Gaji Pegawai"), ("502", "Beban Listrik"), ("503", "Beban Air PDAM"),
+    ("504", "Biaya Pemeliharaan Gedung"), ("505", "Beban Sewa Tanah Kas Desa"),
+    ("506", "Biaya Transportasi"), ("507", "Beban ATK"), ("508", "Biaya Konsumsi Rapat"),
+    ("509", "Pembayaran Pajak"), ("510", "Beban Penyusutan Peralatan"),
+]
+
+KETERANGAN = [
+    "Setoran modal dari desa", "Penerimaan sewa kios pasar", "Penjualan pupuk ke kelompok tani",
+    "Tagihan air bersih warga", "Bayar gaji pengelola", "Bayar listrik kantor",
+    "Pembelian ATK", "Angsuran pinjaman anggota", "Tiket wisata embung desa",
+    "Retribusi los pasar", "Servis kendaraan operasional", "Konsumsi rapat pengurus",
+]
+
+
+def daftar_akun(jumlah):
+    # Bagan akun sintetis; di atas daftar bawaan ditambah akun beban per unit usaha
+    akun = list(AKUN_BUMDES[:jumlah])
+    for i in range(len(akun), jumlah):
+        akun.append((f"6{i:02d}", f"Beban Operasional Unit {i - len(AKUN_BUMDES) + 1}"))
+    return akun
+
+
+def jurnal_sintetis(baris, akun=len(AKUN_BUMDES), tahun=2025, seed=0):
+    # Voucher dua baris (debit lalu kredit, nominal sama), tanggal urut sepanjang tahun
+    rng = np.random.default_rng(seed)
+    bagan = daftar_akun(akun)
+    ref = np.array([r for r, _ in bagan], dtype=object)
+    nama = np.array([n for _, n in bagan], dtype=object)
+    voucher = (baris + 1) // 2
+
+    hari = np.sort(rng.integers(0, 365, voucher))
+    tanggal = (pd.Timestamp(year=tahun, month=1, day=1) + pd.to_timedelta(hari, unit="D")).strftime("%d/%m/%Y")
+    ket = np.array(KETERANGAN, dtype=object)[rng.integers(0, len(KETERANGAN), voucher)]
+    akun_d = rng.integers(0, len(bagan), voucher)
+    akun_k = (akun_d + rng.integers(1, len(bagan), voucher)) % len(bagan)
+    nominal = rng.integers(1, 500, voucher, dtype=np.int64) * 1000
+
+    def selang(a, b):
+        hasil = np.empty(2 * voucher, dtype=np.asarray(a).dtype)
+        hasil[0::2], hasil[1::2] = a, b
+        return hasil[:baris]
+
+    nol = np.zeros(voucher, dtype=np.int64)
+    return pd.DataFrame({
+        "Tanggal": selang(np.asarray(tanggal, dtype=object), np.asarray(tanggal, dtype=object)),
+        "Keterangan": selang(ket, ket),
+        "Ref": selang(ref[akun_d], ref[akun_k]),
+        "Akun": selang(nama[akun_d], nama[akun_k]),
+        "Debit (Rp)": selang(nominal, nol),
+        "Kredit (Rp)": selang(nol, nominal),
+    })
+
+
+def _ukur(fungsi, ulang, memori):
+    waktu = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        waktu.append(time.perf_counter() - mulai)
+    puncak = None
+    if memori:
+        tracemalloc.start()
+        fungsi()
+        puncak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return hasil, min(waktu), puncak
+
+
+def tahapan(df, bulan="01", tahun=2025):
+    # (nama tahap, fungsi) berurutan; tiap tahap memakai hasil tahap sebelumnya
+    hasil = {}
+    baru = df.copy()
+    baru.iloc[len(baru) // 2, baru.columns.get_loc("Debit (Rp)")] += 1000
+
+    def posting():
+        hasil["bb"] = posting_jurnal(df)
+        return len(df)
+
+    def perbarui():
+        # Satu sel diedit lalu dikembalikan lagi di panggilan berikutnya (bolak-balik),
+        # jadi yang terukur hanya pembaruan inkremental
+        lama, kini = (df, baru) if not hasil.get("terbalik") else (baru, df)
+        hasil["bb"] = perbarui_buku_besar(hasil["bb"], lama, kini)
+        hasil["terbalik"] = not hasil.get("terbalik")
+        return len(df)
+
+    def indeks():
+        hasil["bulan"] = potong_periode(df, IndeksTanggal(df), bulan, tahun)
+        return len(df)
+
+    def neraca():
+        hasil["ns"] = neraca_saldo_dari_bukubesar(hasil["bb"])
+        return len(hasil["ns"])
+
+    def klasifikasi():
+        klasifikasi_neraca(hasil["ns"])
+        return len(hasil["ns"])
+
+    def laporan():
+        hasil["laporan"] = laporan_keuangan(hasil["ns"])
+        return len(hasil["ns"])
+
+    def pdf_laporan(nama, builder):
+        def buat():
+            df = hasil["laporan"][nama]
+            if df is None:
+                return 0
+            builder(df, bulan, tahun)
+            return len(df)
+        return buat
+
+    def pdf_jurnal():
+        buat_pdf(hasil["bulan"], bulan, tahun)
+        return len(hasil["bulan"])
+
+    def pdf_buku_besar():
+        buat_pdf_buku_besar(hasil["bb_bulan"])
+        return len(hasil["bulan"])
+
+    def pdf_neraca():
+        buat_pdf_neraca(hasil["ns"], bulan, tahun)
+        return len(hasil["ns"])
+
+    def bb_bulan():
+        hasil["bb_bulan"] = posting_jurnal(hasil["bulan"])
+        return len(hasil["bulan"])
+
+    return [
+        ("posting_buku_besar", posting),
+        ("perbarui_buku_besar", perbarui),
+        ("indeks_periode", indeks),
+        ("neraca_saldo", neraca),
+        ("klasifikasi_laporan", klasifikasi),
+        ("laporan_keuangan", laporan),
+        ("posting_buku_besar_bulan", bb_bulan),
+        ("pdf_jurnal", pdf_jurnal),
+        ("pdf_buku_besar", pdf_buku_besar),
+        ("pdf_neraca_saldo", pdf_neraca),
+        ("pdf_laba_rugi", pdf_laporan("laba_rugi", buat_pdf_labarugi)),
+        ("pdf_neraca", pdf_laporan("neraca", buat_pdf_neraca_lap)),
+        ("pdf_arus_kas", pdf_laporan("arus_kas", buat_pdf_ak)),
+    ]
+
+
+def jalankan(ukuran, akun=len(AKUN_BUMDES), ulang=3, memori=True, pilih=None, log=print):
+    hasil = {
+        "meta": {
+            "waktu": pd.Timestamp.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "akun": akun,
+            "ulang": ulang,
+        },
+        "hasil": {},
+    }
+    for n in ukuran:
+        df = jurnal_sintetis(n, akun)
+        per_tahap = {}
+        for nama, fungsi in tahapan(df):
+            if pilih and nama not in pilih:
+                # Tahap persiapan tetap dijalankan (tanpa diukur) karena hasilnya dipakai tahap lain
+                if nama in TAHAP_PERSIAPAN:
+                    fungsi()
+                continue
+            baris, detik, puncak = _ukur(fungsi, ulang, memori)
+            per_tahap[nama] = {"detik": round(detik, 6), "puncak_mb": None if puncak is None else round(puncak, 3), "baris": int(baris)}
+            log(f"{n:>9,} baris  {nama:<26} {detik:9.4f} s" + ("" if puncak is None else f"  {puncak:9.2f} MB"))
+        hasil["hasil"][str(n)] = per_tahap
+    return hasil
+
+
+def bandingkan(hasil, baseline, ambang=AMBANG_REGRESI):
+    # Baris perbandingan per (ukuran, tahap) yang ada di kedua hasil
+    baris = []
+    for n, per_tahap in hasil["hasil"].items():
+        for nama, ukur in per_tahap.items():
+            lama = baseline.get("hasil", {}).get(n, {}).get(nama)
+            if not lama or not lama.get("detik"):
+                continue
+            rasio = ukur["detik"] / lama["detik"]
+            baris.append({
+                "ukuran": int(n), "tahap": nama, "baseline": lama["detik"], "sekarang": ukur["detik"],
+                "rasio": round(rasio, 3),
+                "regresi": rasio > ambang and ukur["detik"] - lama["detik"] > SELISIH_MINIMUM,
+            })
+    return baris
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline akuntansi BUMDes")
+    parser.add_argument("--ukuran", type=int, nargs="+", default=UKURAN_DEFAULT, help="jumlah baris jurnal")
+    parser.add_argument("--akun", type=int, default=len(AKUN_BUMDES), help="jumlah akun di bagan akun sintetis")
+    parser.add_argument("--ulang", type=int, default=3, help="ulangan per tahap (diambil yang tercepat)")
+    parser.add_argument("--tahap", nargs="+", default=None, help="hanya tahap tertentu")
+    parser.add_argument("--tanpa-memori", action="store_true", help="lewati pengukuran puncak memori")
+    parser.add_argument("--keluaran", default="benchmark_hasil.json")
+    parser.add_argument("--baseline", default=None, help="JSON hasil sebelumnya untuk dibandingkan")
+    parser.add_argument("--ambang", type=float, default=AMBANG_REGRESI, help="rasio waktu yang dianggap regresi")
+    args = parser.parse_args(argv)
+
+    hasil = jalankan(args.ukuran, args.akun, args.ulang, not args.tanpa_memori, args.tahap)
+    with open(args.keluaran, "w", encoding="utf-8") as f:
+        json.dump(hasil, f, indent=2)
+    print(f"Hasil disimpan ke {args.keluaran}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        perbandingan = bandingkan(hasil, baseline, args.ambang)
+        for b in perbandingan:
+            tanda = "  ⚠ REGRESI" if b["regresi"] else ""
+            print(f"{b['ukuran']:>9,}  {b['tahap']:<26} {b['baseline']:9.4f} → {b['sekarang']:9.4f} s  ×{b['rasio']:.2f}{tanda}")
+        if any(b["regresi"] for b in perbandingan):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
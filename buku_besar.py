@@ -0,0 +1,518 @@
+import itertools
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+from bagan_akun import jenis_akun
+from perubahan import sel_berubah
+from uang import RUPIAH, ke_rupiah
+
+# === Mesin posting buku besar (kolumnar, tanpa iterrows) ===
+# Struktur keluaran sama dengan versi lama:
+# {key: {"nama_akun": str, "debit": int, "kredit": int, "transaksi": [...]}}
+# dengan tiap transaksi berbentuk {"tanggal", "keterangan", "debit", "kredit"},
+# ditambah "saldo" (saldo berjalan akun menurut saldo normalnya) dan
+# "saldo_normal" ("debit" / "kredit") per akun. Semua nominal rupiah bulat (int64).
+
+KOLOM_TRANSAKSI = ["tanggal", "keterangan", "debit", "kredit", "saldo"]
+# Nomor generasi BukuBesar, naik terus selama proses: tidak dipakai ulang seperti id()
+# objek yang sudah dibuang, jadi aman sebagai bagian kunci cache
+_GENERASI = itertools.count(1)
+
+
+class DaftarTransaksi(Sequence):
+    # Tampilan lazy atas potongan kolom posting milik satu akun.
+    # Dict per transaksi baru dibuat saat benar-benar dibaca (Tab 2 / PDF),
+    # sehingga posting 1 juta baris tidak membuat 1 juta dict.
+    # Perubahan inkremental disimpan sebagai overlay: baris dasar yang dibalik
+    # (_dibuang) dan posting baru per baris jurnal (_tambahan). Baris jurnal dikenali
+    # lewat kunci urutnya (id jurnal, atau posisi kalau tidak ada id; lihat urut_baris).
+    def __init__(self, kolom=None, mulai=0, akhir=0, arah=1):
+        self._kolom = kolom
+        self._mulai = mulai
+        self._akhir = akhir
+        self._arah = self._arah_dasar = arah  # +1 saldo normal debit, -1 saldo normal kredit
+        self._dibuang = {}
+        self._tambahan = {}
+        self._panjang = akhir - mulai
+        self._rekaman = None  # dict transaksi hasil overlay, dibuat sekali sampai overlay berubah
+
+    def __len__(self):
+        return self._panjang
+
+    def _bersih(self):
+        return (self._kolom is not None and not self._dibuang and not self._tambahan
+                and self._arah == self._arah_dasar)
+
+    def _rekaman_overlay(self):
+        if self._rekaman is None:
+            self._rekaman = self.to_frame().to_dict("records")
+        return self._rekaman
+
+    def _baris(self, i):
+        kolom = self._kolom
+        return {
+            "tanggal": kolom["tanggal"][i],
+            "keterangan": kolom["keterangan"][i],
+            "debit": int(kolom["debit"][i]),
+            "kredit": int(kolom["kredit"][i]),
+            "saldo": int(kolom["saldo"][i]),
+        }
+
+    def __getitem__(self, i):
+        if not self._bersih():
+            return self._rekaman_overlay()[i]
+        if isinstance(i, slice):
+            return [self._baris(self._mulai + j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("indeks transaksi di luar jangkauan")
+        return self._baris(self._mulai + i)
+
+    def __iter__(self):
+        if not self._bersih():
+            yield from self._rekaman_overlay()
+            return
+        potong = slice(self._mulai, self._akhir)
+        for tanggal, keterangan, debit, kredit, saldo in zip(
+            self._kolom["tanggal"][potong],
+            self._kolom["keterangan"][potong],
+            self._kolom["debit"][potong].tolist(),
+            self._kolom["kredit"][potong].tolist(),
+            self._kolom["saldo"][potong].tolist(),
+        ):
+            yield {"tanggal": tanggal, "keterangan": keterangan, "debit": debit, "kredit": kredit, "saldo": saldo}
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"DaftarTransaksi({len(self)} transaksi)"
+
+    def _jumlah_dasar(self, baris):
+        # Jumlah posting dasar milik satu baris jurnal (baris dasar terurut naik per akun)
+        if self._kolom is None or baris in self._dibuang:
+            return 0
+        dasar = self._kolom["baris"][self._mulai:self._akhir]
+        return int(np.searchsorted(dasar, baris, "right") - np.searchsorted(dasar, baris, "left"))
+
+    def buang(self, baris):
+        # Balik semua posting yang berasal dari satu baris jurnal
+        self._rekaman = None
+        self._panjang -= len(self._tambahan.pop(baris, ()))
+        jumlah = self._jumlah_dasar(baris)
+        if jumlah:
+            self._dibuang[baris] = jumlah
+            self._panjang -= jumlah
+
+    def atur_arah(self, arah):
+        # Saldo normal akun berubah (nama akun sumber berganti); saldo dihitung ulang saat dibaca
+        if arah != self._arah:
+            self._rekaman = None
+        self._arah = arah
+
+    def tambah(self, baris, posting):
+        if posting:
+            self._rekaman = None
+            self._tambahan.setdefault(baris, []).extend(posting)
+            self._panjang += len(posting)
+
+    def to_frame(self):
+        bagian = []
+        if self._kolom is not None and self._akhir > self._mulai:
+            potong = slice(self._mulai, self._akhir)
+            dasar = pd.DataFrame({nama: self._kolom[nama][potong] for nama in ["baris"] + KOLOM_TRANSAKSI})
+            if self._bersih():
+                return dasar[KOLOM_TRANSAKSI]
+            if self._dibuang:
+                dasar = dasar[~np.isin(dasar["baris"].to_numpy(), list(self._dibuang))]
+            bagian.append(dasar)
+        if self._tambahan:
+            bagian.append(pd.DataFrame(
+                [dict(p, baris=baris) for baris, daftar in self._tambahan.items() for p in daftar],
+                columns=["baris"] + KOLOM_TRANSAKSI,
+            ))
+        if not bagian:
+            return pd.DataFrame(columns=KOLOM_TRANSAKSI)
+        frame = pd.concat(bagian, ignore_index=True) if len(bagian) > 1 else bagian[0]
+        frame = frame.sort_values("baris", kind="stable")[KOLOM_TRANSAKSI].reset_index(drop=True)
+        # Setelah edit urutan posting berubah: saldo berjalan akun ini dihitung ulang
+        frame["saldo"] = self._arah * (ke_rupiah(frame["debit"]) - ke_rupiah(frame["kredit"])).cumsum()
+        return frame
+
+
+class BukuBesar(dict):
+    # dict {key: data akun} seperti biasa, ditambah indeks baris jurnal → akun
+    # yang dibutuhkan untuk pembaruan inkremental (perbarui_buku_besar)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generasi = next(_GENERASI)
+        self.kode_baris = np.zeros(0, dtype=np.int64)  # kode akun per posisi baris (-1 = belum terposting)
+        self.urut_baris = np.zeros(0, dtype=np.int64)  # kunci urut per posisi baris (urut_baris)
+        self.kunci_id = False   # True = kunci urut adalah kolom "id"
+        self.daftar_kunci = []  # kode → key akun
+        self.kode_kunci = {}    # key akun → kode
+        self.baris_nama = []    # kode → kunci urut baris sumber nama_akun
+        # Total berjalan yang dijaga saat posting, dipakai sebagai tanda tangan murah
+        # untuk deteksi perubahan (tanpa serialisasi semua akun)
+        self.versi = 0
+        self.total_debit = 0
+        self.total_kredit = 0
+        self.jumlah_posting = 0
+        self.saldo_normal = {}  # key akun → "debit"/"kredit" dari bagan akun (opsional)
+
+    def signature(self):
+        return (self.generasi, self.versi, self.total_debit, self.total_kredit, self.jumlah_posting)
+
+
+def arah_saldo(kunci, nama, saldo_normal=None):
+    # +1 = saldo normal debit, -1 = kredit. Dari bagan akun (saldo_normal: key → "debit" /
+    # "kredit") kalau terdaftar, selain itu dari aturan klasifikasi yang sama dengan bagan akun
+    _, saldo = jenis_akun(kunci, nama)
+    if saldo_normal:
+        saldo = [saldo_normal.get(k, s) for k, s in zip(kunci, saldo)]
+    return np.where(np.asarray(saldo, dtype=object) == "kredit", -1, 1).astype(RUPIAH)
+
+
+def _atur_nama(bb, key, nama):
+    # Nama akun menentukan saldo normal (kalau tidak terdaftar di bagan akun)
+    data = bb[key]
+    data["nama_akun"] = nama if nama else "Tidak Ada Nama Akun"
+    arah = int(arah_saldo([key], [nama], bb.saldo_normal)[0])
+    data["saldo_normal"] = "kredit" if arah < 0 else "debit"
+    data["transaksi"].atur_arah(arah)
+
+
+def frame_transaksi(transaksi):
+    # DataFrame transaksi satu akun, cepat untuk DaftarTransaksi dan tetap jalan untuk list biasa
+    if hasattr(transaksi, "to_frame"):
+        return transaksi.to_frame()
+    return pd.DataFrame(list(transaksi), columns=KOLOM_TRANSAKSI)
+
+
+def _kolom_teks(df, nama):
+    # Setara str(row.get(nama, "")).strip() untuk seluruh kolom sekaligus
+    if nama not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    kolom = df[nama]
+    if isinstance(kolom.dtype, pd.CategoricalDtype):
+        # Kolom akun categorical: strip sekali per kategori, lalu ambil lewat kode
+        kategori = kolom.cat.categories.astype(str).str.strip().append(pd.Index(["nan"]))
+        kode = kolom.cat.codes.to_numpy()
+        return pd.Series(kategori.take(np.where(kode < 0, len(kategori) - 1, kode)), index=df.index)
+    # Kolom string pandas mempertahankan NaN saat astype(str); samakan dengan str(nan)
+    return kolom.astype(str).str.strip().fillna("nan")
+
+
+def _kolom_angka(df, nama):
+    if nama not in df:
+        return np.zeros(len(df), dtype=RUPIAH)
+    return ke_rupiah(df[nama]).to_numpy()
+
+
+def _ambil(kolom, posisi):
+    # Ambil baris berdasarkan posisi sebagai array (tetap kolumnar, tanpa konversi ke object)
+    return kolom.array.take(posisi)
+
+
+def kunci_akun(df):
+    # Key akun per baris: Ref, fallback ke nama Akun, lalu "Akun Tanpa Ref {index}"
+    ref = _kolom_teks(df, "Ref")
+    akun = _kolom_teks(df, "Akun")
+    kunci = ref.where(ref != "", akun)
+    kosong = kunci == ""
+    if kosong.any():
+        kunci = kunci.where(~kosong, "Akun Tanpa Ref " + pd.Series(df.index, index=df.index).astype(str))
+    return kunci, akun
+
+
+def urut_baris(df):
+    # Kunci urut tiap baris jurnal: kolom "id" kalau lengkap dan naik (jurnal dari database
+    # selalu urut id), selain itu posisi baris. Kunci id tidak bergeser saat baris lain
+    # dihapus / disisipkan, jadi pembaruan inkremental cukup mencocokkan id.
+    if "id" in df:
+        ids = pd.to_numeric(df["id"], errors="coerce")
+        if not ids.isna().any():
+            ids = ids.to_numpy(dtype=np.int64)
+            if np.all(np.diff(ids) > 0):
+                return ids, True
+    return np.arange(len(df), dtype=np.int64), False
+
+
+def posting_jurnal(df, saldo_normal=None):
+    if df is None or len(df) == 0:
+        bb = BukuBesar()
+        bb.saldo_normal = dict(saldo_normal or {})
+        if df is not None:
+            bb.urut_baris, bb.kunci_id = urut_baris(df)
+        return bb
+
+    urut, kunci_id = urut_baris(df)
+    kunci, akun = kunci_akun(df)
+    debit = _kolom_angka(df, "Debit (Rp)")
+    kredit = _kolom_angka(df, "Kredit (Rp)")
+
+    # Kode akun sesuai urutan kemunculan pertama (sama seperti urutan dict lama),
+    # sehingga baris pertama tiap akun adalah titik naiknya maksimum berjalan
+    kode, daftar_kunci = pd.factorize(kunci, sort=False)
+    jumlah_akun = len(daftar_kunci)
+    baris_pertama = np.flatnonzero(np.diff(np.maximum.accumulate(kode), prepend=-1) > 0)
+    nama_pertama = _ambil(akun, baris_pertama)
+
+    # Hanya nilai positif yang diposting, debit lebih dulu lalu kredit per baris
+    ada_debit = debit > 0
+    ada_kredit = kredit > 0
+    posting = np.flatnonzero(np.column_stack([ada_debit, ada_kredit]).ravel())
+    baris = posting // 2
+    sisi_kredit = (posting % 2).astype(bool)
+
+    # Sort stabil per akun: urutan baris dalam satu akun tetap terjaga
+    kode_posting = kode[baris]
+    urutan = np.argsort(kode_posting, kind="stable")
+    baris = baris[urutan]
+    sisi_kredit = sisi_kredit[urutan]
+
+    if "Tanggal" in df:
+        tanggal = df["Tanggal"].astype(str).where(df["Tanggal"].notna(), "")
+    else:
+        tanggal = pd.Series("", index=df.index, dtype=object)
+
+    kolom = {
+        "baris": urut[baris],
+        "tanggal": _ambil(tanggal, baris),
+        "keterangan": _ambil(_kolom_teks(df, "Keterangan"), baris),
+        "debit": np.where(sisi_kredit, 0, debit[baris]),
+        "kredit": np.where(sisi_kredit, kredit[baris], 0),
+    }
+
+    jumlah_per_akun = np.bincount(kode_posting, minlength=jumlah_akun)
+    batas = np.concatenate([[0], np.cumsum(jumlah_per_akun)])
+
+    def total_per_akun(nilai):
+        # Jumlah per akun lewat selisih kumulatif di batas akun (int64, eksak; bincount = float)
+        kumulatif = np.concatenate([[0], np.cumsum(nilai)])
+        return kumulatif[batas[1:]] - kumulatif[batas[:-1]]
+
+    total_debit = total_per_akun(kolom["debit"])
+    total_kredit = total_per_akun(kolom["kredit"])
+
+    # Saldo berjalan semua akun dalam satu cumsum: mutasi bertanda saldo normal akun,
+    # dikurangi kumulatif sebelum posting pertama tiap akun
+    arah = arah_saldo(list(daftar_kunci), list(nama_pertama), saldo_normal)
+    mutasi = (kolom["debit"] - kolom["kredit"]) * arah[kode_posting[urutan]]
+    kumulatif = np.cumsum(mutasi)
+    sebelum = np.concatenate([[0], kumulatif])[batas[:-1]]
+    kolom["saldo"] = kumulatif - np.repeat(sebelum, jumlah_per_akun)
+
+    buku_besar = BukuBesar()
+    buku_besar.kode_baris = kode.astype(np.int64)
+    buku_besar.urut_baris = urut
+    buku_besar.kunci_id = kunci_id
+    buku_besar.daftar_kunci = list(daftar_kunci)
+    buku_besar.kode_kunci = {key: i for i, key in enumerate(buku_besar.daftar_kunci)}
+    buku_besar.baris_nama = urut[baris_pertama].tolist()
+    buku_besar.total_debit = int(total_debit.sum())
+    buku_besar.total_kredit = int(total_kredit.sum())
+    buku_besar.jumlah_posting = len(baris)
+    buku_besar.saldo_normal = dict(saldo_normal or {})
+    for i, key in enumerate(buku_besar.daftar_kunci):
+        nama = nama_pertama[i]
+        buku_besar[key] = {
+            "nama_akun": nama if nama else "Tidak Ada Nama Akun",
+            "debit": int(total_debit[i]),
+            "kredit": int(total_kredit[i]),
+            "saldo_normal": "kredit" if arah[i] < 0 else "debit",
+            "transaksi": DaftarTransaksi(kolom, int(batas[i]), int(batas[i + 1]), int(arah[i])),
+        }
+    return buku_besar
+
+
+# === Pembaruan inkremental dari selisih jurnal ===
+def diff_jurnal(lama, baru, urut_lama=None, urut_baru=None):
+    # Selisih dengan mencocokkan kunci urut (id jurnal; tanpa id = posisi, lihat urut_baris).
+    # Hasil: posisi di `lama` yang harus dibalik (diubah / dihapus), posisi di `baru` yang
+    # harus diposting (diubah / ditambah), dan peta posisi lama → baru (-1 = dihapus).
+    if urut_lama is None:
+        urut_lama = urut_baris(lama)[0]
+    if urut_baru is None:
+        urut_baru = urut_baris(baru)[0]
+    posisi = np.searchsorted(urut_baru, urut_lama)
+    cocok = posisi < len(urut_baru)
+    cocok[cocok] = urut_baru[posisi[cocok]] == urut_lama[cocok]
+    peta = np.where(cocok, posisi, -1)
+    pos_lama = np.flatnonzero(cocok)
+    pos_baru = peta[cocok]
+    if np.array_equal(pos_lama, pos_baru) and (len(pos_lama) == 0 or pos_lama[-1] == len(pos_lama) - 1):
+        # Bagian depan sejajar (hanya ekor yang berbeda): bandingkan langsung tanpa salinan
+        berubah = sel_berubah(lama, baru)[:len(pos_lama)]
+    else:
+        berubah = sel_berubah(lama.iloc[pos_lama], baru.iloc[pos_baru])
+    diganti = berubah.any(axis=1)
+    # Baris tanpa Ref dan Akun memakai label index sebagai key ("Akun Tanpa Ref {index}"),
+    # jadi ikut diposting ulang kalau labelnya bergeser
+    geser = np.flatnonzero(lama.index.take(pos_lama).to_numpy(dtype=object) != baru.index.take(pos_baru).to_numpy(dtype=object))
+    if len(geser):
+        sub = baru.iloc[pos_baru[geser]]
+        diganti[geser[((_kolom_teks(sub, "Ref") == "") & (_kolom_teks(sub, "Akun") == "")).to_numpy()]] = True
+    ditambah = np.ones(len(baru), dtype=bool)
+    ditambah[pos_baru] = False
+    dibalik = np.sort(np.concatenate([pos_lama[diganti], np.flatnonzero(~cocok)]))
+    diposting = np.sort(np.concatenate([pos_baru[diganti], np.flatnonzero(ditambah)]))
+    return dibalik, diposting, peta
+
+
+def _posting_baris(df, posisi):
+    # Hitung key, nama, nominal dan posting untuk sebagian baris jurnal saja
+    sub = df.iloc[posisi]
+    kunci, akun = kunci_akun(sub)
+    debit = _kolom_angka(sub, "Debit (Rp)")
+    kredit = _kolom_angka(sub, "Kredit (Rp)")
+    if "Tanggal" in sub:
+        tanggal = sub["Tanggal"].astype(str).where(sub["Tanggal"].notna(), "").tolist()
+    else:
+        tanggal = [""] * len(sub)
+    keterangan = _kolom_teks(sub, "Keterangan").tolist()
+    for j, baris in enumerate(posisi):
+        d = int(debit[j]) if debit[j] > 0 else 0
+        k = int(kredit[j]) if kredit[j] > 0 else 0
+        posting = []
+        if d:
+            posting.append({"tanggal": tanggal[j], "keterangan": keterangan[j], "debit": d, "kredit": 0})
+        if k:
+            posting.append({"tanggal": tanggal[j], "keterangan": keterangan[j], "debit": 0, "kredit": k})
+        yield int(baris), kunci.iloc[j], akun.iloc[j], d, k, posting
+
+
+def perbarui_buku_besar(bb, lama, baru, saldo_normal=None):
+    # Balik baris yang berubah/terhapus lalu posting baris baru; biaya sebanding
+    # dengan jumlah baris yang diedit, bukan dengan panjang jurnal
+    if not isinstance(bb, BukuBesar) or lama is None or baru is None \
+            or list(lama.columns) != list(baru.columns) or len(bb.urut_baris) != len(lama) \
+            or (saldo_normal is not None and saldo_normal != bb.saldo_normal):
+        return posting_jurnal(baru, saldo_normal)
+    urut_lama = bb.urut_baris
+    urut_baru, kunci_id = urut_baris(baru)
+    if kunci_id != bb.kunci_id:
+        # Kunci urut berganti jenis (id ↔ posisi): posting lama tidak bisa dicocokkan
+        return posting_jurnal(baru, bb.saldo_normal)
+
+    dibalik, diposting, peta = diff_jurnal(lama, baru, urut_lama, urut_baru)
+    jumlah_berubah = len(dibalik) + len(diposting)
+    if jumlah_berubah == 0:
+        bb.urut_baris = urut_baru
+        return bb
+    if jumlah_berubah > len(baru) + 2:
+        # Sebagian besar jurnal berubah: bangun ulang kolumnar lebih murah
+        return posting_jurnal(baru, bb.saldo_normal)
+
+    bb.versi += 1
+
+    # 1) Balik posting lama
+    nama_tertunda = {}
+    for posisi, _, _, d, k, _ in _posting_baris(lama, dibalik):
+        kode = bb.kode_baris[posisi]
+        baris = int(urut_lama[posisi])
+        data = bb[bb.daftar_kunci[kode]]
+        data["debit"] -= d
+        data["kredit"] -= k
+        bb.total_debit -= d
+        bb.total_kredit -= k
+        bb.jumlah_posting -= (d > 0) + (k > 0)
+        data["transaksi"].buang(baris)
+        bb.kode_baris[posisi] = -1
+        if bb.baris_nama[kode] == baris:
+            nama_tertunda[kode] = baris
+
+    # Kode akun baris yang tidak berubah ikut pindah ke posisinya di jurnal baru
+    kode_baris = np.full(len(baru), -1, dtype=np.int64)
+    ada = peta >= 0
+    kode_baris[peta[ada]] = bb.kode_baris[ada]
+    bb.kode_baris = kode_baris
+    bb.urut_baris = urut_baru
+
+    # 2) Posting baris baru / hasil edit
+    for posisi, key, nama, d, k, posting in _posting_baris(baru, diposting):
+        baris = int(urut_baru[posisi])
+        kode = bb.kode_kunci.get(key)
+        if kode is None:
+            kode = len(bb.daftar_kunci)
+            bb.daftar_kunci.append(key)
+            bb.kode_kunci[key] = kode
+            bb.baris_nama.append(baris)
+        if key not in bb:
+            bb[key] = {"nama_akun": "", "debit": 0, "kredit": 0, "saldo_normal": "debit", "transaksi": DaftarTransaksi()}
+            bb.baris_nama[kode] = baris
+        data = bb[key]
+        if baris <= bb.baris_nama[kode]:
+            bb.baris_nama[kode] = baris
+            _atur_nama(bb, key, nama)
+        data["debit"] += d
+        data["kredit"] += k
+        bb.total_debit += d
+        bb.total_kredit += k
+        bb.jumlah_posting += len(posting)
+        data["transaksi"].tambah(baris, posting)
+        bb.kode_baris[posisi] = kode
+
+    # 3) Akun yang kehilangan baris sumber namanya: cari baris berikutnya milik akun itu
+    for kode, baris_lama in nama_tertunda.items():
+        posisi = int(np.searchsorted(urut_baru, baris_lama))
+        if bb.baris_nama[kode] < baris_lama or (
+                posisi < len(urut_baru) and urut_baru[posisi] == baris_lama and bb.kode_baris[posisi] == kode):
+            continue
+        key = bb.daftar_kunci[kode]
+        mulai = int(np.searchsorted(urut_baru, baris_lama, "right"))
+        berikut = np.flatnonzero(bb.kode_baris[mulai:] == kode)
+        if not len(berikut):
+            # Tidak ada lagi baris jurnal untuk akun ini
+            bb.pop(key, None)
+            continue
+        posisi = mulai + int(berikut[0])
+        bb.baris_nama[kode] = int(urut_baru[posisi])
+        nama = str(baru["Akun"].iloc[posisi]).strip() if "Akun" in baru else ""
+        _atur_nama(bb, key, nama)
+
+    # 4) Urutan akun = urutan baris pertamanya di jurnal, sama seperti posting_jurnal
+    urutan = sorted(bb, key=lambda key: bb.baris_nama[bb.kode_kunci[key]])
+    if urutan != list(bb):
+        isi = [(key, bb[key]) for key in urutan]
+        dict.clear(bb)
+        dict.update(bb, isi)
+    return bb
+
+
+# === Neraca Saldo dari Buku Besar ===
+def neraca_saldo_dari_bukubesar(bb, non_destructive: bool = True):
+    if not bb:
+        return pd.DataFrame(columns=["Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"])
+
+    # Inisialisasi DataFrame Neraca Saldo
+    ns = pd.DataFrame(columns=["Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"])
+
+    rows = []
+    for key, data in bb.items():
+        ref = key if key != data["nama_akun"] else ""  # kalau key sama dengan nama akun, berarti ref kosong
+        nama_akun = data["nama_akun"] if data["nama_akun"] else key
+        debit = ke_rupiah(data.get("debit", 0))
+        kredit = ke_rupiah(data.get("kredit", 0))
+
+        rows.append({
+            "Ref": ref,
+            "Akun": nama_akun,
+            "Debit (Rp)": debit,
+            "Kredit (Rp)": kredit
+        })
+
+    ns = pd.DataFrame(rows)
+
+    if not non_destructive:
+        # Hanya tampilkan Ref yang ada di buku besar
+        refs_bb = set(str(k) for k in bb.keys())
+        ns = ns[ns["Ref"].astype(str).isin(refs_bb)]
+
+    # Reset index
+    return ns.reset_index(drop=True)
@@ -1,17 +1,159 @@
+import functools
+import io
+import numbers
 import streamlit as st
 import pandas as pd
-from fpdf import FPDF
-import tempfile
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder, GridUpdateMode
+from buku_besar import perbarui_buku_besar, frame_transaksi, neraca_saldo_dari_bukubesar
+from jurnal_store import JurnalStore, PeriodeTerkunci, terapkan_halaman
+from perubahan import Perubahan
+from periode import IndeksTanggal, potong_periode
+from klasifikasi_akun import klasifikasi_neraca
+from akuntansi import (
+    signature_buku_besar, jurnal_final, neraca_saldo_final, laba_rugi, neraca_laporan, arus_kas,
+    daftar_periode, laporan_komparatif, neraca_saldo_kubus, periode_sebelumnya, saldo_berjalan,
+)
+from bagan_akun import tanpa_kategori
+from impor_jurnal import impor_jurnal
+from tenant import daftar_tenant, lokasi_db, slug
+from uang import ke_rupiah, kolom_rupiah
+from profil import PANEL_ADMIN, Metrik, Profiler
+from laporan_pdf import (
+    CachePdf, PILIHAN_BULAN, bulan_dict, format_rupiah, buat_pdf, buat_pdf_buku_besar, buat_pdf_neraca,
+    buat_pdf_labarugi, buat_pdf_neraca_lap, buat_pdf_ak, buat_pdf_komparatif, label_periode,
+)
 
 # === Konfigurasi dasar ===
 st.set_page_config(page_title="Administrasi BUMDes", layout="wide")
 st.title("📘 Sistem Akuntansi BUMDes")
 
+# === Resource bersama (satu salinan per proses, dipakai semua sesi) ===
+# Yang disimpan di sini hanya objek yang tidak diubah per sesi atau yang sudah aman
+# dipakai banyak thread; data kerja tiap user tetap di session_state.
+# Per BUMDes paling banyak MAKS_TENANT_AKTIF entri; yang paling lama tidak dipakai
+# dikeluarkan (koneksi database ditutup, PDF di cache dibuang).
+MAKS_TENANT_AKTIF = 32
+
+@st.cache_resource(show_spinner=False, max_entries=MAKS_TENANT_AKTIF, on_release=JurnalStore.close)
+def store_tenant(tenant):
+    # Satu koneksi database per BUMDes (JurnalStore sudah dijaga lock)
+    return JurnalStore(lokasi_db(tenant))
+
+@st.cache_resource(show_spinner=False)
+def metrik_proses():
+    # Histogram durasi per tahap + file metrik (JSONL / Prometheus), dibagi semua sesi
+    return Metrik()
+
+@st.cache_resource(show_spinner=False, max_entries=MAKS_TENANT_AKTIF, on_release=CachePdf.kosongkan)
+def cache_pdf_tenant(tenant):
+    # PDF jadi dibagi antar sesi BUMDes yang sama; kunci = hash isi laporan + periode.
+    # Setiap render builder PDF (di thread download) langsung dicatat ke metrik.
+    return CachePdf(maks_entri=64, pencatat=lambda nama, detik, data: metrik_proses().catat_satu(
+        f"pdf {nama}", detik, data if isinstance(data, pd.DataFrame) else None, tenant=tenant))
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def opsi_grid(skema, stop_saat_blur=True, pilihan_akun=(), pilih_baris=False):
+    # Grid options hanya bergantung pada kolom/dtype (dan daftar akun dropdown)
+    gb = GridOptionsBuilder.from_dataframe(pd.DataFrame({col: pd.Series(dtype=tipe) for col, tipe in skema}))
+    gb.configure_default_column(editable=True, resizable=True)
+    gb.configure_grid_options(stopEditingWhenCellsLoseFocus=stop_saat_blur)
+    if pilih_baris:
+        # Checkbox per baris (+ pilih semua di header) untuk hapus massal
+        gb.configure_selection("multiple", use_checkbox=True, header_checkbox=True)
+    if pilihan_akun:
+        gb.configure_column("Akun", editable=True, cellEditor="agSelectCellEditor", cellEditorParams={"values": list(pilihan_akun)})
+    for col, _ in skema:
+        if "(Rp)" in col:
+            gb.configure_column(col, type=["numericColumn"], valueFormatter="value ? value.toLocaleString('id-ID') : ''")
+        elif col == "id":
+            gb.configure_column("id", hide=True)
+    return gb.build()
+
+def grid_options(df, **opsi):
+    skema = tuple((col, str(tipe)) for col, tipe in df.dtypes.items())
+    # Salinan dangkal: AgGrid menulis beberapa kunci tingkat atas (domLayout, autoSizeStrategy)
+    return dict(opsi_grid(skema, **opsi))
+
+@st.cache_resource(show_spinner=False)
+def gaya_grid():
+    return """
+<style>
+.ag-theme-streamlit {
+    --ag-background-color: #F9FAFB;
+    --ag-odd-row-background-color: #FFFFFF;
+    --ag-header-background-color: #E9ECEF;
+    --ag-border-color: #DDDDDD;
+    --ag-header-foreground-color: #000000;
+    --ag-font-family: "Inter", system-ui, sans-serif;
+    --ag-font-size: 14px;
+    --ag-row-hover-color: #EEF6ED;
+    --ag-selected-row-background-color: #DDF0DC;
+    --ag-cell-horizontal-padding: 10px;
+    --ag-cell-vertical-padding: 6px;
+    border-radius: 8px;
+}
+</style>
+"""
+
+# === Pilih BUMDes (tenant) ===
+def buat_tenant():
+    nama = slug(st.session_state.tenant_baru)
+    if nama:
+        store_tenant(nama)  # membuat file database BUMDes baru
+        st.session_state.pilih_tenant = nama
+    st.session_state.tenant_baru = ""
+
+with st.sidebar:
+    st.header("🏘️ BUMDes")
+    tenant = st.selectbox("Pilih BUMDes", daftar_tenant(), key="pilih_tenant")
+    with st.expander("➕ Tambah BUMDes", expanded=False):
+        st.text_input("Nama BUMDes", key="tenant_baru")
+        st.button("Buat", key="buat_tenant", on_click=buat_tenant)
+    # Nama petugas dicatat di log perubahan jurnal (riwayat audit)
+    petugas = st.text_input("👤 Nama Petugas", key="petugas").strip() or "anonim"
+    # Panel profiling hanya untuk admin (BUMDES_ADMIN=1), diisi di akhir script
+    panel_profil = st.empty() if PANEL_ADMIN else None
+
+# Ganti BUMDes = buang semua state milik BUMDes sebelumnya (data tidak tercampur)
+if st.session_state.get("tenant") != tenant:
+    for kunci in list(st.session_state):
+        if kunci not in ("pilih_tenant", "tenant_baru", "petugas"):
+            del st.session_state[kunci]
+    st.session_state.tenant = tenant
+
+# === Profiling rerun ini ===
+# Rerun yang terputus di tengah (st.rerun) dikirim di awal rerun berikutnya
+if "profil" in st.session_state:
+    st.session_state.profil.selesai(None)
+profil = st.session_state.profil = Profiler(metrik_proses(), tenant=tenant)
+
 # === Inisialisasi data awal ===
 def init_dataframe(columns):
     return pd.DataFrame([{col: 0 if "(Rp)" in col or col == "Jumlah (Rp)" else "" for col in columns}])
 
+# Jurnal Umum disimpan di SQLite; session_state.data hanya working set yang sedang dibuka
+# Store diambil dari cache setiap rerun: kalau entri BUMDes ini sempat dikeluarkan dari
+# cache (koneksinya ditutup), sesi ini langsung memakai koneksi baru
+st.session_state.store = store_tenant(tenant)
+if "tahun_awal" not in st.session_state:
+    st.session_state.tahun_awal = st.session_state.store.tahun_terakhir() or pd.Timestamp.now().year
+
+# Tab yang tidak dibuka tidak dijalankan, jadi widgetnya tidak dirender dan Streamlit
+# membuang nilainya di akhir rerun. Nilai yang sudah ada ditulis ulang ke session_state
+# (dan nilai awal diisi di sini) supaya pilihan periode dll. bertahan saat pindah tab.
+nilai_awal_widget = {
+    "bulan_jurnal": PILIHAN_BULAN[0], "tahun_jurnal": st.session_state.tahun_awal,
+    "bulan_neraca": PILIHAN_BULAN[0], "tahun_neraca": 2025,
+    "bulan_laporan": PILIHAN_BULAN[0], "tahun_laporan": 2025,
+    "ukuran_halaman": 50, "jumlah_periode_komparatif": 3,
+}
+for kunci in (*nilai_awal_widget, "cari_jurnal", "urut_jurnal", "turun_jurnal", "batas_riwayat",
+              "subtab_laporan", "mode_komparatif"):
+    if kunci in st.session_state:
+        st.session_state[kunci] = st.session_state[kunci]
+    elif kunci in nilai_awal_widget:
+        st.session_state[kunci] = nilai_awal_widget[kunci]
+
 if "data" not in st.session_state:
     st.session_state.data = init_dataframe(["Tanggal", "Keterangan", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"])
 
@@ -69,178 +211,174 @@ if "arus_kas_pendanaan" not in st.session_state:
 if "buku_besar" not in st.session_state:
     st.session_state.buku_besar = {}
 
-# === Fungsi format rupiah aman ===
-def format_rupiah(x):
-    try:
-        x = float(x)
-        if x < 0:
-            return f"({abs(x):,.0f})".replace(",", ".")
-        return f"{x:,.0f}".replace(",", ".")
-    except (ValueError, TypeError):
-        return ""
+# Cache PDF per BUMDes (dibagi antar sesi): PDF hanya dibuat saat tombol download diklik
+st.session_state.cache_pdf = cache_pdf_tenant(tenant)
 
 # === Fungsi AgGrid ===
-def create_aggrid(df, key_suffix, height=400):
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_default_column(editable=True, resizable=True)
-    gb.configure_grid_options(stopEditingWhenCellsLoseFocus=True)
-    
-    for col in df.columns:
-        if "(Rp)" in col:
-            gb.configure_column(col, type=["numericColumn"], valueFormatter="value ? value.toLocaleString() : ''")
-    
-    grid_options = gb.build()
-    
-    grid_response = AgGrid(
-        df,
-        gridOptions=grid_options,
-        update_mode=GridUpdateMode.VALUE_CHANGED,
-        fit_columns_on_grid_load=True,
-        allow_unsafe_jscode=True,
-        enable_enterprise_modules=False,
-        theme="streamlit",
-        height=height,
-        key=f"aggrid_{key_suffix}",
-        reload_data=False
-    )
-    
-    # Konversi kolom numerik ke float
-    for col in df.columns:
-        if "(Rp)" in col:
-            grid_response["data"][col] = pd.to_numeric(grid_response["data"][col], errors="coerce").fillna(0)
-    # Konversi tanggal aman
-    if "Tanggal" in grid_response["data"]:
-        grid_response["data"]["Tanggal"] = grid_response["data"]["Tanggal"].apply(lambda x: "" if pd.isna(x) else str(x))
-    
-    return pd.DataFrame(grid_response["data"])
-
-# === Fungsi untuk membuat buku besar ===
-# === Fungsi untuk membuat buku besar ===
-def buat_buku_besar():
-    df = st.session_state.data.copy()
-    for col in ["Debit (Rp)", "Kredit (Rp)"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
-
-    buku_besar = {}
-    for _, row in df.iterrows():
-        ref = str(row.get("Ref", "")).strip()
-        nama_akun_jurnal = str(row.get("Akun", "")).strip()
-
-        if not ref:
-            # Kalau ref kosong, pakai nama akun sebagai key (fallback)
-            key = nama_akun_jurnal if nama_akun_jurnal else f"Akun Tanpa Ref {_}"
+def create_aggrid(df, key_suffix, height=400, reload_data=False, **opsi):
+    # Kembalikan change set (Perubahan) terhadap df, bukan frame penuh: konversi tipe
+    # (Rp → angka, Tanggal → teks) dan penyalinan hanya untuk sel yang berubah
+    with profil.ukur(f"grid {str(key_suffix).split('_')[0]}", df):
+        grid_response = AgGrid(
+            df,
+            gridOptions=grid_options(df, **opsi),
+            update_mode=GridUpdateMode.VALUE_CHANGED,
+            # Urutan baris seperti yang dikirim: sort / filter header di grid tidak
+            # boleh terbaca sebagai perubahan (Perubahan membandingkan per posisi)
+            data_return_mode=DataReturnMode.AS_INPUT,
+            fit_columns_on_grid_load=True,
+            allow_unsafe_jscode=True,
+            enable_enterprise_modules=False,
+            theme="streamlit",
+            height=height,
+            key=f"aggrid_{key_suffix}",
+            reload_data=reload_data
+        )
+        perubahan = Perubahan(df, grid_response["data"], grid_response.selected_rows)
+    return perubahan
+
+def tombol_hapus_terpilih(nama, perubahan, baris_awal, counter, key):
+    # Hapus massal lewat seleksi checkbox grid: satu tombol berapa pun jumlah barisnya.
+    # Baris terpilih dibuang sekaligus lalu grid di-remount (counter) supaya centangnya hilang.
+    if not len(perubahan.dipilih):
+        st.caption("☑️ Centang baris di tabel untuk menghapus beberapa sekaligus.")
+        return False
+    if not st.button(f"🗑️ Hapus {len(perubahan.dipilih)} Baris Terpilih", key=key, use_container_width=True):
+        return False
+    df = perubahan.hapus_dipilih(st.session_state[nama])
+    st.session_state[nama] = df if len(df) else pd.DataFrame([baris_awal])
+    st.session_state[counter] += 1
+    return True
+
+# === Jurnal per periode ===
+def indeks_jurnal():
+    # Indeks tanggal dibangun ulang hanya kalau objek jurnal berganti (ada edit)
+    cache = st.session_state.get("indeks_tanggal")
+    if cache is None or cache[0] is not st.session_state.data:
+        cache = (st.session_state.data, IndeksTanggal(st.session_state.data))
+        st.session_state.indeks_tanggal = cache
+    return cache[1]
+
+def jurnal_periode(bulan, tahun):
+    # Tahun yang sedang dimuat: binary search di memori; tahun lain: range query ke database.
+    # Potongan disimpan selama sumbernya sama (objek jurnal di memori / versi database),
+    # jadi objek yang sama dikembalikan dan buku besar periode itu tidak dibandingkan ulang.
+    cache = st.session_state.setdefault("jurnal_periode_cache", {})
+    periode = (str(bulan), int(tahun))
+    di_memori = int(tahun) == st.session_state.get("tahun_dimuat")
+    sumber = st.session_state.data if di_memori else st.session_state.store
+    versi = None if di_memori else sumber.versi
+    simpanan = cache.get(periode)
+    if simpanan is None or simpanan[0] is not sumber or simpanan[1] != versi:
+        if di_memori:
+            df = potong_periode(sumber, indeks_jurnal(), bulan, tahun)
         else:
-            key = ref
-
-        if key not in buku_besar:
-            # Nama akun diambil dari Jurnal Umum; kalau kosong, beri placeholder
-            buku_besar[key] = {
-                "nama_akun": nama_akun_jurnal if nama_akun_jurnal else "Tidak Ada Nama Akun",
-                "debit": 0.0,
-                "kredit": 0.0,
-                "transaksi": []
-            }
-
-        debit_val = float(row.get("Debit (Rp)", 0) or 0)
-        kredit_val = float(row.get("Kredit (Rp)", 0) or 0)
-        tanggal = "" if pd.isna(row.get("Tanggal", "")) else str(row.get("Tanggal", ""))
-        keterangan = str(row.get("Keterangan", "")).strip()
-
-        if debit_val > 0:
-            buku_besar[key]["transaksi"].append({
-                "tanggal": tanggal,
-                "keterangan": keterangan,
-                "debit": debit_val,
-                "kredit": 0.0
-            })
-            buku_besar[key]["debit"] += debit_val
-        if kredit_val > 0:
-            buku_besar[key]["transaksi"].append({
-                "tanggal": tanggal,
-                "keterangan": keterangan,
-                "debit": 0.0,
-                "kredit": kredit_val
-            })
-            buku_besar[key]["kredit"] += kredit_val
-
-    return buku_besar
-
-import json
-
-
-def _signature_buku_besar(bb: dict) -> str:
-    # Buat tanda tangan sederhana untuk deteksi perubahan
-    items = []
-    for ref, data in (bb or {}).items():
-        items.append({
-            "ref": str(ref),
-            "nama": data.get("nama_akun", ""),
-            "debit": round(float(data.get("debit", 0) or 0), 2),
-            "kredit": round(float(data.get("kredit", 0) or 0), 2),
-        })
-    items.sort(key=lambda x: x["ref"])
-    return json.dumps(items, sort_keys=True)
+            df = sumber.muat_bulan(bulan, tahun)
+        simpanan = cache[periode] = (sumber, versi, df)
+        while len(cache) > 6:
+            cache.pop(next(iter(cache)))
+    return simpanan[2]
 
-def sync_neraca_from_bukubesar(non_destructive: bool = True):
-    bb = st.session_state.get("buku_besar", {})
-    if not bb:
-        st.session_state.neraca_saldo = pd.DataFrame(columns=["Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"])
+# === Fungsi untuk membuat buku besar ===
+def buat_buku_besar(bulan, tahun):
+    # Posting kolumnar (lihat buku_besar.py), struktur hasil sama seperti sebelumnya.
+    # Buku besar disimpan per periode; kalau jurnal periode itu berubah, hanya baris
+    # yang berbeda dari snapshot terakhir yang dibalik dan diposting ulang.
+    cache = st.session_state.setdefault("buku_besar_periode", {})
+    periode = (str(bulan), int(tahun))
+    df = jurnal_periode(bulan, tahun)
+    snapshot, bb = cache.pop(periode, (None, None))
+    if snapshot is not df:
+        with profil.ukur("buku besar", df):
+            bb = perbarui_buku_besar(bb, snapshot, df, st.session_state.store.bagan_akun().saldo_ref)
+    cache[periode] = (df, bb)
+    while len(cache) > 6:
+        cache.pop(next(iter(cache)))
+    return bb
+
+def sync_neraca_from_bukubesar(non_destructive: bool = True, bb=None):
+    if bb is None:
+        bb = st.session_state.get("buku_besar", {})
+    st.session_state.neraca_saldo = neraca_saldo_dari_bukubesar(bb, non_destructive)
+
+# === Dependensi antar tab ===
+# Tab hanya dijalankan saat dibuka, jadi data turunan (Neraca Saldo, tabel laporan) tidak
+# dihitung saat sumbernya diedit, tapi saat tab yang memakainya dibuka. Sumber yang dipakai
+# lintas tab punya nomor versi: penulis menaikkannya (ubah_data), pembaca menyimpan versi
+# yang terakhir dipakai dan menghitung ulang hanya kalau versi itu tertinggal.
+def ubah_data(sumber):
+    versi = st.session_state.setdefault("versi_data", {})
+    versi[sumber] = versi.get(sumber, 0) + 1
+
+def versi_data(sumber):
+    return st.session_state.get("versi_data", {}).get(sumber, 0)
+
+def periode_widget(tab):
+    # (bulan, tahun) terpilih di tab lain; dibaca dari session_state karena tab itu
+    # belum tentu dijalankan pada rerun ini
+    return st.session_state[f"bulan_{tab}"][0], st.session_state[f"tahun_{tab}"]
+
+def sinkron_neraca_saldo(bulan, tahun):
+    # Neraca Saldo (Tab 3) mengikuti jurnal. Buku besar periodenya hanya diperiksa kalau
+    # jurnal atau periode berubah sejak pemeriksaan terakhir; tabel disinkron ulang (dan
+    # grid di-remount) hanya kalau saldonya memang berubah, jadi edit manual tetap bertahan.
+    periode = (bulan, int(tahun))
+    if st.session_state.get("neraca_diperiksa") == (periode, versi_data("jurnal")):
         return
-
-    # Inisialisasi DataFrame Neraca Saldo
-    ns = pd.DataFrame(columns=["Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"])
-
-    rows = []
-    for key, data in bb.items():
-        ref = key if key != data["nama_akun"] else ""  # kalau key sama dengan nama akun, berarti ref kosong
-        nama_akun = data["nama_akun"] if data["nama_akun"] else key
-        debit = float(data.get("debit", 0) or 0)
-        kredit = float(data.get("kredit", 0) or 0)
-
-        rows.append({
-            "Ref": ref,
-            "Akun": nama_akun,
-            "Debit (Rp)": debit,
-            "Kredit (Rp)": kredit
-        })
-
-    ns = pd.DataFrame(rows)
-
-    if not non_destructive:
-        # Hanya tampilkan Ref yang ada di buku besar
-        refs_bb = set(str(k) for k in bb.keys())
-        ns = ns[ns["Ref"].astype(str).isin(refs_bb)]
-
-    # Reset index
-    st.session_state.neraca_saldo = ns.reset_index(drop=True)
+    bb_neraca = buat_buku_besar(bulan, tahun)
+    signature_neraca = (*periode, signature_buku_besar(bb_neraca))
+    if st.session_state.get("signature_neraca") != signature_neraca:
+        sync_neraca_from_bukubesar(non_destructive=True, bb=bb_neraca)
+        st.session_state.signature_neraca = signature_neraca
+        st.session_state.neraca_refresh_counter = st.session_state.get("neraca_refresh_counter", 0) + 1
+        ubah_data("neraca_saldo")
+    st.session_state.neraca_diperiksa = (periode, versi_data("jurnal"))
+
+def laba_rugi_terkini():
+    # Dipakai sub-tab Laba/Rugi dan Neraca (laba bersih); dihitung ulang hanya kalau tabel
+    # Pendapatan atau Beban berganti (setiap edit membuat frame baru)
+    pendapatan, beban = st.session_state.pendapatan, st.session_state.beban
+    cache = st.session_state.get("hasil_laba_rugi")
+    if cache is None or cache[0] is not pendapatan or cache[1] is not beban:
+        cache = (pendapatan, beban, *laba_rugi(pendapatan, beban))
+        st.session_state.hasil_laba_rugi = cache
+    return cache[2], cache[3]
+
+# === Fragmen tab ===
+def fragmen(nama):
+    # Isi tab / sub-tab sebagai st.fragment: interaksi widget di dalamnya hanya menjalankan
+    # ulang fragmen itu. Rerun fragmen tidak melewati bagian atas dan akhir script, jadi
+    # diukur dengan Profiler sendiri yang dikirim begitu fragmen selesai.
+    def dekorator(isi):
+        @st.fragment
+        @functools.wraps(isi)
+        def jalankan(*args):
+            global profil
+            rerun_fragmen = profil.terkirim
+            if rerun_fragmen:
+                profil = st.session_state.profil = Profiler(metrik_proses(), tenant=tenant)
+            try:
+                with profil.ukur(nama):
+                    isi(*args)
+            finally:
+                if rerun_fragmen:
+                    profil.selesai(f"rerun {nama}")
+        return jalankan
+    return dekorator
 
 # === Styling AgGrid ===
-st.markdown("""
-<style>
-.ag-theme-streamlit {
-    --ag-background-color: #F9FAFB;
-    --ag-odd-row-background-color: #FFFFFF;
-    --ag-header-background-color: #E9ECEF;
-    --ag-border-color: #DDDDDD;
-    --ag-header-foreground-color: #000000;
-    --ag-font-family: "Inter", system-ui, sans-serif;
-    --ag-font-size: 14px;
-    --ag-row-hover-color: #EEF6ED;
-    --ag-selected-row-background-color: #DDF0DC;
-    --ag-cell-horizontal-padding: 10px;
-    --ag-cell-vertical-padding: 6px;
-    border-radius: 8px;
-}
-</style>
-""", unsafe_allow_html=True)
+st.markdown(gaya_grid(), unsafe_allow_html=True)
 
 # === Tabs ===
-tab1, tab2, tab3, tab4 = st.tabs(["🧾 Jurnal Umum", "📚 Buku Besar", "💵 Neraca Saldo", "📊 Laporan Keuangan"])
+# Hanya tab yang dibuka yang dijalankan (isinya fragmen di bawah, dipanggil setelahnya)
+tab1, tab2, tab3, tab4 = st.tabs(["🧾 Jurnal Umum", "📚 Buku Besar", "💵 Neraca Saldo", "📊 Laporan Keuangan"],
+                                 key="tab_utama", on_change="rerun")
 
 # ========================================
 # TAB 1: JURNAL UMUM
 # ========================================
-with tab1:
+@fragmen("tab jurnal umum")
+def tab_jurnal_umum():
     st.header("🧾 Jurnal Umum")
     st.info("💡 Tekan Enter sekali untuk menyimpan perubahan otomatis.")
 
@@ -252,192 +390,182 @@ with tab1:
     with col1:
         bulan_selected = st.selectbox(
             "Pilih Bulan", 
-            options=[("01", "Januari"), ("02", "Februari"), ("03", "Maret"),
-                     ("04", "April"), ("05", "Mei"), ("06", "Juni"),
-                     ("07", "Juli"), ("08", "Agustus"), ("09", "September"),
-                     ("10", "Oktober"), ("11", "November"), ("12", "Desember")],
-            format_func=lambda x: x[1]
+            options=PILIHAN_BULAN,
+            format_func=lambda x: x[1],
+            key="bulan_jurnal"
         )[0]
     with col2:
-        tahun_selected = st.number_input("Tahun", min_value=2000, max_value=2100, value=pd.Timestamp.now().year, step=1)
+        tahun_selected = st.number_input(
+            "Tahun", min_value=2000, max_value=2100, step=1, key="tahun_jurnal"
+        )
+
+    # Muat working set (jurnal tahun terpilih) dari database, sekali per pergantian tahun.
+    # Working set hanya dipakai di server (buku besar, laporan); grid cukup satu halaman.
+    if st.session_state.get("tahun_dimuat") != tahun_selected:
+        st.session_state.data = st.session_state.store.muat_tahun(tahun_selected)
+        st.session_state.tahun_dimuat = tahun_selected
+        st.session_state.halaman_jurnal = 0
+        st.session_state.baris_kosong = 0
+        st.session_state.grid_key += 1
     
-    # Fungsi untuk menambah baris
+    # Fungsi untuk menambah baris: baris kosong ditaruh di halaman terakhir
     def add_journal_row():
-        new_row = pd.DataFrame({
-            "Tanggal": [""], 
-            "Keterangan": [""], 
-            "Ref": [""],
-            "Akun": [""], 
-            "Debit (Rp)": [0], 
-            "Kredit (Rp)": [0]
-        })
-        # Simpan data yang ada dulu dari AgGrid
-        #if 'grid_response' in st.session_state:
-            #st.session_state.data = st.session_state.grid_response['data']
-        # Tambah baris baru
-        st.session_state.data = pd.concat([st.session_state.data, new_row], ignore_index=True)
+        st.session_state.baris_kosong += 1
+        st.session_state.halaman_jurnal = -1
         st.session_state.grid_key += 1
     
     # Tombol tambah baris
     st.button("➕ Tambah Baris Jurnal", key="tambah_jurnal", on_click=add_journal_row)
+
+    # --- Impor massal dari CSV / Excel ---
+    with st.expander("📥 Impor Jurnal dari CSV / Excel", expanded=False):
+        st.caption("Kolom: Tanggal, Keterangan, Ref, Akun, Debit, Kredit (opsional: No Bukti). "
+                   "Voucher yang debit ≠ kredit atau berisi baris tidak valid ditolak utuh.")
+        file_impor = st.file_uploader("Pilih file", type=["csv", "xlsx"], key="file_impor")
+        if file_impor is not None and st.button("📥 Mulai Impor", key="mulai_impor"):
+            bar = st.progress(0.0)
+            laporan_tolak = io.StringIO()
+            hasil = impor_jurnal(
+                st.session_state.store, file_impor, laporan_tolak, nama_file=file_impor.name,
+                progres=lambda h: bar.progress(h.progres, text=f"{h.dibaca:,} baris dibaca · {h.diterima:,} diterima · {h.ditolak:,} ditolak"),
+                oleh=petugas,
+            )
+            st.session_state.hasil_impor = (hasil, laporan_tolak.getvalue())
+            # Muat ulang working set dari database
+            st.session_state.pop("tahun_dimuat", None)
+            ubah_data("jurnal")
+            st.rerun()
+        if "hasil_impor" in st.session_state:
+            hasil, laporan_tolak = st.session_state.hasil_impor
+            st.success(f"✅ {hasil.diterima:,} baris diimpor dari {hasil.dibaca:,} baris.")
+            if hasil.ditolak:
+                st.warning(f"⚠️ {hasil.ditolak:,} baris ditolak ({hasil.voucher_ditolak:,} voucher).")
+                st.download_button("📄 Download Laporan Baris Ditolak", data=laporan_tolak,
+                                   file_name="impor_ditolak.csv", mime="text/csv", key="download_tolak")
     
-    # Setup AgGrid
-    gb = GridOptionsBuilder.from_dataframe(st.session_state.data)
-    gb.configure_default_column(editable=True, resizable=True)
-    gb.configure_grid_options(stopEditingWhenCellsLoseFocus=True)
-    
-    for col in st.session_state.data.columns:
-        if "(Rp)" in col:
-            gb.configure_column(col, type=["numericColumn"], valueFormatter="value ? value.toLocaleString() : ''")
-    
-    grid_options = gb.build()
-    
-    # Render AgGrid
-    grid_response = AgGrid(
-        st.session_state.data,
-        gridOptions=grid_options,
-        update_mode=GridUpdateMode.VALUE_CHANGED,
-        fit_columns_on_grid_load=True,
-        allow_unsafe_jscode=True,
-        enable_enterprise_modules=False,
-        theme="streamlit",
-        height=320,
-        key=f"jurnal_grid_{st.session_state.grid_key}",
-        reload_data=True
+    # --- Halaman grid: cari, urutkan, ukuran halaman ---
+    def ke_halaman_awal():
+        st.session_state.halaman_jurnal = 0
+
+    col_cari, col_urut, col_arah, col_ukuran = st.columns([4, 2, 1, 1])
+    with col_cari:
+        cari_jurnal = st.text_input("🔍 Cari (tanggal, keterangan, ref, akun)", key="cari_jurnal", on_change=ke_halaman_awal)
+    with col_urut:
+        urut_jurnal = st.selectbox("Urutkan", ["id", "Tanggal", "Keterangan", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"],
+                                   format_func=lambda x: "Urutan input" if x == "id" else x, key="urut_jurnal", on_change=ke_halaman_awal)
+    with col_arah:
+        turun_jurnal = st.toggle("Menurun", key="turun_jurnal", on_change=ke_halaman_awal)
+    with col_ukuran:
+        ukuran_halaman = st.selectbox("Baris/halaman", [25, 50, 100, 200], key="ukuran_halaman", on_change=ke_halaman_awal)
+
+    total_baris = st.session_state.store.jumlah_baris(tahun_selected, cari_jurnal)
+    jumlah_halaman = max(1, -(-total_baris // ukuran_halaman))
+    if st.session_state.halaman_jurnal < 0 or st.session_state.halaman_jurnal >= jumlah_halaman:
+        st.session_state.halaman_jurnal = jumlah_halaman - 1
+
+    def geser_halaman(langkah):
+        st.session_state.halaman_jurnal = min(max(st.session_state.halaman_jurnal + langkah, 0), jumlah_halaman - 1)
+
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    col_prev.button("◀ Sebelumnya", key="halaman_prev", on_click=geser_halaman, args=(-1,), use_container_width=True,
+                    disabled=st.session_state.halaman_jurnal == 0)
+    col_info.caption(f"Halaman {st.session_state.halaman_jurnal + 1} dari {jumlah_halaman} · {total_baris:,} baris")
+    col_next.button("Berikutnya ▶", key="halaman_next", on_click=geser_halaman, args=(1,), use_container_width=True,
+                    disabled=st.session_state.halaman_jurnal >= jumlah_halaman - 1)
+
+    # Hanya halaman ini (+ baris kosong baru) yang dikirim ke grid
+    df_halaman = st.session_state.store.halaman(
+        tahun_selected, st.session_state.halaman_jurnal, ukuran_halaman, cari_jurnal, urut_jurnal, turun_jurnal
+    )
+    kosong = st.session_state.baris_kosong or (0 if total_baris else 1)
+    if kosong:
+        baris_kosong = pd.DataFrame({col: [""] * kosong for col in ["Tanggal", "Keterangan", "Ref", "Akun"]})
+        baris_kosong["Debit (Rp)"] = baris_kosong["Kredit (Rp)"] = 0
+        baris_kosong["id"] = pd.array([pd.NA] * kosong, dtype="Int64")
+        df_halaman = pd.concat([df_halaman, baris_kosong], ignore_index=True)
+
+    if "pesan_kunci" in st.session_state:
+        st.error(f"🔒 {st.session_state.pop('pesan_kunci')}")
+
+    # Render AgGrid (key ikut spesifikasi halaman supaya grid dimuat ulang saat berpindah)
+    spesifikasi = (st.session_state.halaman_jurnal, ukuran_halaman, cari_jurnal, urut_jurnal, turun_jurnal)
+    perubahan_jurnal = create_aggrid(
+        df_halaman, f"jurnal_{st.session_state.grid_key}_{hash(spesifikasi)}", height=320, reload_data=True
     )
     
-    # Simpan data dari grid ke session state
-    st.session_state.data = grid_response['data']
-    
-    # Tampilkan data yang sudah difilter
-    df_clean = st.session_state.data[st.session_state.data["Keterangan"].astype(str).str.strip() != ""]
+    # Edit di halaman → patch baris: hanya baris yang berubah ditulis ke database,
+    # lalu working set ditambal tanpa memuat ulang setahun penuh
+    try:
+        with profil.ukur("sinkron jurnal", df_halaman):
+            hasil_halaman = st.session_state.store.sinkron(df_halaman, perubahan_jurnal, oleh=petugas)
+    except PeriodeTerkunci as e:
+        # Edit menyentuh periode yang sudah tutup buku: tidak ada yang ditulis,
+        # grid dimuat ulang dari database
+        st.session_state.pesan_kunci = str(e)
+        st.session_state.grid_key += 1
+        st.rerun()
+    if hasil_halaman is not df_halaman:
+        st.session_state.data = terapkan_halaman(st.session_state.data, df_halaman, hasil_halaman)
+        ubah_data("jurnal")
+        baris_tanpa_id = int(hasil_halaman["id"].isna().sum())
+        if baris_tanpa_id != kosong or not hasil_halaman["id"].dropna().equals(df_halaman["id"].dropna()):
+            # Ada baris baru/terhapus: id di grid berubah, muat ulang halaman
+            st.session_state.baris_kosong = baris_tanpa_id
+            st.session_state.grid_key += 1
+            st.rerun()
     
-    if not df_clean.empty:
-        total_debit = df_clean["Debit (Rp)"].sum()
-        total_kredit = df_clean["Kredit (Rp)"].sum()
-        total_row = pd.DataFrame({
-            "Tanggal": [""],
-            "Keterangan": ["TOTAL"],
-            "Ref": [""],
-            "Akun": [""],
-            "Debit (Rp)": [total_debit],
-            "Kredit (Rp)": [total_kredit],
-        })
-        df_final = pd.concat([df_clean, total_row], ignore_index=True)
+    # --- Riwayat perubahan (log audit, hanya bisa ditambah) ---
+    with st.expander("🕘 Riwayat Perubahan Jurnal", expanded=False):
+        batas_riwayat = st.selectbox("Tampilkan", [50, 200, 1000], key="batas_riwayat",
+                                     format_func=lambda n: f"{n} perubahan terakhir")
+        df_riwayat = st.session_state.store.riwayat(batas_riwayat)
+        if len(df_riwayat):
+            st.dataframe(
+                df_riwayat.style.format({"Debit (Rp)": format_rupiah, "Kredit (Rp)": format_rupiah}),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.download_button("📄 Download Riwayat (CSV)", data=df_riwayat.to_csv(index=False),
+                               file_name="riwayat_jurnal.csv", mime="text/csv", key="download_riwayat")
+        else:
+            st.caption("Belum ada perubahan tercatat.")
+
+    # --- Pemeriksaan jurnal terhadap log (admin): pulihkan tabel jurnal dari checkpoint + log ---
+    if PANEL_ADMIN:
+        with st.expander("🩺 Pemeriksaan Jurnal", expanded=False):
+            if st.session_state.store.periksa():
+                st.caption("✅ Tabel jurnal sesuai dengan log perubahan.")
+            else:
+                st.warning("⚠️ Tabel jurnal tidak sesuai dengan log perubahan. Pulihkan untuk menulis ulang "
+                           f"jurnal dari checkpoint + log; pemulihan dicatat atas nama **{petugas}**.")
+                if st.button("🩹 Pulihkan Jurnal dari Log", key="pulihkan_jurnal"):
+                    st.session_state.store.pulihkan(oleh=petugas)
+                    # Muat ulang working set dari database
+                    st.session_state.pop("tahun_dimuat", None)
+                    ubah_data("jurnal")
+                    st.rerun()
 
+    # Tampilkan data periode terpilih yang sudah difilter
+    df_periode = jurnal_periode(bulan_selected, tahun_selected)
+    if indeks_jurnal().jumlah_tanpa_tanggal:
+        st.caption(f"⚠️ {indeks_jurnal().jumlah_tanpa_tanggal} baris belum punya tanggal valid dan tidak masuk periode mana pun.")
+    df_final = jurnal_final(df_periode)
+    
+    if df_final is not None:
         st.write("### 📊 Hasil Jurnal")
         df_final_display = df_final.copy()
         df_final_display.index = range(1, len(df_final_display)+1)
         df_final_display.index.name = "No"
-        st.dataframe(df_final_display.style.format({
-            "Debit (Rp)": format_rupiah,
-            "Kredit (Rp)": format_rupiah
-        }))
+        with profil.ukur("styler jurnal", df_final_display):
+            st.dataframe(df_final_display.style.format({
+                "Debit (Rp)": format_rupiah,
+                "Kredit (Rp)": format_rupiah
+            }))
 
         # --- PDF ---
-        def buat_pdf(df, bulan, tahun):
-            import calendar
-            from fpdf import FPDF
-            import tempfile
-        
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_auto_page_break(auto=False)  # handle manual
-            pdf.set_font("Arial", size=12)
-        
-            # Nama bulan
-            bulan_dict = {
-                1: "Januari", 2: "Februari", 3: "Maret", 4: "April", 5: "Mei",
-                6: "Juni", 7: "Juli", 8: "Agustus", 9: "September",
-                10: "Oktober", 11: "November", 12: "Desember"
-            }
-            try:
-                bulan_nama = bulan_dict.get(int(bulan), calendar.month_name[int(bulan)])
-            except:
-                bulan_nama = "Unknown"
-        
-            # Judul
-            pdf.cell(0, 10, txt=f"Jurnal Umum BUMDes - {bulan_nama} {tahun}", ln=True, align="C")
-            pdf.ln(8)
-        
-            # Lebar halaman efektif (A4 = 210 mm, margin default 10 mm)
-            page_width = 210 - 20  # margin kiri+kanan 10 mm
-            # Tentukan proporsi kolom, pastikan total ≤ page_width
-            col_widths = [20, 60, 15, 25, 35, 35]  # total = 190 mm, aman
-            headers = ["Tanggal", "Keterangan", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
-            line_height = 6
-            align = ["C", "L", "C", "C", "R", "R"]
-        
-            def print_header():
-                pdf.set_font("Arial", "B", 10)
-                for i, header in enumerate(headers):
-                    pdf.cell(col_widths[i], line_height, header, border=1, align="C")
-                pdf.ln(line_height)
-                pdf.set_font("Arial", "", 9)
-        
-            print_header()
-        
-            def calc_lines(text, col_width):
-                text = str(text)
-                if not text:
-                    return 1
-                words = text.split()
-                lines = 1
-                line_width = 0
-                for word in words:
-                    w = pdf.get_string_width(word + " ")
-                    line_width += w
-                    if line_width > col_width:
-                        lines += 1
-                        line_width = w
-                return lines
-        
-            for _, row in df.iterrows():
-                # Hitung max baris untuk semua kolom
-                max_lines = max([calc_lines(row[col], col_widths[i]) for i, col in enumerate(headers)])
-        
-                # Cek page break
-                if pdf.get_y() + (line_height * max_lines) > pdf.page_break_trigger:
-                    pdf.add_page()
-                    print_header()
-        
-                y_start = pdf.get_y()
-                x_start = pdf.get_x()
-        
-                # Nilai kolom
-                col_values = [
-                    str(row["Tanggal"]),
-                    str(row["Keterangan"]),
-                    str(row["Ref"]),
-                    str(row["Akun"]),
-                    f"{row['Debit (Rp)']:,.0f}".replace(",", ".") if pd.notna(row['Debit (Rp)']) else "0",
-                    f"{row['Kredit (Rp)']:,.0f}".replace(",", ".") if pd.notna(row['Kredit (Rp)']) else "0"
-                ]
-        
-                for i, value in enumerate(col_values):
-                    x_current = pdf.get_x()
-                    pdf.multi_cell(col_widths[i], line_height, value, border=1, align=align[i])
-                    # reset posisi X ke kolom berikutnya, tetap di baris yang sama
-                    pdf.set_xy(x_current + col_widths[i], y_start)
-        
-                pdf.ln(line_height * max_lines)
-        
-            # Footer
-            pdf.ln(5)
-            pdf.set_font("Arial", 'I', 8)
-            pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
-        
-            # Simpan ke temp file dan kembalikan bytes
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                pdf.output(tmp.name)
-                tmp.seek(0)
-                return tmp.read()
-
-
-        pdf_data = buat_pdf(df_final, bulan_selected, tahun_selected)
         st.download_button(
             "📥 Download PDF",
-            data=pdf_data,
+            data=st.session_state.cache_pdf.pdf_saat_diminta(buat_pdf, df_final, bulan_selected, tahun_selected),
             file_name=f"jurnal_umum_{bulan_selected}_{tahun_selected}.pdf",
             mime="application/pdf",
             use_container_width=True
@@ -449,11 +577,15 @@ with tab1:
 # ========================================
 # TAB 2: BUKU BESAR
 # ========================================
-with tab2:
+@fragmen("tab buku besar")
+def tab_buku_besar():
     st.header("📚 Buku Besar")
+    bulan_selected, tahun_selected = periode_widget("jurnal")
     
-    # Perbarui buku besar berdasarkan jurnal
-    st.session_state.buku_besar = buat_buku_besar()
+    st.subheader(f"Periode: {bulan_dict[bulan_selected]} {tahun_selected}")
+
+    # Perbarui buku besar periode terpilih (Tab Jurnal Umum) berdasarkan jurnal
+    st.session_state.buku_besar = buat_buku_besar(bulan_selected, tahun_selected)
     
     if not st.session_state.buku_besar:
         st.info("ℹ️ Belum ada data untuk buku besar. Silakan isi Jurnal Umum terlebih dahulu.")
@@ -474,80 +606,36 @@ with tab2:
             st.metric("Total Debit", format_rupiah(akun_data["debit"]))
         with col2:
             st.metric("Total Kredit", format_rupiah(akun_data["kredit"]))
+        with col3:
+            saldo_akhir = akun_data["debit"] - akun_data["kredit"]
+            if akun_data.get("saldo_normal") == "kredit":
+                saldo_akhir = -saldo_akhir
+            st.metric(f"Saldo Akhir ({akun_data.get('saldo_normal', 'debit').title()})", format_rupiah(saldo_akhir))
 
         # Tabel transaksi
         if akun_data["transaksi"]:
-            df_transaksi = pd.DataFrame(akun_data["transaksi"])
+            df_transaksi = frame_transaksi(akun_data["transaksi"])
             st.write(f"### Transaksi Akun: {akun_no} - {akun_data['nama_akun']}")
 
             df_transaksi_display = df_transaksi.copy()
             df_transaksi_display.index = range(1, len(df_transaksi_display) + 1)
             df_transaksi_display.index.name = "No"
 
-            st.dataframe(df_transaksi_display.style.format({
-                "debit": format_rupiah,
-                "kredit": format_rupiah
-            }))
+            with profil.ukur("styler buku besar", df_transaksi_display):
+                st.dataframe(df_transaksi_display.style.format({
+                    "debit": format_rupiah,
+                    "kredit": format_rupiah,
+                    "saldo": format_rupiah
+                }))
 
             # PDF semua akun
-            def buat_pdf_buku_besar(buku_besar):
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_auto_page_break(auto=True, margin=10)
-
-                pdf.set_font("Arial", 'B', 14)
-                pdf.cell(0, 10, txt="Buku Besar Semua Akun", ln=True, align="C")
-                pdf.ln(5)
-
-                for akun_no, akun_data in buku_besar.items():
-                    # Judul akun
-                    pdf.set_font("Arial", 'B', 12)
-                    pdf.cell(0, 8, txt=f"{akun_no} - {akun_data['nama_akun']}", ln=True)
-                    
-                    # Total debit/kredit
-                    pdf.set_font("Arial", '', 10)
-                    pdf.cell(0, 6, txt=f"Total Debit  : {format_rupiah(akun_data['debit'])}", ln=True)
-                    pdf.cell(0, 6, txt=f"Total Kredit : {format_rupiah(akun_data['kredit'])}", ln=True)
-                    pdf.ln(2)
-
-                    # Header tabel transaksi
-                    pdf.set_font("Arial", 'B', 10)
-                    col_widths = [25, 60, 50, 50]
-                    headers = ["Tanggal", "Keterangan", "Debit (Rp)", "Kredit (Rp)"]
-                    for i, header in enumerate(headers):
-                        pdf.cell(col_widths[i], 8, header, border=1, align="C")
-                    pdf.ln()
-
-                    # Isi tabel transaksi
-                    pdf.set_font("Arial", '', 9)
-                    for trx in akun_data.get("transaksi", []):
-                        pdf.cell(col_widths[0], 8, str(trx["tanggal"]), border=1, align="C")
-
-                        ket = str(trx["keterangan"])
-                        if len(ket) > 30:
-                            ket = ket[:27] + "..."
-                        pdf.cell(col_widths[1], 8, ket, border=1, align="L")
-
-                        pdf.cell(col_widths[2], 8, format_rupiah(trx["debit"]), border=1, align="R")
-                        pdf.cell(col_widths[3], 8, format_rupiah(trx["kredit"]), border=1, align="R")
-                        pdf.ln()
-
-                    pdf.ln(5)  # Jeda antar akun
-
-                # Footer
-                pdf.set_font("Arial", 'I', 8)
-                pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
-
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    pdf.output(tmp.name)
-                    tmp.seek(0)
-                    return tmp.read()
-
-            pdf_semua = buat_pdf_buku_besar(st.session_state.buku_besar)
             st.download_button(
                 "📥 Download PDF Buku Besar",
-                data=pdf_semua,
-                file_name="buku_besar.pdf",
+                data=st.session_state.cache_pdf.pdf_saat_diminta(
+                    buat_pdf_buku_besar, st.session_state.buku_besar,
+                    sumber=jurnal_periode(bulan_selected, tahun_selected)
+                ),
+                file_name=f"buku_besar_{bulan_selected}_{tahun_selected}.pdf",
                 mime="application/pdf",
                 use_container_width=True
             )
@@ -558,30 +646,22 @@ with tab2:
 # ========================================
 # TAB 3: NERACA SALDO (REVISI LENGKAP)
 # ========================================
-with tab3:
+@fragmen("tab neraca saldo")
+def tab_neraca_saldo():
     st.header("💵 Neraca Saldo BUMDes")
     
     # --- Selector Periode ---
     col1, col2 = st.columns(2)
-    bulan_dict = {
-        "01": "Januari", "02": "Februari", "03": "Maret",
-        "04": "April", "05": "Mei", "06": "Juni",
-        "07": "Juli", "08": "Agustus", "09": "September",
-        "10": "Oktober", "11": "November", "12": "Desember"
-    }
     with col1:
         bulan_neraca = st.selectbox(
             "Pilih Bulan", 
-            options=[("01", "Januari"), ("02", "Februari"), ("03", "Maret"),
-                     ("04", "April"), ("05", "Mei"), ("06", "Juni"),
-                     ("07", "Juli"), ("08", "Agustus"), ("09", "September"),
-                     ("10", "Oktober"), ("11", "November"), ("12", "Desember")],
+            options=PILIHAN_BULAN,
             format_func=lambda x: x[1],
             key="bulan_neraca"
         )[0]
     with col2:
         tahun_neraca = st.number_input(
-            "Tahun", min_value=2000, max_value=2100, value=2025, step=1, key="tahun_neraca"
+            "Tahun", min_value=2000, max_value=2100, step=1, key="tahun_neraca"
         )
     st.subheader(f"Periode: {bulan_dict[bulan_neraca]} {tahun_neraca}")
 
@@ -592,12 +672,8 @@ with tab3:
     if "neraca_refresh_counter" not in st.session_state:
         st.session_state.neraca_refresh_counter = 0
 
-    # 1) Pastikan buku_besar ada. Kalau Anda sudah build buku_besar di Tab 1, baris ini optional:
-    if "buku_besar" not in st.session_state:
-        st.session_state.buku_besar = buat_buku_besar()
-
-    # 2) AUTO SYNC SETIAP RERUN (tanpa signature, paling simpel dan pasti otomatis)
-    sync_neraca_from_bukubesar(non_destructive=True)
+    # AUTO SYNC dari buku besar periode Neraca Saldo (bisa berbeda dari periode Tab 1)
+    sinkron_neraca_saldo(bulan_neraca, tahun_neraca)
 
     # Tombol kontrol
     col1, col2, col3 = st.columns(3)
@@ -607,6 +683,7 @@ with tab3:
             new_row = pd.DataFrame([{"Ref": "", "Akun": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
             st.session_state.neraca_saldo = pd.concat([st.session_state.neraca_saldo, new_row], ignore_index=True)
             st.session_state.neraca_refresh_counter += 1
+            ubah_data("neraca_saldo")
             st.rerun()
     
     with col2:
@@ -620,6 +697,7 @@ with tab3:
             ])
             st.session_state.neraca_saldo = pd.concat([st.session_state.neraca_saldo, new_rows], ignore_index=True)
             st.session_state.neraca_refresh_counter += 1
+            ubah_data("neraca_saldo")
             st.rerun()
     
     with col3:
@@ -633,6 +711,7 @@ with tab3:
                     {"Ref": "", "Akun": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}
                 ])
             st.session_state.neraca_refresh_counter += 1
+            ubah_data("neraca_saldo")
             st.rerun()
 
     # Info counter
@@ -640,112 +719,34 @@ with tab3:
     filled_rows = len(st.session_state.neraca_saldo[st.session_state.neraca_saldo["Akun"].astype(str).str.strip() != ""])
     #st.caption(f"📊 Total Baris: {total_rows} | Terisi: {filled_rows} | Kosong: {total_rows - filled_rows}")
 
-    # --- Sistem Penghapusan dengan Checkbox ---
-    df_terisi = st.session_state.neraca_saldo[st.session_state.neraca_saldo["Akun"].astype(str).str.strip() != ""]
-    
-    if len(df_terisi) > 0:
-        with st.expander("🗑️ Hapus Baris Tertentu", expanded=False):
-            st.write("**Pilih baris yang ingin dihapus:**")
-            
-            rows_to_delete = []
-            
-            for idx in df_terisi.index:
-                row = df_terisi.loc[idx]
-                col_check, col_info = st.columns([1, 9])
-                
-                with col_check:
-                    if st.checkbox("", key=f"check_del_{idx}_{st.session_state.neraca_refresh_counter}"):
-                        rows_to_delete.append(idx)
-                
-                with col_info:
-                    st.text(f"Ref: {row['Ref']} | {row['Akun']} | Debit: {format_rupiah(row['Debit (Rp)'])} | Kredit: {format_rupiah(row['Kredit (Rp)'])}")
-            
-            if rows_to_delete:
-                if st.button(f"🗑️ Hapus {len(rows_to_delete)} Baris", key="confirm_delete", use_container_width=True):
-                    st.session_state.neraca_saldo = st.session_state.neraca_saldo.drop(rows_to_delete).reset_index(drop=True)
-                    
-                    if len(st.session_state.neraca_saldo) == 0:
-                        st.session_state.neraca_saldo = pd.DataFrame([
-                            {"Ref": "", "Akun": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}
-                        ])
-                    
-                    st.session_state.neraca_refresh_counter += 1
-                    st.success("✅ Baris berhasil dihapus!")
-                    st.rerun()
-
     st.markdown("---")
 
     # --- AgGrid dengan Dropdown Akun dari Buku Besar ---
     aggrid_key = f"neraca_{st.session_state.neraca_refresh_counter}"
     
-    # Ambil daftar akun dari Buku Besar (SAFE)
-    daftar_akun_values = []
-    
-    if "buku_besar" in st.session_state and st.session_state.buku_besar:
-        if isinstance(st.session_state.buku_besar, dict):
-            for akun_no, akun_data in st.session_state.buku_besar.items():
-                if isinstance(akun_data, dict) and "nama_akun" in akun_data:
-                    daftar_akun_values.append(akun_data["nama_akun"])
-    
-    gb = GridOptionsBuilder.from_dataframe(st.session_state.neraca_saldo)
-    gb.configure_default_column(editable=True, resizable=True)
-    gb.configure_grid_options(stopEditingWhenCellsLoseFocus=False)
-    
-    # Dropdown untuk kolom Akun (dari Buku Besar)
-    if daftar_akun_values:
-        gb.configure_column(
-            "Akun",
-            editable=True,
-            cellEditor="agSelectCellEditor",
-            cellEditorParams={
-                "values": daftar_akun_values
-            }
-        )
-    
-    # Konfigurasi kolom angka
-    for col in st.session_state.neraca_saldo.columns:
-        if "(Rp)" in col:
-            gb.configure_column(col, type=["numericColumn"], valueFormatter="value ? value.toLocaleString() : ''")
+    # Daftar akun dari Bagan Akun (satu sumber resmi untuk dropdown)
+    daftar_akun_values = st.session_state.store.bagan_akun().daftar_nama()
     
-    grid_options = gb.build()
-
     df_neraca_for_grid = st.session_state.neraca_saldo.reset_index(drop=True)
     
-    grid_response = AgGrid(
-        df_neraca_for_grid,
-        gridOptions=grid_options,
-        update_mode=GridUpdateMode.VALUE_CHANGED,
-        fit_columns_on_grid_load=True,
-        allow_unsafe_jscode=True,
-        enable_enterprise_modules=False,
-        theme="streamlit",
-        height=300,
-        key=aggrid_key,
-        reload_data=True
+    # Dropdown kolom Akun dari Bagan Akun, kolom angka rata kanan
+    perubahan_neraca = create_aggrid(
+        df_neraca_for_grid, aggrid_key, height=300, reload_data=True,
+        stop_saat_blur=False, pilihan_akun=tuple(daftar_akun_values), pilih_baris=True,
     )
-    
-    new_neraca = pd.DataFrame(grid_response["data"])
-    if not new_neraca.equals(st.session_state.neraca_saldo):
-        st.session_state.neraca_saldo = new_neraca.copy()
-
-    # Filter data valid
-    df_neraca_clean = new_neraca[new_neraca["Akun"].astype(str).str.strip() != ""]
-
-    if not df_neraca_clean.empty:
-        total_debit = df_neraca_clean["Debit (Rp)"].sum()
-        total_kredit = df_neraca_clean["Kredit (Rp)"].sum()
-
-        total_row = pd.DataFrame({
-            "Ref": [""],
-            "Akun": ["Jumlah"],
-            "Debit (Rp)": [total_debit],
-            "Kredit (Rp)": [total_kredit]
-        })
-
-        df_neraca_final = pd.concat([df_neraca_clean, total_row], ignore_index=True)
-        df_neraca_final.index = range(1, len(df_neraca_final) + 1)
-        df_neraca_final.index.name = "No"
-
+    if perubahan_neraca:
+        st.session_state.neraca_saldo = perubahan_neraca.terapkan()
+        ubah_data("neraca_saldo")
+    if tombol_hapus_terpilih("neraca_saldo", perubahan_neraca, {"Ref": "", "Akun": "", "Debit (Rp)": 0, "Kredit (Rp)": 0},
+                             "neraca_refresh_counter", "confirm_delete"):
+        ubah_data("neraca_saldo")
+        st.rerun()
+    new_neraca = st.session_state.neraca_saldo
+
+    # Filter data valid + baris Jumlah
+    df_neraca_final = neraca_saldo_final(new_neraca)
+
+    if df_neraca_final is not None:
         st.write("### 📊 Hasil Neraca Saldo")
         st.dataframe(
             df_neraca_final.style.format({
@@ -756,88 +757,101 @@ with tab3:
         )
 
         # PDF Export
-        def buat_pdf_neraca(df, bulan, tahun):
-            pdf = FPDF()
-            pdf.add_page()
-            
-            pdf.set_font("Arial", 'B', 14)
-            pdf.cell(0, 10, txt="Neraca Saldo BUMDes", ln=True, align="C")
-            pdf.set_font("Arial", '', 12)
-            pdf.cell(0, 8, txt=f"Periode: {bulan_dict[bulan]} {tahun}", ln=True, align="C")
-            pdf.ln(5)
-
-            pdf.set_font("Arial", 'B', 10)
-            col_widths = [15, 25, 70, 40, 40]
-            headers = ["No", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
-            
-            for i, header in enumerate(headers):
-                pdf.cell(col_widths[i], 10, header, border=1, align="C")
-            pdf.ln()
-
-            pdf.set_font("Arial", '', 9)
-            for idx, row in df.iterrows():
-                pdf.cell(col_widths[0], 8, str(idx), border=1, align="C")
-                pdf.cell(col_widths[1], 8, str(row["Ref"]), border=1, align="C")
-                
-                akun = str(row["Akun"])
-                if len(akun) > 35:
-                    akun = akun[:32] + "..."
-                pdf.cell(col_widths[2], 8, akun, border=1, align="L")
-                
-                debit_val = row["Debit (Rp)"]
-                debit_text = format_rupiah(debit_val) if isinstance(debit_val, (int, float)) and debit_val != 0 else "-"
-                pdf.cell(col_widths[3], 8, debit_text, border=1, align="R")
-                
-                kredit_val = row["Kredit (Rp)"]
-                kredit_text = format_rupiah(kredit_val) if isinstance(kredit_val, (int, float)) and kredit_val != 0 else "-"
-                pdf.cell(col_widths[4], 8, kredit_text, border=1, align="R")
-                
-                pdf.ln()
-
-            pdf.ln(5)
-            pdf.set_font("Arial", 'I', 8)
-            pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                pdf.output(tmp.name)
-                tmp.seek(0)
-                return tmp.read()
-
-        pdf_neraca = buat_pdf_neraca(df_neraca_final, bulan_neraca, tahun_neraca)
         st.download_button(
             "📥 Download PDF Neraca Saldo",
-            data=pdf_neraca,
+            data=st.session_state.cache_pdf.pdf_saat_diminta(buat_pdf_neraca, df_neraca_final, bulan_neraca, tahun_neraca),
             file_name=f"neraca_saldo_{bulan_neraca}_{tahun_neraca}.pdf",
             mime="application/pdf",
             use_container_width=True
         )
     else:
         st.warning("⚠️ Belum ada data valid di tabel Neraca Saldo.")
+
+    st.markdown("---")
+
+    # --- Tutup buku: simpan saldo akhir bulan yang sudah selesai & kunci periodenya ---
+    periode_neraca = f"{int(tahun_neraca):04d}-{bulan_neraca}"
+    periode_tutup = st.session_state.store.periode_tutup()
+    with st.expander("🔒 Tutup Buku", expanded=False):
+        if periode_tutup:
+            tahun_tutup, bulan_tutup = periode_tutup.split("-")
+            st.caption(f"Jurnal terkunci s.d. {bulan_dict[bulan_tutup]} {tahun_tutup}: baris di periode itu "
+                       "dan sebelumnya tidak bisa ditambah, diubah atau dihapus.")
+        else:
+            st.caption("Belum ada periode yang ditutup.")
+        bulan_selesai = periode_neraca < pd.Timestamp.today().strftime("%Y-%m")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button(f"🔒 Tutup Buku s.d. {bulan_dict[bulan_neraca]} {tahun_neraca}", key="tutup_buku",
+                         use_container_width=True,
+                         disabled=not bulan_selesai or (periode_tutup is not None and periode_neraca <= periode_tutup)):
+                try:
+                    st.session_state.store.tutup_periode(periode_neraca, oleh=petugas)
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.rerun()
+        with col2:
+            # Buka kembali melepas kunci yang diandalkan auditor: hanya admin, dan dua langkah
+            if PANEL_ADMIN:
+                if st.button(f"🔓 Buka Kembali mulai {bulan_dict[bulan_neraca]} {tahun_neraca}", key="buka_buku",
+                             use_container_width=True,
+                             disabled=periode_tutup is None or periode_neraca > periode_tutup):
+                    st.session_state.konfirmasi_buka_buku = periode_neraca
+            else:
+                st.caption("Buka kembali periode hanya bisa dilakukan admin.")
+        if PANEL_ADMIN and st.session_state.get("konfirmasi_buka_buku") == periode_neraca:
+            st.warning(f"⚠️ Buka kembali {bulan_dict[bulan_neraca]} {tahun_neraca} dan semua periode sesudahnya? "
+                       "Saldo penutupnya dihapus dan jurnalnya bisa diubah lagi. Tindakan ini dicatat atas nama "
+                       f"**{petugas}**.")
+            col_ya, col_batal = st.columns(2)
+            if col_ya.button("✅ Ya, Buka Kembali", key="buka_buku_ya", use_container_width=True):
+                st.session_state.store.buka_periode(periode_neraca, oleh=petugas)
+                del st.session_state.konfirmasi_buka_buku
+                st.rerun()
+            if col_batal.button("Batal", key="buka_buku_batal", use_container_width=True):
+                del st.session_state.konfirmasi_buka_buku
+                st.rerun()
+        if not bulan_selesai:
+            st.caption("Bulan yang belum berakhir belum bisa ditutup.")
+        df_log_periode = st.session_state.store.riwayat_periode()
+        if len(df_log_periode):
+            st.caption("Riwayat tutup / buka kembali buku:")
+            st.dataframe(df_log_periode, use_container_width=True, hide_index=True)
+
+    # Saldo per akun: saldo awal = snapshot tutup buku terakhir + mutasi sesudahnya,
+    # ditambah mutasi bulan ini (tidak menghitung ulang jurnal dari awal)
+    st.write("### 📒 Saldo Akun")
+    periode_lalu = periode_sebelumnya(periode_neraca)
+    with profil.ukur("saldo akun") as catatan:
+        df_saldo_akun = catatan["df"] = saldo_berjalan(
+            neraca_saldo_kubus(st.session_state.store.saldo_kumulatif(periode_lalu), periode_lalu),
+            neraca_saldo_kubus(st.session_state.store.kubus([periode_neraca]), periode_neraca),
+            st.session_state.store.bagan_akun().saldo_ref,
+        )
+    if len(df_saldo_akun):
+        st.dataframe(
+            df_saldo_akun.style.format({col: format_rupiah for col in kolom_rupiah(df_saldo_akun)}),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("Belum ada saldo akun sampai periode ini.")
 # ========================================
 # TAB 4: LAPORAN KEUANGAN
 # ========================================
-with tab4:
+@fragmen("tab laporan keuangan")
+def tab_laporan_keuangan():
     st.header("📊 Laporan Keuangan BUMDes")
     
     # --- Selector Periode ---
     col1, col2 = st.columns(2)
     
-    bulan_dict = {
-        "01": "Januari", "02": "Februari", "03": "Maret",
-        "04": "April", "05": "Mei", "06": "Juni",
-        "07": "Juli", "08": "Agustus", "09": "September",
-        "10": "Oktober", "11": "November", "12": "Desember"
-    }
     
     with col1:
         bulan_laporan = st.selectbox(
             "Pilih Bulan", 
-            options=[
-                ("01", "Januari"), ("02", "Februari"), ("03", "Maret"),
-                ("04", "April"), ("05", "Mei"), ("06", "Juni"),
-                ("07", "Juli"), ("08", "Agustus"), ("09", "September"),
-                ("10", "Oktober"), ("11", "November"), ("12", "Desember")
-            ],
+            options=PILIHAN_BULAN,
             format_func=lambda x: x[1],
             key="bulan_laporan"
         )[0]
@@ -847,7 +861,6 @@ with tab4:
             "Tahun", 
             min_value=2000, 
             max_value=2100, 
-            value=2025,
             step=1,
             key="tahun_laporan"
         )
@@ -859,898 +872,495 @@ with tab4:
     # Counter refresh
     if "laporan_refresh" not in st.session_state:
         st.session_state.laporan_refresh = 0
-    
-    # Inisialisasi laba_bersih di session_state
-    if "laba_bersih" not in st.session_state:
-        st.session_state.laba_bersih = 0
 
     # ========================================
     # AUTO-LOAD DARI NERACA SALDO (LENGKAP)
     # ========================================
     if "pendapatan_loaded" not in st.session_state:
         st.session_state.pendapatan_loaded = False
+
+    # Sumber laporan: Neraca Saldo Tab 3 kalau periodenya sama (disinkron dulu kalau jurnal
+    # berubah sejak Tab 3 terakhir dibuka), selain itu buku besar periode laporan.
+    # Ganti periode atau sumber berubah = muat ulang saat tab ini dibuka.
+    periode_laporan = (bulan_laporan, int(tahun_laporan))
+    bulan_neraca, tahun_neraca = periode_widget("neraca")
+    if periode_laporan == (bulan_neraca, int(tahun_neraca)):
+        sinkron_neraca_saldo(bulan_neraca, tahun_neraca)
+        versi_sumber = ("neraca_saldo", versi_data("neraca_saldo"))
+    else:
+        versi_sumber = ("jurnal", versi_data("jurnal"))
+    if st.session_state.get("periode_laporan_dimuat") != (periode_laporan, versi_sumber):
+        st.session_state.pendapatan_loaded = False
     
     if not st.session_state.pendapatan_loaded:
-        df_neraca = st.session_state.neraca_saldo[
-            st.session_state.neraca_saldo["Akun"].astype(str).str.strip() != ""
-        ]
-        
-        # Clear data lama
-        st.session_state.pendapatan = pd.DataFrame([{"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-        st.session_state.beban = pd.DataFrame([{"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-        st.session_state.aktiva_lancar = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-        st.session_state.aktiva_tetap = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-        st.session_state.kewajiban = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-        st.session_state.modal_data = {"modal_awal": 0}
-        st.session_state.arus_kas_operasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-        st.session_state.arus_kas_investasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-        st.session_state.arus_kas_pendanaan = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-        
-        # Auto-populate dari Neraca Saldo
-        for _, row in df_neraca.iterrows():
-            nama_akun = str(row["Akun"]).lower()
-            debit = row["Debit (Rp)"] if pd.notna(row["Debit (Rp)"]) else 0
-            kredit = row["Kredit (Rp)"] if pd.notna(row["Kredit (Rp)"]) else 0
-            
-            # Pendapatan
-            if "pendapatan" in nama_akun or "penjualan" in nama_akun or "penerimaan" in nama_akun:
-                new_row = pd.DataFrame([{"Jenis Pendapatan": row["Akun"], "Debit (Rp)": debit, "Kredit (Rp)": kredit}])
-                st.session_state.pendapatan = pd.concat([st.session_state.pendapatan, new_row], ignore_index=True)
-                # Arus Kas Operasi (Penerimaan)
-                if kredit > 0:
-                    new_row_ak = pd.DataFrame([{"Aktivitas": row["Akun"], "Jumlah (Rp)": kredit}])
-                    st.session_state.arus_kas_operasi = pd.concat([st.session_state.arus_kas_operasi, new_row_ak], ignore_index=True)
-            
-            # Beban
-            elif "beban" in nama_akun or "biaya" in nama_akun or "gaji" in nama_akun or "sewa" in nama_akun or "pembayaran" in nama_akun:
-                new_row = pd.DataFrame([{"Jenis Beban": row["Akun"], "Debit (Rp)": debit, "Kredit (Rp)": kredit}])
-                st.session_state.beban = pd.concat([st.session_state.beban, new_row], ignore_index=True)
-                # Arus Kas Operasi (Pembayaran)
-                if debit > 0:
-                    new_row_ak = pd.DataFrame([{"Aktivitas": row["Akun"], "Jumlah (Rp)": -debit}])
-                    st.session_state.arus_kas_operasi = pd.concat([st.session_state.arus_kas_operasi, new_row_ak], ignore_index=True)
-            
-            # Aktiva Lancar
-            elif "kas" in nama_akun or "perlengkapan" in nama_akun or "piutang" in nama_akun:
-                new_row = pd.DataFrame([{"Item": row["Akun"], "Jumlah (Rp)": debit}])
-                st.session_state.aktiva_lancar = pd.concat([st.session_state.aktiva_lancar, new_row], ignore_index=True)
-            
-            # Aktiva Tetap
-            elif "peralatan" in nama_akun or "gedung" in nama_akun or "kendaraan" in nama_akun:
-                new_row = pd.DataFrame([{"Item": row["Akun"], "Jumlah (Rp)": debit}])
-                st.session_state.aktiva_tetap = pd.concat([st.session_state.aktiva_tetap, new_row], ignore_index=True)
-                # Arus Kas Investasi (Pembelian Aset)
-                if debit > 0:
-                    new_row_ak = pd.DataFrame([{"Aktivitas": f"Pembelian {row['Akun']}", "Jumlah (Rp)": -debit}])
-                    st.session_state.arus_kas_investasi = pd.concat([st.session_state.arus_kas_investasi, new_row_ak], ignore_index=True)
-            
-            # Modal
-            elif "modal" in nama_akun:
-                st.session_state.modal_data["modal_awal"] = kredit
-                # Arus Kas Pendanaan (Setoran Modal)
-                if kredit > 0:
-                    new_row_ak = pd.DataFrame([{"Aktivitas": "Setoran Modal", "Jumlah (Rp)": kredit}])
-                    st.session_state.arus_kas_pendanaan = pd.concat([st.session_state.arus_kas_pendanaan, new_row_ak], ignore_index=True)
-            
-            # Kewajiban
-            elif "hutang" in nama_akun or "utang" in nama_akun:
-                new_row = pd.DataFrame([{"Item": row["Akun"], "Jumlah (Rp)": kredit}])
-                st.session_state.kewajiban = pd.concat([st.session_state.kewajiban, new_row], ignore_index=True)
+        if versi_sumber[0] == "neraca_saldo":
+            neraca_sumber = st.session_state.neraca_saldo
+        else:
+            neraca_sumber = neraca_saldo_dari_bukubesar(buat_buku_besar(bulan_laporan, tahun_laporan))
+        # Semua tabel laporan (pendapatan, beban, aktiva, kewajiban, modal, arus kas)
+        # diisi sekaligus dari Neraca Saldo lewat aturan klasifikasi akun
+        with profil.ukur("laporan auto-load", neraca_sumber):
+            for nama, tabel in klasifikasi_neraca(neraca_sumber).items():
+                st.session_state[nama] = tabel
         
         st.session_state.pendapatan_loaded = True
+        st.session_state.periode_laporan_dimuat = (periode_laporan, versi_sumber)
+        # Grid laporan dimuat ulang dengan isi baru
+        st.session_state.laporan_refresh += 1
+        st.session_state.arus_kas_refresh = st.session_state.get("arus_kas_refresh", 0) + 1
 
     # === SUB-TABS ===
-    subtab1, subtab2, subtab3 = st.tabs([
+    # Hanya sub-tab yang dibuka yang dijalankan; masing-masing fragmen sendiri
+    subtab1, subtab2, subtab3, subtab4 = st.tabs([
         "📈 Laba/Rugi",
         "🏦 Neraca", 
-        "💸 Arus Kas"
-    ])
+        "💸 Arus Kas",
+        "📑 Komparatif"
+    ], key="subtab_laporan", on_change="rerun")
+    for subtab, isi in ((subtab1, subtab_laba_rugi), (subtab2, subtab_neraca),
+                        (subtab3, subtab_arus_kas), (subtab4, subtab_komparatif)):
+        if subtab.open:
+            with subtab:
+                isi(bulan_laporan, tahun_laporan)
+
+# ========================================
+# SUB-TAB 1: LAPORAN LABA/RUGI (FIXED)
+# ========================================
+@fragmen("sub-tab laba/rugi")
+def subtab_laba_rugi(bulan_laporan, tahun_laporan):
+    st.markdown("### 📈 Laporan Laba/Rugi")
+    st.markdown(f"**BUMDes - {bulan_dict[bulan_laporan]} {tahun_laporan}**")
+    st.markdown("---")
     
-    # ========================================
-    # SUB-TAB 1: LAPORAN LABA/RUGI (FIXED)
-    # ========================================
-    with subtab1:
-        st.markdown("### 📈 Laporan Laba/Rugi")
-        st.markdown(f"**BUMDes - {bulan_dict[bulan_laporan]} {tahun_laporan}**")
-        st.markdown("---")
-        
-        # Tombol reload
-        if st.button("🔄 Reload dari Neraca Saldo", key="reload_labarugi"):
-            st.session_state.pendapatan_loaded = False
-            st.session_state.laporan_refresh += 1
-            st.rerun()
-        
-        st.info("💡 Tabel Pendapatan dan Beban menggunakan format Debit & Kredit seperti di Neraca Saldo.")
+    # Tombol reload
+    if st.button("🔄 Reload dari Neraca Saldo", key="reload_labarugi"):
+        st.session_state.pendapatan_loaded = False
+        st.session_state.laporan_refresh += 1
+        st.rerun()
+    
+    st.info("💡 Tabel Pendapatan dan Beban menggunakan format Debit & Kredit seperti di Neraca Saldo.")
+    
+    # Input Hybrid
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("#### Input Pendapatan:")
         
-        # Input Hybrid
-        col1, col2 = st.columns(2)
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="tambah_pendapatan", use_container_width=True):
+                new_row = pd.DataFrame([{"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
+                st.session_state.pendapatan = pd.concat([st.session_state.pendapatan, new_row], ignore_index=True)
+                st.session_state.laporan_refresh += 1
+                st.rerun()
         
-        with col1:
-            st.write("#### Input Pendapatan:")
-            
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="tambah_pendapatan", use_container_width=True):
-                    new_row = pd.DataFrame([{"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-                    st.session_state.pendapatan = pd.concat([st.session_state.pendapatan, new_row], ignore_index=True)
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="hapus_pendapatan_kosong", use_container_width=True):
-                    st.session_state.pendapatan = st.session_state.pendapatan[
-                        st.session_state.pendapatan["Jenis Pendapatan"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.pendapatan) == 0:
-                        st.session_state.pendapatan = pd.DataFrame([{"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            
-            new_pendapatan = create_aggrid(st.session_state.pendapatan, f"pendapatan_{st.session_state.laporan_refresh}", height=250)
-            if not new_pendapatan.equals(st.session_state.pendapatan):
-                st.session_state.pendapatan = new_pendapatan.copy()
-            
-            # Hapus Tertentu
-            df_pend_terisi = st.session_state.pendapatan[
-                st.session_state.pendapatan["Jenis Pendapatan"].astype(str).str.strip() != ""
-            ]
-            
-            if len(df_pend_terisi) > 0:
-                with st.expander("🗑️ Hapus Pendapatan Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_pend_terisi.index:
-                        row = df_pend_terisi.loc[idx]
-                        col_chk, col_txt = st.columns([1, 9])
-                        with col_chk:
-                            if st.checkbox("", key=f"chk_p_{idx}_{st.session_state.laporan_refresh}"):
-                                rows_del.append(idx)
-                        with col_txt:
-                            st.text(f"{row['Jenis Pendapatan']}: D: {format_rupiah(row['Debit (Rp)'])} | K: {format_rupiah(row['Kredit (Rp)'])}")
-                    
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_pend"):
-                        st.session_state.pendapatan = st.session_state.pendapatan.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.pendapatan) == 0:
-                            st.session_state.pendapatan = pd.DataFrame([{"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-                        st.session_state.laporan_refresh += 1
-                        st.rerun()
-
-        with col2:
-            st.write("#### Input Beban-Beban:")
-            
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="tambah_beban", use_container_width=True):
-                    new_row = pd.DataFrame([{"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-                    st.session_state.beban = pd.concat([st.session_state.beban, new_row], ignore_index=True)
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="hapus_beban_kosong", use_container_width=True):
-                    st.session_state.beban = st.session_state.beban[
-                        st.session_state.beban["Jenis Beban"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.beban) == 0:
-                        st.session_state.beban = pd.DataFrame([{"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            
-            new_beban = create_aggrid(st.session_state.beban, f"beban_{st.session_state.laporan_refresh}", height=250)
-            if not new_beban.equals(st.session_state.beban):
-                st.session_state.beban = new_beban.copy()
-            
-            # Hapus Tertentu
-            df_beban_terisi = st.session_state.beban[
-                st.session_state.beban["Jenis Beban"].astype(str).str.strip() != ""
-            ]
-            
-            if len(df_beban_terisi) > 0:
-                with st.expander("🗑️ Hapus Beban Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_beban_terisi.index:
-                        row = df_beban_terisi.loc[idx]
-                        col_chk, col_txt = st.columns([1, 9])
-                        with col_chk:
-                            if st.checkbox("", key=f"chk_b_{idx}_{st.session_state.laporan_refresh}"):
-                                rows_del.append(idx)
-                        with col_txt:
-                            st.text(f"{row['Jenis Beban']}: D: {format_rupiah(row['Debit (Rp)'])} | K: {format_rupiah(row['Kredit (Rp)'])}")
-                    
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_beban"):
-                        st.session_state.beban = st.session_state.beban.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.beban) == 0:
-                            st.session_state.beban = pd.DataFrame([{"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
-                        st.session_state.laporan_refresh += 1
-                        st.rerun()
-
-        st.markdown("---")
-
-        # Hitung dan SIMPAN laba_bersih di session_state
-        df_pendapatan_clean = new_pendapatan[new_pendapatan["Jenis Pendapatan"].astype(str).str.strip() != ""]
-        df_beban_clean = new_beban[new_beban["Jenis Beban"].astype(str).str.strip() != ""]
-
-        # Total Pendapatan = (Kredit - Debit)
-        total_pendapatan_debit = df_pendapatan_clean["Debit (Rp)"].sum() if not df_pendapatan_clean.empty else 0
-        total_pendapatan_kredit = df_pendapatan_clean["Kredit (Rp)"].sum() if not df_pendapatan_clean.empty else 0
-        total_pendapatan = total_pendapatan_kredit - total_pendapatan_debit
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="hapus_pendapatan_kosong", use_container_width=True):
+                st.session_state.pendapatan = st.session_state.pendapatan[
+                    st.session_state.pendapatan["Jenis Pendapatan"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.pendapatan) == 0:
+                    st.session_state.pendapatan = pd.DataFrame([{"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
+                st.session_state.laporan_refresh += 1
+                st.rerun()
         
-        # Total Beban = (Debit - Kredit)
-        total_beban_debit = df_beban_clean["Debit (Rp)"].sum() if not df_beban_clean.empty else 0
-        total_beban_kredit = df_beban_clean["Kredit (Rp)"].sum() if not df_beban_clean.empty else 0
-        total_beban = total_beban_debit - total_beban_kredit
+        perubahan_pendapatan = create_aggrid(st.session_state.pendapatan, f"pendapatan_{st.session_state.laporan_refresh}", height=250, pilih_baris=True)
+        if perubahan_pendapatan:
+            st.session_state.pendapatan = perubahan_pendapatan.terapkan()
         
-        # Laba Bersih = Total Pendapatan - Total Beban
-        st.session_state.laba_bersih = total_pendapatan - total_beban
+        if tombol_hapus_terpilih("pendapatan", perubahan_pendapatan, {"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0},
+                                 "laporan_refresh", "del_pend"):
+            st.rerun()
 
-        # ✅ SELALU TAMPILKAN (HAPUS IF)
-        st.write("### 📊 Hasil Laporan Laba/Rugi")
-        
-        result_data = []
-        result_data.append({"Keterangan": "Pendapatan:", "Debit": "", "Kredit": ""})
-        
-        if not df_pendapatan_clean.empty:
-            for idx, row in df_pendapatan_clean.iterrows():
-                debit_val = row["Debit (Rp)"] if row["Debit (Rp)"] != 0 else ""
-                kredit_val = row["Kredit (Rp)"] if row["Kredit (Rp)"] != 0 else ""
-                result_data.append({
-                    "Keterangan": f"  {idx+1}. {row['Jenis Pendapatan']}", 
-                    "Debit": debit_val,
-                    "Kredit": kredit_val
-                })
-        
-        result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
-        if total_pendapatan >= 0:
-            result_data.append({"Keterangan": "Total Pendapatan", "Debit": "", "Kredit": total_pendapatan})
-        else:
-            result_data.append({"Keterangan": "Total Pendapatan", "Debit": abs(total_pendapatan), "Kredit": ""})
-        
-        result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
-        result_data.append({"Keterangan": "Beban-Beban:", "Debit": "", "Kredit": ""})
+    with col2:
+        st.write("#### Input Beban-Beban:")
         
-        if not df_beban_clean.empty:
-            for idx, row in df_beban_clean.iterrows():
-                debit_val = row["Debit (Rp)"] if row["Debit (Rp)"] != 0 else ""
-                kredit_val = row["Kredit (Rp)"] if row["Kredit (Rp)"] != 0 else ""
-                result_data.append({
-                    "Keterangan": f"  {idx+1}. {row['Jenis Beban']}", 
-                    "Debit": debit_val,
-                    "Kredit": kredit_val
-                })
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="tambah_beban", use_container_width=True):
+                new_row = pd.DataFrame([{"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
+                st.session_state.beban = pd.concat([st.session_state.beban, new_row], ignore_index=True)
+                st.session_state.laporan_refresh += 1
+                st.rerun()
         
-        result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
-        if total_beban >= 0:
-            result_data.append({"Keterangan": "Total Beban", "Debit": total_beban, "Kredit": ""})
-        else:
-            result_data.append({"Keterangan": "Total Beban", "Debit": "", "Kredit": abs(total_beban)})
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="hapus_beban_kosong", use_container_width=True):
+                st.session_state.beban = st.session_state.beban[
+                    st.session_state.beban["Jenis Beban"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.beban) == 0:
+                    st.session_state.beban = pd.DataFrame([{"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0}])
+                st.session_state.laporan_refresh += 1
+                st.rerun()
         
-        result_data.append({"Keterangan": "", "Debit": "", "Kredit": ""})
+        perubahan_beban = create_aggrid(st.session_state.beban, f"beban_{st.session_state.laporan_refresh}", height=250, pilih_baris=True)
+        if perubahan_beban:
+            st.session_state.beban = perubahan_beban.terapkan()
         
-        if st.session_state.laba_bersih >= 0:
-            result_data.append({"Keterangan": "Laba Bersih", "Debit": "", "Kredit": st.session_state.laba_bersih})
-        else:
-            result_data.append({"Keterangan": "Rugi Bersih", "Debit": abs(st.session_state.laba_bersih), "Kredit": ""})
+        if tombol_hapus_terpilih("beban", perubahan_beban, {"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0},
+                                 "laporan_refresh", "del_beban"):
+            st.rerun()
 
-        df_labarugi = pd.DataFrame(result_data)
-        
-        st.dataframe(
-            df_labarugi.style.format({
-                "Debit": lambda x: format_rupiah(x) if isinstance(x, (int, float)) else x,
-                "Kredit": lambda x: format_rupiah(x) if isinstance(x, (int, float)) else x
-            })
-            .apply(lambda x: ['font-weight: bold' if i < len(df_labarugi) and ('Total' in str(df_labarugi.iloc[i]['Keterangan']) or 'Laba' in str(df_labarugi.iloc[i]['Keterangan']) or 'Rugi' in str(df_labarugi.iloc[i]['Keterangan'])) else '' for i in range(len(x))], axis=0)
-            .set_properties(**{'text-align': 'left'}, subset=['Keterangan'])
-            .set_properties(**{'text-align': 'right'}, subset=['Debit', 'Kredit']),
-            use_container_width=True,
-            hide_index=True
+    st.markdown("---")
+
+    # Hitung Laba/Rugi (disimpan, dipakai juga oleh sub-tab Neraca)
+    df_labarugi, _ = laba_rugi_terkini()
+
+    # ✅ SELALU TAMPILKAN (HAPUS IF)
+    st.write("### 📊 Hasil Laporan Laba/Rugi")
+    
+    st.dataframe(
+        df_labarugi.style.format({
+            "Debit": lambda x: format_rupiah(x) if isinstance(x, numbers.Number) else x,
+            "Kredit": lambda x: format_rupiah(x) if isinstance(x, numbers.Number) else x
+        })
+        .apply(lambda x: ['font-weight: bold' if i < len(df_labarugi) and ('Total' in str(df_labarugi.iloc[i]['Keterangan']) or 'Laba' in str(df_labarugi.iloc[i]['Keterangan']) or 'Rugi' in str(df_labarugi.iloc[i]['Keterangan'])) else '' for i in range(len(x))], axis=0)
+        .set_properties(**{'text-align': 'left'}, subset=['Keterangan'])
+        .set_properties(**{'text-align': 'right'}, subset=['Debit', 'Kredit']),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # ✅ PDF Export Laba/Rugi (FIXED - TAMPILKAN SEMUA NILAI)
+    try:
+        st.download_button(
+            "📥 Download PDF Laba/Rugi",
+            data=st.session_state.cache_pdf.pdf_saat_diminta(buat_pdf_labarugi, df_labarugi, bulan_laporan, tahun_laporan),
+            file_name=f"laporan_labarugi_{bulan_laporan}_{tahun_laporan}.pdf",
+            mime="application/pdf",
+            use_container_width=True
         )
-        
-        # ✅ PDF Export Laba/Rugi (FIXED - TAMPILKAN SEMUA NILAI)
-        try:
-            def buat_pdf_labarugi(df, bulan, tahun):
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", 'B', 14)
-                pdf.cell(0, 10, txt="Laporan Laba/Rugi", ln=True, align="C")
-                pdf.set_font("Arial", '', 12)
-                pdf.cell(0, 8, txt="BUMDes", ln=True, align="C")
-                pdf.cell(0, 8, txt=f"Periode: {bulan_dict[bulan]} {tahun}", ln=True, align="C")
-                pdf.ln(5)
-                pdf.set_font("Arial", 'B', 10)
-                pdf.cell(90, 10, "Keterangan", border=1, align="C")
-                pdf.cell(45, 10, "Debit (Rp)", border=1, align="C")
-                pdf.cell(45, 10, "Kredit (Rp)", border=1, align="C")
-                pdf.ln()
-                pdf.set_font("Arial", '', 9)
-                
-                for idx in range(len(df)):
-                    row = df.iloc[idx]
-                    is_bold = 'Total' in str(row['Keterangan']) or 'Laba' in str(row['Keterangan']) or 'Rugi' in str(row['Keterangan'])
-                    if is_bold:
-                        pdf.set_font("Arial", 'B', 9)
-                    
-                    ket = str(row["Keterangan"])[:40] + "..." if len(str(row["Keterangan"])) > 43 else str(row["Keterangan"])
-                    pdf.cell(90, 8, ket, border=1, align="L")
-                    
-                    # ✅ FIX: Tampilkan SEMUA nilai (termasuk yang di Total)
-                    debit_val = row["Debit"]
-                    if isinstance(debit_val, (int, float)) and debit_val != 0:
-                        debit_text = format_rupiah(float(debit_val))
-                    elif pd.notna(debit_val) and str(debit_val).strip() != "":
-                        try:
-                            debit_text = format_rupiah(float(debit_val))
-                        except:
-                            debit_text = ""
-                    else:
-                        debit_text = ""
-                    pdf.cell(45, 8, debit_text, border=1, align="R")
-                    
-                    kredit_val = row["Kredit"]
-                    if isinstance(kredit_val, (int, float)) and kredit_val != 0:
-                        kredit_text = format_rupiah(float(kredit_val))
-                    elif pd.notna(kredit_val) and str(kredit_val).strip() != "":
-                        try:
-                            kredit_text = format_rupiah(float(kredit_val))
-                        except:
-                            kredit_text = ""
-                    else:
-                        kredit_text = ""
-                    pdf.cell(45, 8, kredit_text, border=1, align="R")
-                    
-                    pdf.ln()
-                    
-                    if is_bold:
-                        pdf.set_font("Arial", '', 9)
-                
-                pdf.ln(5)
-                pdf.set_font("Arial", 'I', 8)
-                pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    pdf.output(tmp.name)
-                    tmp.seek(0)
-                    return tmp.read()
-
-            pdf_labarugi = buat_pdf_labarugi(df_labarugi, bulan_laporan, tahun_laporan)
-            
-            st.download_button(
-                "📥 Download PDF Laba/Rugi",
-                data=pdf_labarugi,
-                file_name=f"laporan_labarugi_{bulan_laporan}_{tahun_laporan}.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-        except Exception as e:
-            st.error(f"❌ Error membuat PDF: {str(e)}")
-            st.info("💡 Silakan screenshot hasil laporan di atas sebagai alternatif.")
+    except Exception as e:
+        st.error(f"❌ Error membuat PDF: {str(e)}")
+        st.info("💡 Silakan screenshot hasil laporan di atas sebagai alternatif.")
+
+# ========================================
+# SUB-TAB 2: LAPORAN NERACA (FIXED COMPLETELY)
+# ========================================
+@fragmen("sub-tab neraca")
+def subtab_neraca(bulan_laporan, tahun_laporan):
+    st.markdown("### 🏦 Laporan Neraca")
+    st.markdown(f"**BUMDes - {bulan_dict[bulan_laporan]} {tahun_laporan}**")
+    st.markdown("---")
     
-    # ========================================
-    # SUB-TAB 2: LAPORAN NERACA (FIXED COMPLETELY)
-    # ========================================
-    with subtab2:
-        st.markdown("### 🏦 Laporan Neraca")
-        st.markdown(f"**BUMDes - {bulan_dict[bulan_laporan]} {tahun_laporan}**")
-        st.markdown("---")
-        
-        # Tombol reload
-        if st.button("🔄 Reload dari Neraca Saldo", key="reload_neraca"):
-            st.session_state.pendapatan_loaded = False
-            st.session_state.laporan_refresh += 1
-            st.rerun()
+    # Tombol reload
+    if st.button("🔄 Reload dari Neraca Saldo", key="reload_neraca"):
+        st.session_state.pendapatan_loaded = False
+        st.session_state.laporan_refresh += 1
+        st.rerun()
+    
+    # Input Modal
+    modal_awal = st.number_input(
+        "Modal Awal (Rp)", 
+        value=ke_rupiah(st.session_state.modal_data.get("modal_awal", 0)),
+        step=100000,
+        key="modal_awal_input"
+    )
+    st.session_state.modal_data["modal_awal"] = modal_awal
+    
+    st.markdown("---")
+    
+    # Input untuk Aktiva & Kewajiban
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("#### Aktiva Lancar:")
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="tambah_aktiva_lancar", use_container_width=True):
+                new_row = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
+                st.session_state.aktiva_lancar = pd.concat([st.session_state.aktiva_lancar, new_row], ignore_index=True)
+                st.session_state.laporan_refresh += 1
+                st.rerun()
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="hapus_lancar_kosong", use_container_width=True):
+                st.session_state.aktiva_lancar = st.session_state.aktiva_lancar[
+                    st.session_state.aktiva_lancar["Item"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.aktiva_lancar) == 0:
+                    st.session_state.aktiva_lancar = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
+                st.session_state.laporan_refresh += 1
+                st.rerun()
         
-        # Input Modal
-        modal_awal = st.number_input(
-            "Modal Awal (Rp)", 
-            value=st.session_state.modal_data.get("modal_awal", 0), 
-            step=100000,
-            key="modal_awal_input"
-        )
-        st.session_state.modal_data["modal_awal"] = modal_awal
+        perubahan_aktiva_lancar = create_aggrid(st.session_state.aktiva_lancar, f"lancar_{st.session_state.laporan_refresh}", height=180, pilih_baris=True)
+        if perubahan_aktiva_lancar:
+            st.session_state.aktiva_lancar = perubahan_aktiva_lancar.terapkan()
+        new_aktiva_lancar = st.session_state.aktiva_lancar
         
-        st.markdown("---")
+        if tombol_hapus_terpilih("aktiva_lancar", perubahan_aktiva_lancar, {"Item": "", "Jumlah (Rp)": 0},
+                                 "laporan_refresh", "del_lancar"):
+            st.rerun()
+
+        st.write("#### Aktiva Tetap:")
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="tambah_aktiva_tetap", use_container_width=True):
+                new_row = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
+                st.session_state.aktiva_tetap = pd.concat([st.session_state.aktiva_tetap, new_row], ignore_index=True)
+                st.session_state.laporan_refresh += 1
+                st.rerun()
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="hapus_tetap_kosong", use_container_width=True):
+                st.session_state.aktiva_tetap = st.session_state.aktiva_tetap[
+                    st.session_state.aktiva_tetap["Item"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.aktiva_tetap) == 0:
+                    st.session_state.aktiva_tetap = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
+                st.session_state.laporan_refresh += 1
+                st.rerun()
         
-        # Input untuk Aktiva & Kewajiban
-        col1, col2 = st.columns(2)
+        perubahan_aktiva_tetap = create_aggrid(st.session_state.aktiva_tetap, f"tetap_{st.session_state.laporan_refresh}", height=180, pilih_baris=True)
+        if perubahan_aktiva_tetap:
+            st.session_state.aktiva_tetap = perubahan_aktiva_tetap.terapkan()
+        new_aktiva_tetap = st.session_state.aktiva_tetap
         
-        with col1:
-            st.write("#### Aktiva Lancar:")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="tambah_aktiva_lancar", use_container_width=True):
-                    new_row = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                    st.session_state.aktiva_lancar = pd.concat([st.session_state.aktiva_lancar, new_row], ignore_index=True)
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="hapus_lancar_kosong", use_container_width=True):
-                    st.session_state.aktiva_lancar = st.session_state.aktiva_lancar[
-                        st.session_state.aktiva_lancar["Item"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.aktiva_lancar) == 0:
-                        st.session_state.aktiva_lancar = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            
-            new_aktiva_lancar = create_aggrid(st.session_state.aktiva_lancar, f"lancar_{st.session_state.laporan_refresh}", height=180)
-            if not new_aktiva_lancar.equals(st.session_state.aktiva_lancar):
-                st.session_state.aktiva_lancar = new_aktiva_lancar.copy()
-            
-            # Hapus Tertentu Aktiva Lancar
-            df_lancar_terisi = st.session_state.aktiva_lancar[
-                st.session_state.aktiva_lancar["Item"].astype(str).str.strip() != ""
-            ]
-            if len(df_lancar_terisi) > 0:
-                with st.expander("🗑️ Hapus Aktiva Lancar Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_lancar_terisi.index:
-                        row = df_lancar_terisi.loc[idx]
-                        col_chk, col_txt = st.columns([1, 9])
-                        with col_chk:
-                            if st.checkbox("", key=f"chk_al_{idx}_{st.session_state.laporan_refresh}"):
-                                rows_del.append(idx)
-                        with col_txt:
-                            st.text(f"{row['Item']}: {format_rupiah(row['Jumlah (Rp)'])}")
-                    
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_lancar"):
-                        st.session_state.aktiva_lancar = st.session_state.aktiva_lancar.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.aktiva_lancar) == 0:
-                            st.session_state.aktiva_lancar = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                        st.session_state.laporan_refresh += 1
-                        st.rerun()
-
-            st.write("#### Aktiva Tetap:")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="tambah_aktiva_tetap", use_container_width=True):
-                    new_row = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                    st.session_state.aktiva_tetap = pd.concat([st.session_state.aktiva_tetap, new_row], ignore_index=True)
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="hapus_tetap_kosong", use_container_width=True):
-                    st.session_state.aktiva_tetap = st.session_state.aktiva_tetap[
-                        st.session_state.aktiva_tetap["Item"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.aktiva_tetap) == 0:
-                        st.session_state.aktiva_tetap = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            
-            new_aktiva_tetap = create_aggrid(st.session_state.aktiva_tetap, f"tetap_{st.session_state.laporan_refresh}", height=180)
-            if not new_aktiva_tetap.equals(st.session_state.aktiva_tetap):
-                st.session_state.aktiva_tetap = new_aktiva_tetap.copy()
-            
-            # Hapus Tertentu Aktiva Tetap
-            df_tetap_terisi = st.session_state.aktiva_tetap[
-                st.session_state.aktiva_tetap["Item"].astype(str).str.strip() != ""
-            ]
-            if len(df_tetap_terisi) > 0:
-                with st.expander("🗑️ Hapus Aktiva Tetap Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_tetap_terisi.index:
-                        row = df_tetap_terisi.loc[idx]
-                        col_chk, col_txt = st.columns([1, 9])
-                        with col_chk:
-                            if st.checkbox("", key=f"chk_at_{idx}_{st.session_state.laporan_refresh}"):
-                                rows_del.append(idx)
-                        with col_txt:
-                            st.text(f"{row['Item']}: {format_rupiah(row['Jumlah (Rp)'])}")
-                    
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_tetap"):
-                        st.session_state.aktiva_tetap = st.session_state.aktiva_tetap.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.aktiva_tetap) == 0:
-                            st.session_state.aktiva_tetap = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                        st.session_state.laporan_refresh += 1
-                        st.rerun()
+        if tombol_hapus_terpilih("aktiva_tetap", perubahan_aktiva_tetap, {"Item": "", "Jumlah (Rp)": 0},
+                                 "laporan_refresh", "del_tetap"):
+            st.rerun()
 
-        with col2:
-            st.write("#### Kewajiban:")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="tambah_kewajiban", use_container_width=True):
-                    new_row = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                    st.session_state.kewajiban = pd.concat([st.session_state.kewajiban, new_row], ignore_index=True)
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="hapus_kewajiban_kosong", use_container_width=True):
-                    st.session_state.kewajiban = st.session_state.kewajiban[
-                        st.session_state.kewajiban["Item"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.kewajiban) == 0:
-                        st.session_state.kewajiban = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                    st.session_state.laporan_refresh += 1
-                    st.rerun()
-            
-            new_kewajiban = create_aggrid(st.session_state.kewajiban, f"kewajiban_{st.session_state.laporan_refresh}", height=180)
-            if not new_kewajiban.equals(st.session_state.kewajiban):
-                st.session_state.kewajiban = new_kewajiban.copy()
-            
-            # Hapus Tertentu Kewajiban
-            df_kewajiban_terisi = st.session_state.kewajiban[
-                st.session_state.kewajiban["Item"].astype(str).str.strip() != ""
-            ]
-            if len(df_kewajiban_terisi) > 0:
-                with st.expander("🗑️ Hapus Kewajiban Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_kewajiban_terisi.index:
-                        row = df_kewajiban_terisi.loc[idx]
-                        col_chk, col_txt = st.columns([1, 9])
-                        with col_chk:
-                            if st.checkbox("", key=f"chk_k_{idx}_{st.session_state.laporan_refresh}"):
-                                rows_del.append(idx)
-                        with col_txt:
-                            st.text(f"{row['Item']}: {format_rupiah(row['Jumlah (Rp)'])}")
-                    
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_kewajiban"):
-                        st.session_state.kewajiban = st.session_state.kewajiban.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.kewajiban) == 0:
-                            st.session_state.kewajiban = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
-                        st.session_state.laporan_refresh += 1
-                        st.rerun()
-
-        st.markdown("---")
-
-        # Hitung totals
-        df_aktiva_lancar_clean = new_aktiva_lancar[new_aktiva_lancar["Item"].astype(str).str.strip() != ""]
-        df_aktiva_tetap_clean = new_aktiva_tetap[new_aktiva_tetap["Item"].astype(str).str.strip() != ""]
-        df_kewajiban_clean = new_kewajiban[new_kewajiban["Item"].astype(str).str.strip() != ""]
-
-        total_aktiva_lancar = df_aktiva_lancar_clean["Jumlah (Rp)"].sum() if not df_aktiva_lancar_clean.empty else 0
-        total_aktiva_tetap = df_aktiva_tetap_clean["Jumlah (Rp)"].sum() if not df_aktiva_tetap_clean.empty else 0
-        total_aktiva = total_aktiva_lancar + total_aktiva_tetap
-        
-        total_kewajiban = df_kewajiban_clean["Jumlah (Rp)"].sum() if not df_kewajiban_clean.empty else 0
+    with col2:
+        st.write("#### Kewajiban:")
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="tambah_kewajiban", use_container_width=True):
+                new_row = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
+                st.session_state.kewajiban = pd.concat([st.session_state.kewajiban, new_row], ignore_index=True)
+                st.session_state.laporan_refresh += 1
+                st.rerun()
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="hapus_kewajiban_kosong", use_container_width=True):
+                st.session_state.kewajiban = st.session_state.kewajiban[
+                    st.session_state.kewajiban["Item"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.kewajiban) == 0:
+                    st.session_state.kewajiban = pd.DataFrame([{"Item": "", "Jumlah (Rp)": 0}])
+                st.session_state.laporan_refresh += 1
+                st.rerun()
         
-        modal_akhir = modal_awal + st.session_state.laba_bersih
-        total_passiva = total_kewajiban + modal_akhir
+        perubahan_kewajiban = create_aggrid(st.session_state.kewajiban, f"kewajiban_{st.session_state.laporan_refresh}", height=180, pilih_baris=True)
+        if perubahan_kewajiban:
+            st.session_state.kewajiban = perubahan_kewajiban.terapkan()
+        new_kewajiban = st.session_state.kewajiban
         
-        total_aktiva = 0 if pd.isna(total_aktiva) else float(total_aktiva)
-        total_passiva = 0 if pd.isna(total_passiva) else float(total_passiva)
+        if tombol_hapus_terpilih("kewajiban", perubahan_kewajiban, {"Item": "", "Jumlah (Rp)": 0},
+                                 "laporan_refresh", "del_kewajiban"):
+            st.rerun()
 
-        # Hasil Neraca
-        st.write("### 📊 Hasil Laporan Neraca")
-        
-        neraca_data = []
-        neraca_data.append({"Aktiva": "Aktiva", "Jumlah1": "", "Passiva": "Passiva", "Jumlah2": ""})
-        neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "", "Jumlah2": ""})
-        neraca_data.append({"Aktiva": "Aktiva Lancar:", "Jumlah1": "", "Passiva": "Kewajiban:", "Jumlah2": ""})
+    st.markdown("---")
+
+    # Hasil Neraca
+    st.write("### 📊 Hasil Laporan Neraca")
+    
+    df_neraca_lap = neraca_laporan(new_aktiva_lancar, new_aktiva_tetap, new_kewajiban, modal_awal, laba_rugi_terkini()[1])
+    
+    st.dataframe(
+        df_neraca_lap.style.format({
+            "Jumlah1": lambda x: format_rupiah(x) if isinstance(x, numbers.Number) else x,
+            "Jumlah2": lambda x: format_rupiah(x) if isinstance(x, numbers.Number) else x
+        })
+        .apply(lambda x: ['font-weight: bold' if i < len(df_neraca_lap) and ('Jml' in str(df_neraca_lap.iloc[i].get('Aktiva', '')) or 'Jml' in str(df_neraca_lap.iloc[i].get('Passiva', ''))) else '' for i in range(len(x))], axis=0)
+        .set_properties(**{'text-align': 'left'}, subset=['Aktiva', 'Passiva'])
+        .set_properties(**{'text-align': 'right'}, subset=['Jumlah1', 'Jumlah2']),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # ✅ PDF Export Neraca (FIXED - TAMPILKAN SEMUA NILAI)
+    try:
+        st.download_button(
+            "📥 Download PDF Neraca",
+            data=st.session_state.cache_pdf.pdf_saat_diminta(buat_pdf_neraca_lap, df_neraca_lap, bulan_laporan, tahun_laporan),
+            file_name=f"laporan_neraca_{bulan_laporan}_{tahun_laporan}.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+    except Exception as e:
+        st.error(f"❌ Error membuat PDF: {str(e)}")
+        st.info("💡 Silakan screenshot hasil laporan di atas sebagai alternatif.")
+
+# ========================================
+# SUB-TAB 3: ARUS KAS (DENGAN RELOAD)
+# ========================================
+@fragmen("sub-tab arus kas")
+def subtab_arus_kas(bulan_laporan, tahun_laporan):
+    st.markdown("### 💸 Laporan Arus Kas")
+    st.markdown(f"**BUMDes - {bulan_dict[bulan_laporan]} {tahun_laporan}**")
+    st.markdown("---")
+    
+    # ✅ TOMBOL RELOAD (SEPERTI SUB-TAB LAINNYA)
+    if st.button("🔄 Reload dari Neraca Saldo", key="reload_aruskas"):
+        st.session_state.pendapatan_loaded = False
+        st.session_state.laporan_refresh += 1
+        st.rerun()
+    
+    #st.info("💡 Input manual untuk aktivitas arus kas.")
+    
+    if "arus_kas_refresh" not in st.session_state:
+        st.session_state.arus_kas_refresh = 0
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.write("#### Operasi:")
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="add_op", use_container_width=True):
+                st.session_state.arus_kas_operasi = pd.concat([st.session_state.arus_kas_operasi, pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])], ignore_index=True)
+                st.session_state.arus_kas_refresh += 1
+                st.rerun()
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="del_op_empty", use_container_width=True):
+                st.session_state.arus_kas_operasi = st.session_state.arus_kas_operasi[
+                    st.session_state.arus_kas_operasi["Aktivitas"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.arus_kas_operasi) == 0:
+                    st.session_state.arus_kas_operasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
+                st.session_state.arus_kas_refresh += 1
+                st.rerun()
         
-        max_rows = max(len(df_aktiva_lancar_clean), len(df_kewajiban_clean)) if not df_aktiva_lancar_clean.empty or not df_kewajiban_clean.empty else 0
-        for i in range(max_rows):
-            aktiva_item = df_aktiva_lancar_clean.iloc[i]["Item"] if i < len(df_aktiva_lancar_clean) else ""
-            aktiva_val = df_aktiva_lancar_clean.iloc[i]["Jumlah (Rp)"] if i < len(df_aktiva_lancar_clean) else ""
-            kewajiban_item = df_kewajiban_clean.iloc[i]["Item"] if i < len(df_kewajiban_clean) else ""
-            kewajiban_val = df_kewajiban_clean.iloc[i]["Jumlah (Rp)"] if i < len(df_kewajiban_clean) else ""
-            
-            neraca_data.append({
-                "Aktiva": f"  {aktiva_item}",
-                "Jumlah1": aktiva_val,
-                "Passiva": f"  {kewajiban_item}",
-                "Jumlah2": kewajiban_val
-            })
+        perubahan_arus_operasi = create_aggrid(st.session_state.arus_kas_operasi, f"op_{st.session_state.arus_kas_refresh}", height=200, pilih_baris=True)
+        if perubahan_arus_operasi:
+            st.session_state.arus_kas_operasi = perubahan_arus_operasi.terapkan()
+        new_arus_operasi = st.session_state.arus_kas_operasi
         
-        neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "", "Jumlah2": ""})
-        neraca_data.append({"Aktiva": "Jml aktiva lancar", "Jumlah1": total_aktiva_lancar, "Passiva": "Ekuitas:", "Jumlah2": ""})
-        neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "  Modal", "Jumlah2": modal_awal})
-        neraca_data.append({"Aktiva": "Aktiva Tetap:", "Jumlah1": "", "Passiva": "  Laba", "Jumlah2": st.session_state.laba_bersih})
+        if tombol_hapus_terpilih("arus_kas_operasi", perubahan_arus_operasi, {"Aktivitas": "", "Jumlah (Rp)": 0},
+                                 "arus_kas_refresh", "del_op"):
+            st.rerun()
+
+    with col2:
+        st.write("#### Investasi:")
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="add_inv", use_container_width=True):
+                st.session_state.arus_kas_investasi = pd.concat([st.session_state.arus_kas_investasi, pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])], ignore_index=True)
+                st.session_state.arus_kas_refresh += 1
+                st.rerun()
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="del_inv_empty", use_container_width=True):
+                st.session_state.arus_kas_investasi = st.session_state.arus_kas_investasi[
+                    st.session_state.arus_kas_investasi["Aktivitas"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.arus_kas_investasi) == 0:
+                    st.session_state.arus_kas_investasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
+                st.session_state.arus_kas_refresh += 1
+                st.rerun()
         
-        for idx, row in df_aktiva_tetap_clean.iterrows():
-            neraca_data.append({
-                "Aktiva": f"  {row['Item']}",
-                "Jumlah1": row["Jumlah (Rp)"],
-                "Passiva": "",
-                "Jumlah2": ""
-            })
+        perubahan_arus_investasi = create_aggrid(st.session_state.arus_kas_investasi, f"inv_{st.session_state.arus_kas_refresh}", height=200, pilih_baris=True)
+        if perubahan_arus_investasi:
+            st.session_state.arus_kas_investasi = perubahan_arus_investasi.terapkan()
+        new_arus_investasi = st.session_state.arus_kas_investasi
         
-        neraca_data.append({"Aktiva": "", "Jumlah1": "", "Passiva": "", "Jumlah2": ""})
-        neraca_data.append({"Aktiva": "Jml Aktiva", "Jumlah1": total_aktiva, "Passiva": "Jml Kewajiban & Ekuitas", "Jumlah2": total_passiva})
+        if tombol_hapus_terpilih("arus_kas_investasi", perubahan_arus_investasi, {"Aktivitas": "", "Jumlah (Rp)": 0},
+                                 "arus_kas_refresh", "del_inv"):
+            st.rerun()
+
+    with col3:
+        st.write("#### Pendanaan:")
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("➕ Tambah", key="add_pend", use_container_width=True):
+                st.session_state.arus_kas_pendanaan = pd.concat([st.session_state.arus_kas_pendanaan, pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])], ignore_index=True)
+                st.session_state.arus_kas_refresh += 1
+                st.rerun()
+        with col_btn2:
+            if st.button("🗑️ Hapus Kosong", key="del_pend_empty", use_container_width=True):
+                st.session_state.arus_kas_pendanaan = st.session_state.arus_kas_pendanaan[
+                    st.session_state.arus_kas_pendanaan["Aktivitas"].astype(str).str.strip() != ""
+                ].reset_index(drop=True)
+                if len(st.session_state.arus_kas_pendanaan) == 0:
+                    st.session_state.arus_kas_pendanaan = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
+                st.session_state.arus_kas_refresh += 1
+                st.rerun()
         
-        df_neraca_lap = pd.DataFrame(neraca_data)
+        perubahan_arus_pendanaan = create_aggrid(st.session_state.arus_kas_pendanaan, f"pend_{st.session_state.arus_kas_refresh}", height=200, pilih_baris=True)
+        if perubahan_arus_pendanaan:
+            st.session_state.arus_kas_pendanaan = perubahan_arus_pendanaan.terapkan()
+        new_arus_pendanaan = st.session_state.arus_kas_pendanaan
         
+        if tombol_hapus_terpilih("arus_kas_pendanaan", perubahan_arus_pendanaan, {"Aktivitas": "", "Jumlah (Rp)": 0},
+                                 "arus_kas_refresh", "del_pendanaan"):
+            st.rerun()
+
+    st.markdown("---")
+
+    # Hasil Arus Kas
+    df_ak = arus_kas(new_arus_operasi, new_arus_investasi, new_arus_pendanaan)
+
+    if df_ak is not None:
+        st.write("### 📊 Hasil Arus Kas")
         st.dataframe(
-            df_neraca_lap.style.format({
-                "Jumlah1": lambda x: format_rupiah(x) if isinstance(x, (int, float)) else x,
-                "Jumlah2": lambda x: format_rupiah(x) if isinstance(x, (int, float)) else x
-            })
-            .apply(lambda x: ['font-weight: bold' if i < len(df_neraca_lap) and ('Jml' in str(df_neraca_lap.iloc[i].get('Aktiva', '')) or 'Jml' in str(df_neraca_lap.iloc[i].get('Passiva', ''))) else '' for i in range(len(x))], axis=0)
-            .set_properties(**{'text-align': 'left'}, subset=['Aktiva', 'Passiva'])
-            .set_properties(**{'text-align': 'right'}, subset=['Jumlah1', 'Jumlah2']),
+            df_ak.style.format({"Jumlah": lambda x: format_rupiah(x) if isinstance(x, numbers.Number) else x})
+            .apply(lambda x: ['font-weight: bold' if i < len(df_ak) and 'Arus Kas' in str(df_ak.iloc[i]['Aktivitas']) else '' for i in range(len(x))], axis=0)
+            .set_properties(**{'text-align': 'left'}, subset=['Aktivitas'])
+            .set_properties(**{'text-align': 'right'}, subset=['Jumlah']),
             use_container_width=True,
             hide_index=True
         )
         
-        # ✅ PDF Export Neraca (FIXED - TAMPILKAN SEMUA NILAI)
-        try:
-            def buat_pdf_neraca_lap(df, bulan, tahun):
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", 'B', 14)
-                pdf.cell(0, 10, txt="Laporan Neraca", ln=True, align="C")
-                pdf.set_font("Arial", '', 12)
-                pdf.cell(0, 8, txt="BUMDes", ln=True, align="C")
-                pdf.cell(0, 8, txt=f"Periode: {bulan_dict[bulan]} {tahun}", ln=True, align="C")
-                pdf.ln(5)
-                pdf.set_font("Arial", 'B', 10)
-                
-                col_widths = [60, 30, 60, 30]
-                headers = ["Aktiva", "Jumlah (Rp)", "Passiva", "Jumlah (Rp)"]
-                
-                for i, header in enumerate(headers):
-                    pdf.cell(col_widths[i], 10, header, border=1, align="C")
-                pdf.ln()
-                
-                pdf.set_font("Arial", '', 9)
-                for idx in range(len(df)):
-                    row = df.iloc[idx]
-                    is_bold = 'Jml' in str(row.get('Aktiva', '')) or 'Jml' in str(row.get('Passiva', ''))
-                    if is_bold:
-                        pdf.set_font("Arial", 'B', 9)
-                    
-                    # Kolom 1: Aktiva
-                    aktiva_text = str(row["Aktiva"])[:28] + "..." if len(str(row["Aktiva"])) > 30 else str(row["Aktiva"])
-                    pdf.cell(col_widths[0], 8, aktiva_text, border=1, align="L")
-                    
-                    # Kolom 2: Jumlah Aktiva (✅ FIXED - TAMPILKAN SEMUA)
-                    jumlah1_val = row["Jumlah1"]
-                    if isinstance(jumlah1_val, (int, float)) and jumlah1_val != 0:
-                        jumlah1_text = format_rupiah(float(jumlah1_val))
-                    elif pd.notna(jumlah1_val) and str(jumlah1_val).strip() != "":
-                        try:
-                            jumlah1_text = format_rupiah(float(jumlah1_val))
-                        except:
-                            jumlah1_text = ""
-                    else:
-                        jumlah1_text = ""
-                    pdf.cell(col_widths[1], 8, jumlah1_text, border=1, align="R")
-                    
-                    # Kolom 3: Passiva
-                    passiva_text = str(row["Passiva"])[:28] + "..." if len(str(row["Passiva"])) > 30 else str(row["Passiva"])
-                    pdf.cell(col_widths[2], 8, passiva_text, border=1, align="L")
-                    
-                    # Kolom 4: Jumlah Passiva (✅ FIXED - TAMPILKAN SEMUA)
-                    jumlah2_val = row["Jumlah2"]
-                    if isinstance(jumlah2_val, (int, float)) and jumlah2_val != 0:
-                        jumlah2_text = format_rupiah(float(jumlah2_val))
-                    elif pd.notna(jumlah2_val) and str(jumlah2_val).strip() != "":
-                        try:
-                            jumlah2_text = format_rupiah(float(jumlah2_val))
-                        except:
-                            jumlah2_text = ""
-                    else:
-                        jumlah2_text = ""
-                    pdf.cell(col_widths[3], 8, jumlah2_text, border=1, align="R")
-                    
-                    pdf.ln()
-                    
-                    if is_bold:
-                        pdf.set_font("Arial", '', 9)
-                
-                pdf.ln(5)
-                pdf.set_font("Arial", 'I', 8)
-                pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    pdf.output(tmp.name)
-                    tmp.seek(0)
-                    return tmp.read()
-
-            pdf_neraca = buat_pdf_neraca_lap(df_neraca_lap, bulan_laporan, tahun_laporan)
-            
-            st.download_button(
-                "📥 Download PDF Neraca",
-                data=pdf_neraca,
-                file_name=f"laporan_neraca_{bulan_laporan}_{tahun_laporan}.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-        except Exception as e:
-            st.error(f"❌ Error membuat PDF: {str(e)}")
-            st.info("💡 Silakan screenshot hasil laporan di atas sebagai alternatif.")
-    
-    # ========================================
-    # SUB-TAB 3: ARUS KAS (DENGAN RELOAD)
-    # ========================================
-    with subtab3:
-        st.markdown("### 💸 Laporan Arus Kas")
-        st.markdown(f"**BUMDes - {bulan_dict[bulan_laporan]} {tahun_laporan}**")
-        st.markdown("---")
-        
-        # ✅ TOMBOL RELOAD (SEPERTI SUB-TAB LAINNYA)
-        if st.button("🔄 Reload dari Neraca Saldo", key="reload_aruskas"):
-            st.session_state.pendapatan_loaded = False
-            st.session_state.laporan_refresh += 1
-            st.rerun()
-        
-        #st.info("💡 Input manual untuk aktivitas arus kas.")
-        
-        if "arus_kas_refresh" not in st.session_state:
-            st.session_state.arus_kas_refresh = 0
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.write("#### Operasi:")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="add_op", use_container_width=True):
-                    st.session_state.arus_kas_operasi = pd.concat([st.session_state.arus_kas_operasi, pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])], ignore_index=True)
-                    st.session_state.arus_kas_refresh += 1
-                    st.rerun()
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="del_op_empty", use_container_width=True):
-                    st.session_state.arus_kas_operasi = st.session_state.arus_kas_operasi[
-                        st.session_state.arus_kas_operasi["Aktivitas"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.arus_kas_operasi) == 0:
-                        st.session_state.arus_kas_operasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-                    st.session_state.arus_kas_refresh += 1
-                    st.rerun()
-            
-            new_arus_operasi = create_aggrid(st.session_state.arus_kas_operasi, f"op_{st.session_state.arus_kas_refresh}", height=200)
-            if not new_arus_operasi.equals(st.session_state.arus_kas_operasi):
-                st.session_state.arus_kas_operasi = new_arus_operasi.copy()
-            
-            # Hapus Tertentu Operasi
-            df_op_terisi = st.session_state.arus_kas_operasi[
-                st.session_state.arus_kas_operasi["Aktivitas"].astype(str).str.strip() != ""
-            ]
-            if len(df_op_terisi) > 0:
-                with st.expander("🗑️ Hapus Item Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_op_terisi.index:
-                        row = df_op_terisi.loc[idx]
-                        if st.checkbox(f"{row['Aktivitas']}: {format_rupiah(row['Jumlah (Rp)'])}", key=f"chk_op_{idx}_{st.session_state.arus_kas_refresh}"):
-                            rows_del.append(idx)
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_op"):
-                        st.session_state.arus_kas_operasi = st.session_state.arus_kas_operasi.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.arus_kas_operasi) == 0:
-                            st.session_state.arus_kas_operasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-                        st.session_state.arus_kas_refresh += 1
-                        st.rerun()
+        # PDF
+        st.download_button("📥 Download PDF Arus Kas", st.session_state.cache_pdf.pdf_saat_diminta(buat_pdf_ak, df_ak, bulan_laporan, tahun_laporan), f"arus_kas_{bulan_laporan}_{tahun_laporan}.pdf", "application/pdf", use_container_width=True)
 
-        with col2:
-            st.write("#### Investasi:")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="add_inv", use_container_width=True):
-                    st.session_state.arus_kas_investasi = pd.concat([st.session_state.arus_kas_investasi, pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])], ignore_index=True)
-                    st.session_state.arus_kas_refresh += 1
-                    st.rerun()
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="del_inv_empty", use_container_width=True):
-                    st.session_state.arus_kas_investasi = st.session_state.arus_kas_investasi[
-                        st.session_state.arus_kas_investasi["Aktivitas"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.arus_kas_investasi) == 0:
-                        st.session_state.arus_kas_investasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-                    st.session_state.arus_kas_refresh += 1
-                    st.rerun()
-            
-            new_arus_investasi = create_aggrid(st.session_state.arus_kas_investasi, f"inv_{st.session_state.arus_kas_refresh}", height=200)
-            if not new_arus_investasi.equals(st.session_state.arus_kas_investasi):
-                st.session_state.arus_kas_investasi = new_arus_investasi.copy()
-            
-            # Hapus Tertentu Investasi
-            df_inv_terisi = st.session_state.arus_kas_investasi[
-                st.session_state.arus_kas_investasi["Aktivitas"].astype(str).str.strip() != ""
-            ]
-            if len(df_inv_terisi) > 0:
-                with st.expander("🗑️ Hapus Item Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_inv_terisi.index:
-                        row = df_inv_terisi.loc[idx]
-                        if st.checkbox(f"{row['Aktivitas']}: {format_rupiah(row['Jumlah (Rp)'])}", key=f"chk_inv_{idx}_{st.session_state.arus_kas_refresh}"):
-                            rows_del.append(idx)
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_inv"):
-                        st.session_state.arus_kas_investasi = st.session_state.arus_kas_investasi.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.arus_kas_investasi) == 0:
-                            st.session_state.arus_kas_investasi = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-                        st.session_state.arus_kas_refresh += 1
-                        st.rerun()
+# ========================================
+# SUB-TAB 4: LAPORAN KOMPARATIF
+# ========================================
+@fragmen("sub-tab komparatif")
+def subtab_komparatif(bulan_laporan, tahun_laporan):
+    st.subheader("📑 Laporan Komparatif")
+    st.markdown(f"**BUMDes - s.d. {bulan_dict[bulan_laporan]} {tahun_laporan}**")
+    st.caption("Dihitung dari data jurnal tersimpan (ringkasan per bulan × akun), bukan dari tabel yang diedit manual di atas.")
 
-        with col3:
-            st.write("#### Pendanaan:")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("➕ Tambah", key="add_pend", use_container_width=True):
-                    st.session_state.arus_kas_pendanaan = pd.concat([st.session_state.arus_kas_pendanaan, pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])], ignore_index=True)
-                    st.session_state.arus_kas_refresh += 1
-                    st.rerun()
-            with col_btn2:
-                if st.button("🗑️ Hapus Kosong", key="del_pend_empty", use_container_width=True):
-                    st.session_state.arus_kas_pendanaan = st.session_state.arus_kas_pendanaan[
-                        st.session_state.arus_kas_pendanaan["Aktivitas"].astype(str).str.strip() != ""
-                    ].reset_index(drop=True)
-                    if len(st.session_state.arus_kas_pendanaan) == 0:
-                        st.session_state.arus_kas_pendanaan = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-                    st.session_state.arus_kas_refresh += 1
-                    st.rerun()
-            
-            new_arus_pendanaan = create_aggrid(st.session_state.arus_kas_pendanaan, f"pend_{st.session_state.arus_kas_refresh}", height=200)
-            if not new_arus_pendanaan.equals(st.session_state.arus_kas_pendanaan):
-                st.session_state.arus_kas_pendanaan = new_arus_pendanaan.copy()
-            
-            # Hapus Tertentu Pendanaan
-            df_pend_terisi = st.session_state.arus_kas_pendanaan[
-                st.session_state.arus_kas_pendanaan["Aktivitas"].astype(str).str.strip() != ""
-            ]
-            if len(df_pend_terisi) > 0:
-                with st.expander("🗑️ Hapus Item Tertentu", expanded=False):
-                    rows_del = []
-                    for idx in df_pend_terisi.index:
-                        row = df_pend_terisi.loc[idx]
-                        if st.checkbox(f"{row['Aktivitas']}: {format_rupiah(row['Jumlah (Rp)'])}", key=f"chk_pend_{idx}_{st.session_state.arus_kas_refresh}"):
-                            rows_del.append(idx)
-                    if rows_del and st.button(f"🗑️ Hapus {len(rows_del)} Item", key="del_pend"):
-                        st.session_state.arus_kas_pendanaan = st.session_state.arus_kas_pendanaan.drop(rows_del).reset_index(drop=True)
-                        if len(st.session_state.arus_kas_pendanaan) == 0:
-                            st.session_state.arus_kas_pendanaan = pd.DataFrame([{"Aktivitas": "", "Jumlah (Rp)": 0}])
-                        st.session_state.arus_kas_refresh += 1
-                        st.rerun()
-
-        st.markdown("---")
-
-        # Hasil Arus Kas
-        df_op = new_arus_operasi[new_arus_operasi["Aktivitas"].astype(str).str.strip() != ""]
-        df_inv = new_arus_investasi[new_arus_investasi["Aktivitas"].astype(str).str.strip() != ""]
-        df_pend = new_arus_pendanaan[new_arus_pendanaan["Aktivitas"].astype(str).str.strip() != ""]
-
-        if not df_op.empty or not df_inv.empty or not df_pend.empty:
-            st.write("### 📊 Hasil Arus Kas")
-            arus_data = []
-            arus_data.append({"Aktivitas": "Arus Kas Operasi:", "Jumlah": ""})
-            for _, r in df_op.iterrows():
-                arus_data.append({"Aktivitas": f"  {r['Aktivitas']}", "Jumlah": r["Jumlah (Rp)"]})
-            arus_data.append({"Aktivitas": "", "Jumlah": ""})
-            arus_data.append({"Aktivitas": "Arus Kas Investasi:", "Jumlah": ""})
-            for _, r in df_inv.iterrows():
-                arus_data.append({"Aktivitas": f"  {r['Aktivitas']}", "Jumlah": r["Jumlah (Rp)"]})
-            arus_data.append({"Aktivitas": "", "Jumlah": ""})
-            arus_data.append({"Aktivitas": "Arus Kas Pendanaan:", "Jumlah": ""})
-            for _, r in df_pend.iterrows():
-                arus_data.append({"Aktivitas": f"  {r['Aktivitas']}", "Jumlah": r["Jumlah (Rp)"]})
-            
-            df_ak = pd.DataFrame(arus_data)
-            st.dataframe(
-                df_ak.style.format({"Jumlah": lambda x: format_rupiah(x) if isinstance(x, (int, float)) else x})
-                .apply(lambda x: ['font-weight: bold' if i < len(df_ak) and 'Arus Kas' in str(df_ak.iloc[i]['Aktivitas']) else '' for i in range(len(x))], axis=0)
-                .set_properties(**{'text-align': 'left'}, subset=['Aktivitas'])
-                .set_properties(**{'text-align': 'right'}, subset=['Jumlah']),
-                use_container_width=True,
-                hide_index=True
-            )
-            
-            # PDF
-            def buat_pdf_ak(df, b, t):
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", 'B', 14)
-                pdf.cell(0, 10, "Laporan Arus Kas", ln=True, align="C")
-                pdf.set_font("Arial", '', 12)
-                pdf.cell(0, 8, "BUMDes", ln=True, align="C")
-                pdf.cell(0, 8, f"Periode: {bulan_dict[b]} {t}", ln=True, align="C")
-                pdf.ln(5)
-                pdf.set_font("Arial", 'B', 10)
-                pdf.cell(120, 10, "Aktivitas", border=1, align="C")
-                pdf.cell(60, 10, "Jumlah (Rp)", border=1, align="C")
-                pdf.ln()
-                pdf.set_font("Arial", '', 9)
-                for i in range(len(df)):
-                    r = df.iloc[i]
-                    is_bold = 'Arus Kas' in str(r['Aktivitas'])
-                    if is_bold:
-                        pdf.set_font("Arial", 'B', 9)
-                    pdf.cell(120, 8, str(r["Aktivitas"])[:47], border=1, align="L")
-                    pdf.cell(60, 8, format_rupiah(r["Jumlah"]) if isinstance(r["Jumlah"], (int, float)) else "", border=1, align="R")
-                    pdf.ln()
-                    if is_bold:
-                        pdf.set_font("Arial", '', 9)
-                pdf.ln(5)
-                pdf.set_font("Arial", 'I', 8)
-                pdf.cell(0, 5, "Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    pdf.output(tmp.name)
-                    tmp.seek(0)
-                    return tmp.read()
-            
-            st.download_button("📥 Download PDF Arus Kas", buat_pdf_ak(df_ak, bulan_laporan, tahun_laporan), f"arus_kas_{bulan_laporan}_{tahun_laporan}.pdf", "application/pdf", use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        mode_komparatif = st.radio(
+            "Pembanding", ["bulan", "tahun"], horizontal=True, key="mode_komparatif",
+            format_func=lambda x: "Bulan ke bulan" if x == "bulan" else "Tahun ke tahun",
+        )
+    with col2:
+        jumlah_kolom = st.number_input("Jumlah periode", min_value=2, max_value=24, step=1, key="jumlah_periode_komparatif")
+
+    periode_kom = daftar_periode(bulan_laporan, tahun_laporan, jumlah_kolom, mode_komparatif)
+    with profil.ukur("laporan komparatif"):
+        laporan_kom = laporan_komparatif(st.session_state.store.kubus(periode_kom), periode_kom)
+    akhiran = f"{mode_komparatif}_{periode_kom[0]}_{periode_kom[-1]}"
+    label_kolom = {p: label_periode(p) for p in periode_kom}
+
+    for nama, judul in (("laba_rugi", "Laporan Laba/Rugi Komparatif"),
+                        ("neraca", "Laporan Neraca Komparatif"),
+                        ("arus_kas", "Laporan Arus Kas Komparatif")):
+        df_kom = laporan_kom[nama]
+        st.write(f"### {judul}")
+        st.dataframe(
+            df_kom.rename(columns=label_kolom)
+            .style.format({label: lambda x: format_rupiah(x) if isinstance(x, numbers.Number) else x
+                           for label in label_kolom.values()})
+            .apply(lambda x: ['' if str(k).startswith("  ") else 'font-weight: bold' for k in df_kom["Keterangan"]], axis=0),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.download_button(
+            f"📥 Download PDF {judul}",
+            st.session_state.cache_pdf.pdf_saat_diminta(buat_pdf_komparatif, df_kom, judul),
+            f"{nama}_komparatif_{akhiran}.pdf", "application/pdf",
+            use_container_width=True, key=f"pdf_komparatif_{nama}"
+        )
+
+# ========================================
+# JALANKAN TAB YANG DIBUKA
+# ========================================
+for tab, isi in ((tab1, tab_jurnal_umum), (tab2, tab_buku_besar),
+                 (tab3, tab_neraca_saldo), (tab4, tab_laporan_keuangan)):
+    if tab.open:
+        with tab:
+            isi()
+
+# ========================================
+# PROFILING: kirim metrik rerun ini & panel admin
+# ========================================
+profil.selesai()
+if panel_profil is not None:
+    with panel_profil.container():
+        with st.expander("⏱️ Profiling", expanded=False):
+            st.caption("Rerun terakhir")
+            st.dataframe(profil.tabel(), hide_index=True, use_container_width=True)
+            st.caption("Persentil per tahap (proses ini)")
+            st.dataframe(metrik_proses().ringkasan().round(1), hide_index=True, use_container_width=True)
@@ -0,0 +1,279 @@
+import csv
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from jurnal_store import KOLOM_JURNAL, parse_tanggal
+from uang import ke_rupiah
+
+# === Impor massal Jurnal Umum dari CSV / Excel ===
+# File dibaca per potongan (chunk) supaya memori tetap datar untuk 100rb+ baris.
+# Tiap potongan divalidasi & dinormalisasi secara vektor, dicek keseimbangan debit =
+# kredit per voucher, lalu baris yang lolos ditulis ke JurnalStore dalam satu batch.
+# Baris yang ditolak langsung ditulis ke laporan penolakan (CSV) beserta alasannya.
+
+UKURAN_POTONGAN = 20_000
+
+# Nama kolom di file (huruf kecil, tanpa spasi ganda) → kolom jurnal
+ALIAS_KOLOM = {
+    "tanggal": "Tanggal", "tgl": "Tanggal", "date": "Tanggal",
+    "keterangan": "Keterangan", "uraian": "Keterangan", "deskripsi": "Keterangan",
+    "ref": "Ref", "no ref": "Ref", "kode akun": "Ref", "no akun": "Ref",
+    "akun": "Akun", "nama akun": "Akun",
+    "debit": "Debit (Rp)", "debit (rp)": "Debit (Rp)", "debet": "Debit (Rp)",
+    "kredit": "Kredit (Rp)", "kredit (rp)": "Kredit (Rp)",
+    "bukti": "Bukti", "no bukti": "Bukti", "voucher": "Bukti", "no voucher": "Bukti",
+}
+
+KOLOM_LAPORAN = ["Baris", "Bukti"] + KOLOM_JURNAL + ["Alasan"]
+
+_RIBUAN_ID = re.compile(r"^-?\d{1,3}(\.\d{3})+(,\d+)?$")
+_RIBUAN_EN = re.compile(r"^-?\d{1,3}(,\d{3})+(\.\d+)?$")
+
+
+def _nama_kolom(kolom):
+    hasil = {}
+    for col in kolom:
+        kunci = " ".join(str(col).strip().lower().split())
+        if kunci in ALIAS_KOLOM and ALIAS_KOLOM[kunci] not in hasil.values():
+            hasil[col] = ALIAS_KOLOM[kunci]
+    return hasil
+
+
+def parse_rupiah(series):
+    # "Rp 1.500.000", "1.500.000,50", "1500000.5", 1500000 → angka (NaN kalau tidak terbaca);
+    # pembulatan ke rupiah (uang.ke_rupiah) dilakukan pemanggil
+    if pd.api.types.is_integer_dtype(series):
+        return series
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    teks = series.astype(str).str.strip().fillna("")
+    teks = teks.str.replace(r"(?i)^rp\.?", "", regex=True).str.replace(r"\s", "", regex=True)
+    kosong = teks.isin(["", "-", "nan", "None"])
+    teks = teks.where(~teks.str.match(_RIBUAN_EN), teks.str.replace(",", "", regex=False))
+    teks = teks.where(~teks.str.match(_RIBUAN_ID), teks.str.replace(".", "", regex=False))
+    # Koma sebagai pemisah desimal (format Indonesia) kalau tidak ada titik lagi
+    teks = teks.where(teks.str.contains(".", regex=False), teks.str.replace(",", ".", regex=False))
+    angka = pd.to_numeric(teks, errors="coerce")
+    return angka.where(~kosong, 0.0)
+
+
+def normalisasi(df):
+    # Potongan mentah → (jurnal ternormalisasi, alasan tolak per baris; "" = lolos)
+    df = df.rename(columns=_nama_kolom(df.columns))
+    for col in KOLOM_JURNAL:
+        if col not in df:
+            df[col] = "" if "(Rp)" not in col else 0
+    teks = {col: df[col].astype(str).str.strip().where(df[col].notna(), "") for col in ["Keterangan", "Ref", "Akun"]}
+    tanggal = parse_tanggal(df["Tanggal"])
+    debit = parse_rupiah(df["Debit (Rp)"])
+    kredit = parse_rupiah(df["Kredit (Rp)"])
+    terbaca = debit.notna() & kredit.notna()
+    # Nominal dibulatkan ke rupiah sebelum divalidasi, jadi yang dicek = yang disimpan
+    debit, kredit = ke_rupiah(debit), ke_rupiah(kredit)
+
+    alasan = np.full(len(df), "", dtype=object)
+    aturan = [
+        (tanggal.isna().to_numpy(), "tanggal tidak valid"),
+        (((teks["Ref"] == "") & (teks["Akun"] == "")).to_numpy(), "akun kosong"),
+        ((~terbaca).to_numpy(), "nominal tidak terbaca"),
+        (((debit < 0) | (kredit < 0)).to_numpy(), "nominal negatif"),
+        (((debit > 0) & (kredit > 0)).to_numpy(), "debit dan kredit terisi bersamaan"),
+        (((debit == 0) & (kredit == 0)).to_numpy(), "debit dan kredit nol"),
+    ]
+    # Alasan pertama yang berlaku saja (urutan = prioritas)
+    for salah, pesan in reversed(aturan):
+        alasan = np.where(salah, pesan, alasan)
+
+    jurnal = pd.DataFrame({
+        "Tanggal": tanggal.dt.strftime("%d/%m/%Y").fillna(df["Tanggal"].astype(str)),
+        "Keterangan": teks["Keterangan"],
+        "Ref": teks["Ref"],
+        "Akun": teks["Akun"],
+        "Debit (Rp)": debit,
+        "Kredit (Rp)": kredit,
+    }, index=df.index)
+    if "Bukti" in df:
+        bukti = df["Bukti"].astype(str).str.strip().where(df["Bukti"].notna(), "")
+    else:
+        # Tanpa nomor bukti: baris berurutan dengan tanggal & keterangan sama = satu voucher
+        bukti = jurnal["Tanggal"] + "|" + jurnal["Keterangan"]
+    return jurnal, bukti, alasan
+
+
+def voucher_tidak_seimbang(bukti, debit, kredit):
+    # True per baris yang vouchernya (run berurutan dengan bukti sama) tidak seimbang;
+    # nominal rupiah bulat, jadi dibandingkan eksak tanpa toleransi
+    bukti = np.asarray(bukti, dtype=object)
+    if not len(bukti):
+        return np.zeros(0, dtype=bool)
+    awal = np.r_[True, bukti[1:] != bukti[:-1]]
+    grup = np.cumsum(awal) - 1
+    selisih = np.add.reduceat(ke_rupiah(np.asarray(debit)) - ke_rupiah(np.asarray(kredit)), np.flatnonzero(awal))
+    return selisih[grup] != 0
+
+
+def baca_bertahap(sumber, nama_file=None, ukuran=UKURAN_POTONGAN):
+    # Hasilkan (potongan DataFrame, perkiraan progres 0..1) dari file CSV atau XLSX
+    nama_file = nama_file or getattr(sumber, "name", str(sumber))
+    if str(nama_file).lower().endswith((".xlsx", ".xlsm")):
+        yield from _baca_excel(sumber, ukuran)
+        return
+    if isinstance(sumber, (str, os.PathLike)):
+        with open(sumber, "rb") as f:
+            yield from _baca_csv(f, ukuran)
+    else:
+        yield from _baca_csv(sumber, ukuran)
+
+
+def _baca_csv(f, ukuran):
+    # Pemisah (koma / titik koma) ditebak otomatis; progres dari posisi baca file
+    try:
+        total = os.fstat(f.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        total = getattr(f, "size", None)
+    pembaca = pd.read_csv(
+        f, chunksize=ukuran, dtype=str, keep_default_na=False,
+        sep=None, engine="python", encoding="utf-8-sig",
+    )
+    for potongan in pembaca:
+        yield potongan, (min(f.tell() / total, 1.0) if total else None)
+
+
+def _baca_excel(sumber, ukuran):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("Impor file Excel membutuhkan paket openpyxl (pip install openpyxl)") from e
+    # read_only: baris dibaca streaming, tidak seluruh workbook dimuat ke memori
+    wb = load_workbook(sumber, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = ws.max_row or None
+        baris = ws.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(baris, [])]
+        buffer, dibaca = [], 1
+        for nilai in baris:
+            buffer.append(nilai)
+            dibaca += 1
+            if len(buffer) >= ukuran:
+                yield pd.DataFrame(buffer, columns=header), (dibaca / total if total else None)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header), 1.0
+    finally:
+        wb.close()
+
+
+class HasilImpor:
+    def __init__(self):
+        self.dibaca = 0
+        self.diterima = 0
+        self.ditolak = 0
+        self.voucher_ditolak = 0
+        self.progres = 0.0
+
+    def __repr__(self):
+        return (f"HasilImpor(dibaca={self.dibaca}, diterima={self.diterima}, "
+                f"ditolak={self.ditolak}, voucher_ditolak={self.voucher_ditolak})")
+
+
+def impor_jurnal(store, sumber, laporan_tolak, nama_file=None, ukuran=UKURAN_POTONGAN, progres=None, oleh=""):
+    """Impor file jurnal ke store; baris yang ditolak ditulis ke laporan_tolak (teks CSV)."""
+    hasil = HasilImpor()
+    penulis = csv.writer(laporan_tolak)
+    penulis.writerow(KOLOM_LAPORAN)
+    sisa = None  # voucher terakhir potongan sebelumnya (bisa berlanjut di potongan berikut)
+    terkunci = store.periode_tutup()  # baris s.d. periode ini ditolak (sudah tutup buku)
+    asal = f"impor {nama_file or getattr(sumber, 'name', sumber)}"  # dicatat di log perubahan
+
+    def proses(jurnal, bukti, alasan, nomor, akhir=False):
+        nonlocal sisa
+        if sisa is not None:
+            jurnal = pd.concat([sisa[0], jurnal])
+            bukti = pd.concat([sisa[1], bukti])
+            alasan = np.concatenate([sisa[2], alasan])
+            nomor = np.concatenate([sisa[3], nomor])
+            sisa = None
+        if not akhir and len(bukti):
+            # Tahan voucher terakhir sampai potongan berikut, kalau-kalau belum lengkap
+            terakhir = bukti.to_numpy() == bukti.iloc[-1]
+            awal_sisa = len(bukti) - np.argmin(terakhir[::-1]) if not terakhir.all() else 0
+            if awal_sisa < len(bukti):
+                sisa = (jurnal.iloc[awal_sisa:], bukti.iloc[awal_sisa:], alasan[awal_sisa:], nomor[awal_sisa:])
+                jurnal, bukti, alasan, nomor = jurnal.iloc[:awal_sisa], bukti.iloc[:awal_sisa], alasan[:awal_sisa], nomor[:awal_sisa]
+        if not len(jurnal):
+            return
+
+        if terkunci:
+            periode = parse_tanggal(jurnal["Tanggal"]).dt.strftime("%Y-%m").fillna("").to_numpy(dtype=str)
+            alasan = np.where((alasan == "") & (periode != "") & (periode <= terkunci), "periode sudah ditutup (tutup buku)", alasan)
+
+        # Voucher dengan baris tidak valid atau debit ≠ kredit ditolak utuh
+        valid = alasan == ""
+        timpang = voucher_tidak_seimbang(
+            bukti.to_numpy(), jurnal["Debit (Rp)"].where(valid, 0).to_numpy(), jurnal["Kredit (Rp)"].where(valid, 0).to_numpy()
+        )
+        b = bukti.to_numpy()
+        awal = np.r_[True, b[1:] != b[:-1]]
+        grup = np.cumsum(awal) - 1
+        ada_salah = np.bincount(grup, weights=(~valid).astype(float))[grup] > 0
+        tolak_voucher = valid & (timpang | ada_salah)
+        alasan = np.where(tolak_voucher & ada_salah, "voucher berisi baris tidak valid", alasan)
+        alasan = np.where(tolak_voucher & ~ada_salah, "voucher tidak seimbang (debit ≠ kredit)", alasan)
+
+        terima = alasan == ""
+        hasil.voucher_ditolak += int(np.unique(grup[~terima]).size)
+        if terima.any():
+            store.tulis(tambah=jurnal[terima], oleh=oleh, sumber=asal)
+        if (~terima).any():
+            tolak = jurnal[~terima]
+            penulis.writerows(zip(nomor[~terima], bukti.to_numpy()[~terima], *[tolak[c].tolist() for c in KOLOM_JURNAL], alasan[~terima]))
+        hasil.diterima += int(terima.sum())
+        hasil.ditolak += int((~terima).sum())
+
+    for potongan, posisi in baca_bertahap(sumber, nama_file, ukuran):
+        # Nomor baris di file (baris 1 = header); baris yang kosong total dilewati
+        nomor = np.arange(hasil.dibaca + 2, hasil.dibaca + 2 + len(potongan))
+        hasil.dibaca += len(potongan)
+        isi = ~potongan.astype(str).apply(lambda s: s.str.strip().isin(["", "None", "nan"])).all(axis=1).to_numpy()
+        proses(*normalisasi(potongan[isi].reset_index(drop=True)), nomor[isi])
+        if posisi is not None:
+            hasil.progres = posisi
+        if progres:
+            progres(hasil)
+    if sisa is not None:
+        terakhir, sisa = sisa, None
+        proses(*terakhir, akhir=True)
+    hasil.progres = 1.0
+    if progres:
+        progres(hasil)
+    return hasil
+
+
+if __name__ == "__main__":
+    import argparse
+    import getpass
+    import sys
+
+    from jurnal_store import JurnalStore
+
+    parser = argparse.ArgumentParser(description="Impor massal Jurnal Umum dari CSV/XLSX")
+    parser.add_argument("file")
+    parser.add_argument("--db", default=None, help="lokasi database (default BUMDES_DB / bumdes.db)")
+    parser.add_argument("--tolak", default="ditolak.csv", help="file laporan baris yang ditolak")
+    parser.add_argument("--oleh", default=getpass.getuser(), help="nama petugas yang dicatat di log perubahan")
+    args = parser.parse_args()
+
+    store = JurnalStore(args.db) if args.db else JurnalStore()
+    with open(args.tolak, "w", newline="", encoding="utf-8") as f:
+        hasil = impor_jurnal(
+            store, args.file, f, oleh=args.oleh,
+            progres=lambda h: print(f"\r{h.dibaca} baris dibaca, {h.diterima} diterima, {h.ditolak} ditolak", end="", file=sys.stderr),
+        )
+    print(file=sys.stderr)
+    print(hasil)
+    store.close()
@@ -0,0 +1,762 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bagan_akun import KOLOM_AKUN, BaganAkun, jenis_akun, kategorikan, tanpa_kategori
+from perubahan import Perubahan
+from uang import ke_rupiah
+
+# === Penyimpanan Jurnal Umum di SQLite ===
+# Jurnal disimpan permanen (tidak hilang saat browser di-refresh / server restart).
+# Aplikasi hanya memuat working set (satu tahun + baris tanpa tanggal), dan semua
+# penulisan dari grid dikirim dalam satu transaksi batch.
+# Akun disimpan sekali di tabel bagan akun; baris jurnal hanya menyimpan akun_id.
+# Debit/kredit disimpan sebagai INTEGER rupiah (lihat uang.py).
+# Tabel mutasi_periode = kubus agregat (bulan × akun) yang dijaga di transaksi yang
+# sama dengan setiap penulisan jurnal; laporan komparatif dibaca dari sini.
+# Tutup buku: saldo kumulatif per akun disimpan untuk bulan yang ditutup (saldo_penutup)
+# dan semua periode s.d. bulan itu dikunci. Setiap tutup / buka kembali dicatat di
+# log_periode (siapa, kapan, periode mana) di transaksi yang sama. Saldo bulan N = snapshot terakhir + mutasi
+# bulan-bulan sesudahnya saja, jadi biayanya tidak tumbuh mengikuti umur data.
+# Log perubahan: setiap penulisan = satu batch (siapa, kapan, dari mana) dengan isi baris
+# yang ditambah / diubah / dihapus, di transaksi yang sama dengan perubahan jurnalnya
+# (satu fsync per batch). Log hanya bisa ditambah; checkpoint jurnal diperbarui berkala,
+# jadi jurnal bisa dibangun ulang dari checkpoint terakhir + ekor log.
+
+KOLOM_JURNAL = ["Tanggal", "Keterangan", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
+# Kolom grid yang boleh dipakai untuk urutan halaman → ekspresi SQL (whitelist)
+URUTAN_HALAMAN = {
+    "id": "j.id", "Tanggal": "j.tgl", "Keterangan": "j.keterangan", "Ref": "a.ref",
+    "Akun": "a.nama", "Debit (Rp)": "j.debit", "Kredit (Rp)": "j.kredit",
+}
+LOKASI_DB = os.environ.get("BUMDES_DB", "bumdes.db")
+
+VERSI_SKEMA = 8
+# Checkpoint jurnal diambil ulang setiap sekian baris log baru
+CHECKPOINT_SETIAP = 50_000
+SKEMA = """
+CREATE TABLE IF NOT EXISTS akun (
+    id INTEGER PRIMARY KEY,
+    ref TEXT NOT NULL DEFAULT '',
+    nama TEXT NOT NULL DEFAULT '',
+    jenis TEXT,
+    saldo_normal TEXT NOT NULL DEFAULT 'debit',
+    UNIQUE (ref, nama)
+);
+CREATE TABLE IF NOT EXISTS jurnal (
+    id INTEGER PRIMARY KEY,
+    tanggal TEXT NOT NULL DEFAULT '',
+    tgl TEXT,
+    keterangan TEXT NOT NULL DEFAULT '',
+    akun_id INTEGER REFERENCES akun(id),
+    debit INTEGER NOT NULL DEFAULT 0,
+    kredit INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jurnal_tgl ON jurnal(tgl);
+CREATE INDEX IF NOT EXISTS idx_jurnal_akun ON jurnal(akun_id);
+CREATE TABLE IF NOT EXISTS id_jurnal (
+    terakhir INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mutasi_periode (
+    periode TEXT NOT NULL,
+    akun_id INTEGER NOT NULL REFERENCES akun(id),
+    debit INTEGER NOT NULL DEFAULT 0,
+    kredit INTEGER NOT NULL DEFAULT 0,
+    baris INTEGER NOT NULL DEFAULT 0,
+    urut INTEGER,
+    PRIMARY KEY (periode, akun_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tutup_buku (
+    periode TEXT PRIMARY KEY,
+    ditutup TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS saldo_penutup (
+    periode TEXT NOT NULL,
+    akun_id INTEGER NOT NULL REFERENCES akun(id),
+    debit INTEGER NOT NULL DEFAULT 0,
+    kredit INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (periode, akun_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS log_batch (
+    id INTEGER PRIMARY KEY,
+    waktu TEXT NOT NULL,
+    oleh TEXT NOT NULL DEFAULT '',
+    sumber TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS log_jurnal (
+    seq INTEGER PRIMARY KEY,
+    batch INTEGER NOT NULL REFERENCES log_batch(id),
+    aksi TEXT NOT NULL,
+    jurnal_id INTEGER NOT NULL,
+    tanggal TEXT NOT NULL DEFAULT '',
+    tgl TEXT,
+    keterangan TEXT NOT NULL DEFAULT '',
+    akun_id INTEGER,
+    debit INTEGER NOT NULL DEFAULT 0,
+    kredit INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_log_jurnal_id ON log_jurnal(jurnal_id);
+CREATE TRIGGER IF NOT EXISTS log_jurnal_tanpa_ubah BEFORE UPDATE ON log_jurnal
+BEGIN SELECT RAISE(ABORT, 'log jurnal hanya bisa ditambah'); END;
+CREATE TRIGGER IF NOT EXISTS log_jurnal_tanpa_hapus BEFORE DELETE ON log_jurnal
+BEGIN SELECT RAISE(ABORT, 'log jurnal hanya bisa ditambah'); END;
+CREATE TRIGGER IF NOT EXISTS log_batch_tanpa_ubah BEFORE UPDATE ON log_batch
+BEGIN SELECT RAISE(ABORT, 'log jurnal hanya bisa ditambah'); END;
+CREATE TRIGGER IF NOT EXISTS log_batch_tanpa_hapus BEFORE DELETE ON log_batch
+BEGIN SELECT RAISE(ABORT, 'log jurnal hanya bisa ditambah'); END;
+CREATE TABLE IF NOT EXISTS log_periode (
+    id INTEGER PRIMARY KEY,
+    waktu TEXT NOT NULL,
+    oleh TEXT NOT NULL DEFAULT '',
+    aksi TEXT NOT NULL,
+    periode TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS log_periode_tanpa_ubah BEFORE UPDATE ON log_periode
+BEGIN SELECT RAISE(ABORT, 'log periode hanya bisa ditambah'); END;
+CREATE TRIGGER IF NOT EXISTS log_periode_tanpa_hapus BEFORE DELETE ON log_periode
+BEGIN SELECT RAISE(ABORT, 'log periode hanya bisa ditambah'); END;
+CREATE TABLE IF NOT EXISTS checkpoint_log (
+    seq INTEGER NOT NULL,
+    waktu TEXT NOT NULL,
+    baris INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jurnal_checkpoint (
+    id INTEGER PRIMARY KEY,
+    tanggal TEXT NOT NULL DEFAULT '',
+    tgl TEXT,
+    keterangan TEXT NOT NULL DEFAULT '',
+    akun_id INTEGER,
+    debit INTEGER NOT NULL DEFAULT 0,
+    kredit INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+KOLOM_TABEL = "id, tanggal, tgl, keterangan, akun_id, debit, kredit"
+# Isi baris jurnal (sesudah ditambah / diubah, sebelum dihapus) → log
+CATAT_LOG = f"""
+INSERT INTO log_jurnal (batch, aksi, jurnal_id, tanggal, tgl, keterangan, akun_id, debit, kredit)
+SELECT ?, ?, {KOLOM_TABEL} FROM jurnal WHERE {{syarat}} ORDER BY id
+"""
+
+# Ringkasan (jumlah baris, total id, debit, kredit) tabel jurnal dan hasil checkpoint +
+# ekor log sesudah seq `?`: berbeda = tabel jurnal tidak sesuai log (perlu dipulihkan)
+RINGKAS_JURNAL = """
+WITH ekor AS (
+    SELECT jurnal_id AS id, aksi, debit, kredit FROM log_jurnal
+    WHERE seq IN (SELECT MAX(seq) FROM log_jurnal WHERE seq > ? GROUP BY jurnal_id)
+), harap AS (
+    SELECT id, debit, kredit FROM jurnal_checkpoint WHERE id NOT IN (SELECT id FROM ekor)
+    UNION ALL SELECT id, debit, kredit FROM ekor WHERE aksi != 'hapus'
+)
+SELECT COUNT(*), TOTAL(id), TOTAL(debit), TOTAL(kredit) FROM jurnal
+UNION ALL SELECT COUNT(*), TOTAL(id), TOTAL(debit), TOTAL(kredit) FROM harap
+"""
+
+# Kontribusi baris jurnal (yang memenuhi `syarat`) ke kubus, dikali tanda:
+# +1 saat baris ditulis, -1 sebelum baris diubah / dihapus. Periode = "YYYY-MM".
+# urut = id jurnal pertama akun di periode itu (urutan akun seperti di buku besar).
+UBAH_KUBUS = """
+INSERT INTO mutasi_periode (periode, akun_id, debit, kredit, baris, urut)
+SELECT substr(tgl, 1, 7), akun_id, ? * SUM(debit), ? * SUM(kredit), ? * COUNT(*), MIN(id)
+FROM jurnal WHERE {syarat} AND tgl IS NOT NULL AND akun_id IS NOT NULL
+GROUP BY substr(tgl, 1, 7), akun_id
+ON CONFLICT (periode, akun_id) DO UPDATE SET
+    debit = debit + excluded.debit, kredit = kredit + excluded.kredit, baris = baris + excluded.baris,
+    urut = MIN(urut, excluded.urut)
+"""
+
+# Setelah baris diubah / dihapus, urut sel kubus yang tersentuh dihitung ulang
+URUT_KUBUS = """
+UPDATE mutasi_periode SET urut = (
+    SELECT MIN(j.id) FROM jurnal j
+    WHERE j.akun_id = mutasi_periode.akun_id AND substr(j.tgl, 1, 7) = mutasi_periode.periode
+) WHERE (periode, akun_id) IN (SELECT periode, akun_id FROM temp.sel_kubus)
+"""
+
+# Total debit/kredit kumulatif per akun s.d. akhir periode :sampai = snapshot tutup buku
+# :snapshot ("" = belum ada) + mutasi kubus sesudah snapshot itu
+SALDO_KUMULATIF = """
+SELECT akun_id, SUM(debit) AS debit, SUM(kredit) AS kredit FROM (
+    SELECT akun_id, debit, kredit FROM saldo_penutup WHERE periode = :snapshot
+    UNION ALL
+    SELECT akun_id, debit, kredit FROM mutasi_periode WHERE periode > :snapshot AND periode <= :sampai
+) GROUP BY akun_id
+"""
+
+
+class PeriodeTerkunci(ValueError):
+    # Penulisan jurnal menyentuh periode yang sudah ditutup
+    pass
+
+
+# Skema 1 menyimpan teks ref/akun di setiap baris jurnal; pindahkan ke tabel akun
+MIGRASI_V1 = """
+BEGIN;
+DROP INDEX IF EXISTS idx_jurnal_tgl;
+DROP INDEX IF EXISTS idx_jurnal_ref;
+DROP INDEX IF EXISTS idx_jurnal_akun;
+ALTER TABLE jurnal RENAME TO jurnal_v1;
+""" + SKEMA + """
+INSERT OR IGNORE INTO akun (ref, nama)
+    SELECT ref, akun FROM jurnal_v1 WHERE TRIM(ref) != '' OR TRIM(akun) != '' ORDER BY id;
+INSERT INTO jurnal (id, tanggal, tgl, keterangan, akun_id, debit, kredit)
+    SELECT j.id, j.tanggal, j.tgl, j.keterangan, a.id, CAST(ROUND(j.debit) AS INTEGER), CAST(ROUND(j.kredit) AS INTEGER)
+    FROM jurnal_v1 j LEFT JOIN akun a ON a.ref = j.ref AND a.nama = j.akun;
+DROP TABLE jurnal_v1;
+COMMIT;
+"""
+
+# Skema 2 menyimpan debit/kredit sebagai REAL; bulatkan ke rupiah (SQLite tidak bisa
+# mengubah tipe kolom, jadi tabel jurnal dibangun ulang)
+MIGRASI_V2 = """
+BEGIN;
+DROP INDEX IF EXISTS idx_jurnal_tgl;
+DROP INDEX IF EXISTS idx_jurnal_akun;
+ALTER TABLE jurnal RENAME TO jurnal_v2;
+""" + SKEMA + """
+INSERT INTO jurnal (id, tanggal, tgl, keterangan, akun_id, debit, kredit)
+    SELECT id, tanggal, tgl, keterangan, akun_id, CAST(ROUND(debit) AS INTEGER), CAST(ROUND(kredit) AS INTEGER)
+    FROM jurnal_v2;
+DROP TABLE jurnal_v2;
+COMMIT;
+"""
+
+
+def parse_tanggal(series):
+    # ISO (2025-01-31) dulu, sisanya format Indonesia hari-dulu (31/01/2025)
+    teks = series.astype(str).str.strip().where(series.notna(), "")
+    hasil = pd.to_datetime(teks, errors="coerce", format="ISO8601")
+    sisa = hasil.isna() & (teks != "")
+    if sisa.any():
+        hasil[sisa] = pd.to_datetime(teks[sisa], errors="coerce", dayfirst=True, format="mixed")
+    return hasil
+
+
+def _tgl_iso(series):
+    # Tanggal ter-parse dalam bentuk teks ISO untuk kolom berindeks (None kalau tidak valid)
+    tgl = parse_tanggal(series)
+    return tgl.dt.strftime("%Y-%m-%d").astype(object).where(tgl.notna(), None)
+
+
+def _baris_kosong(df):
+    teks = [df[col].astype(str).str.strip().isin(["", "nan", "None"]) for col in ["Tanggal", "Keterangan", "Ref", "Akun"]]
+    angka = [ke_rupiah(df[col]) == 0 for col in ["Debit (Rp)", "Kredit (Rp)"]]
+    return np.logical_and.reduce(teks + angka)
+
+
+def _teks(df, col):
+    return df[col].astype(str).where(df[col].notna(), "").tolist()
+
+
+def _ke_record(df, akun_id):
+    # Baris DataFrame jurnal → tuple kolom tabel (tanpa id)
+    angka = {col: ke_rupiah(df[col]).tolist() for col in ["Debit (Rp)", "Kredit (Rp)"]}
+    return list(zip(
+        _teks(df, "Tanggal"), _tgl_iso(df["Tanggal"]).tolist(), _teks(df, "Keterangan"), akun_id,
+        angka["Debit (Rp)"], angka["Kredit (Rp)"],
+    ))
+
+
+class JurnalStore:
+    def __init__(self, lokasi=LOKASI_DB, baca_saja=False):
+        self.lokasi = lokasi
+        self._lock = threading.Lock()
+        self._bagan = None
+        self._thread_checkpoint = None
+        # Naik setiap kali isi jurnal berubah lewat objek ini (dipakai cache pembaca)
+        self.versi = 0
+        if baca_saja:
+            # Hanya baca (mis. laporan batch dari database yang sedang dipakai aplikasi):
+            # tanpa migrasi, checkpoint atau pengaturan WAL; skema lain ditolak
+            self._conn = sqlite3.connect(Path(lokasi).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+            versi = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if versi != VERSI_SKEMA:
+                self._conn.close()
+                raise ValueError(
+                    f"Skema database {lokasi} versi {versi}, dibutuhkan versi {VERSI_SKEMA}; "
+                    "buka sekali lewat aplikasi supaya dimigrasi."
+                )
+            return
+        # Streamlit bisa menjalankan rerun di thread berbeda, jadi koneksi dijaga dengan lock.
+        # Timeout longgar: checkpoint latar memegang kunci tulis selama menyalin jurnal
+        self._conn = sqlite3.connect(lokasi, timeout=60, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # FULL: setiap commit (= satu batch log + perubahan jurnal) di-fsync
+            self._conn.execute("PRAGMA synchronous=FULL")
+            versi = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            kolom = {r[1]: r[2].upper() for r in self._conn.execute("PRAGMA table_info(jurnal)")}
+            if versi < 2 and "ref" in kolom:
+                self._conn.executescript(MIGRASI_V1)
+            elif kolom.get("debit") == "REAL":
+                self._conn.executescript(MIGRASI_V2)
+            else:
+                self._conn.executescript(SKEMA)
+            if versi < 4:
+                self._bangun_kubus(self._conn.cursor())
+            if versi < 6:
+                # Jurnal yang sudah ada sebelum log = checkpoint awal (seq 0)
+                self._checkpoint(self._conn.cursor())
+            if versi < 7:
+                self._mulai_id(self._conn.cursor())
+            self._lengkapi_jenis(self._conn.cursor())
+            self._conn.execute(f"PRAGMA user_version={VERSI_SKEMA}")
+        # Tabel jurnal tidak sesuai checkpoint + log (mis. file rusak sebagian, atau diubah
+        # di luar aplikasi): tulis ulang dari log sebelum dipakai
+        if not self.periksa():
+            self.pulihkan(oleh="sistem", sumber="pulihkan otomatis saat database dibuka")
+
+    def close(self):
+        # Checkpoint latar yang sedang berjalan diselesaikan dulu
+        if self._thread_checkpoint is not None:
+            self._thread_checkpoint.join()
+        # Lewat lock: query yang sedang berjalan di thread lain diselesaikan dulu
+        with self._lock:
+            self._conn.close()
+
+    def jumlah(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jurnal").fetchone()[0]
+
+    def tahun_terakhir(self):
+        with self._lock:
+            tgl = self._conn.execute("SELECT MAX(tgl) FROM jurnal").fetchone()[0]
+        return int(tgl[:4]) if tgl else None
+
+    def _lengkapi_jenis(self, cur):
+        # Akun hasil migrasi belum punya jenis/saldo normal; isi dari aturan klasifikasi
+        baris = cur.execute("SELECT id, ref, nama FROM akun WHERE jenis IS NULL").fetchall()
+        if baris:
+            ids, ref, nama = zip(*baris)
+            jenis, saldo = jenis_akun(ref, nama)
+            cur.executemany("UPDATE akun SET jenis=?, saldo_normal=? WHERE id=?", zip(jenis, saldo, ids))
+
+    def _mulai_id(self, cur):
+        # Penghitung id jurnal mulai dari id terbesar yang pernah ada (termasuk baris
+        # yang sudah dihapus dan hanya tersisa di log), supaya id tidak pernah dipakai ulang
+        cur.execute("DELETE FROM id_jurnal")
+        cur.execute(
+            "INSERT INTO id_jurnal (terakhir) SELECT MAX("
+            "(SELECT COALESCE(MAX(id), 0) FROM jurnal), "
+            "(SELECT COALESCE(MAX(jurnal_id), 0) FROM log_jurnal), "
+            "(SELECT COALESCE(MAX(id), 0) FROM jurnal_checkpoint))"
+        )
+
+    def _bangun_kubus(self, cur):
+        # Kubus periode × akun dari nol (database lama / perbaikan manual)
+        cur.execute("DELETE FROM mutasi_periode")
+        cur.execute(UBAH_KUBUS.format(syarat="1"), (1, 1, 1))
+
+    def _isi_sentuh(self, cur, ids):
+        # id baris lama yang akan diubah / dihapus → tabel sementara
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS sentuh (id INTEGER PRIMARY KEY)")
+        cur.execute("DELETE FROM temp.sentuh")
+        cur.executemany("INSERT OR IGNORE INTO temp.sentuh (id) VALUES (?)", [(int(i),) for i in ids])
+
+    def _cek_kunci(self, cur, tgl_baru, ada_sentuh):
+        # Tolak penulisan kalau tanggal lama (baris yang diubah / dihapus) atau tanggal
+        # baru jatuh di periode yang sudah ditutup; baris tanpa tanggal selalu boleh
+        terkunci = cur.execute("SELECT MAX(periode) FROM tutup_buku").fetchone()[0]
+        if terkunci is None:
+            return
+        batas = f"{terkunci}-32"
+        lama = cur.execute(
+            "SELECT MIN(tgl) FROM jurnal WHERE id IN (SELECT id FROM temp.sentuh) AND tgl < ?", (batas,)
+        ).fetchone()[0] if ada_sentuh else None
+        baru = min((t for t in tgl_baru if t is not None and t < batas), default=None)
+        if lama or baru:
+            raise PeriodeTerkunci(
+                f"Periode {(lama or baru)[:7]} sudah ditutup (tutup buku s.d. {terkunci}); "
+                "buka kembali periodenya untuk mengubah jurnal."
+            )
+
+    def _keluarkan_dari_kubus(self, cur):
+        # Catat sel kubus milik baris lama (temp.sentuh), lalu kurangi kontribusinya
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS sel_kubus (periode TEXT, akun_id INTEGER)")
+        cur.execute("DELETE FROM temp.sel_kubus")
+        cur.execute(
+            "INSERT INTO temp.sel_kubus SELECT DISTINCT substr(tgl, 1, 7), akun_id FROM jurnal "
+            "WHERE id IN (SELECT id FROM temp.sentuh) AND tgl IS NOT NULL AND akun_id IS NOT NULL"
+        )
+        cur.execute(UBAH_KUBUS.format(syarat="id IN (SELECT id FROM temp.sentuh)"), (-1, -1, -1))
+
+    def kubus(self, daftar_periode):
+        # Mutasi per (periode "YYYY-MM", akun) untuk periode yang diminta, urut kemunculan
+        # akun di jurnal (sama dengan urutan buku besar / Neraca Saldo)
+        daftar_periode = [str(p) for p in daftar_periode]
+        if not daftar_periode:
+            return pd.DataFrame(columns=["periode", "akun_id", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"])
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT m.periode, m.akun_id, a.ref, a.nama, m.debit, m.kredit FROM mutasi_periode m "
+                f"JOIN akun a ON a.id = m.akun_id WHERE m.periode IN ({', '.join('?' * len(daftar_periode))}) "
+                "ORDER BY m.urut, m.akun_id",
+                self._conn, params=daftar_periode,
+            )
+        df.columns = ["periode", "akun_id", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
+        df["Debit (Rp)"], df["Kredit (Rp)"] = ke_rupiah(df["Debit (Rp)"]), ke_rupiah(df["Kredit (Rp)"])
+        return df
+
+    # === Log perubahan & checkpoint ===
+    def _checkpoint(self, cur):
+        # Salinan jurnal saat ini + seq log terakhir yang tercakup; checkpoint lama diganti
+        seq = cur.execute("SELECT COALESCE(MAX(seq), 0) FROM log_jurnal").fetchone()[0]
+        cur.execute("DELETE FROM jurnal_checkpoint")
+        cur.execute(f"INSERT INTO jurnal_checkpoint ({KOLOM_TABEL}) SELECT {KOLOM_TABEL} FROM jurnal")
+        cur.execute("DELETE FROM checkpoint_log")
+        cur.execute("INSERT INTO checkpoint_log (seq, waktu, baris) SELECT ?, datetime('now'), COUNT(*) FROM jurnal_checkpoint", (seq,))
+
+    def checkpoint(self):
+        # Koneksi sendiri (bukan self._conn): pembaca & penulis lain tidak menunggu lock
+        # objek ini selama jurnal disalin, hanya kunci tulis SQLite
+        conn = sqlite3.connect(self.lokasi, timeout=60)
+        try:
+            with conn:
+                conn.execute("PRAGMA synchronous=FULL")
+                cur = conn.cursor()
+                cur.execute("BEGIN IMMEDIATE")
+                self._checkpoint(cur)
+        finally:
+            conn.close()
+
+    def _checkpoint_latar(self):
+        # Dipanggil sesudah commit tulis(): checkpoint di thread terpisah, paling banyak satu
+        if self._thread_checkpoint is not None and self._thread_checkpoint.is_alive():
+            return
+        self._thread_checkpoint = threading.Thread(target=self.checkpoint, name="checkpoint-jurnal", daemon=True)
+        self._thread_checkpoint.start()
+
+    def _rekonstruksi(self, conn):
+        # Jurnal dibangun ulang tanpa membaca tabel jurnal: checkpoint terakhir, lalu ekor
+        # log sesudahnya (per id cukup aksi terakhir; "hapus" = baris tidak ada).
+        # Pemanggil yang menyediakan transaksi supaya ketiga query melihat snapshot yang sama.
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM checkpoint_log").fetchone()[0]
+        dasar = pd.read_sql_query(f"SELECT {KOLOM_TABEL} FROM jurnal_checkpoint", conn)
+        ekor = pd.read_sql_query(
+            "SELECT aksi, jurnal_id AS id, tanggal, tgl, keterangan, akun_id, debit, kredit "
+            "FROM log_jurnal WHERE seq > ? ORDER BY seq",
+            conn, params=(seq,),
+        )
+        terakhir = ekor.drop_duplicates("id", keep="last")
+        hasil = pd.concat([dasar[~dasar["id"].isin(terakhir["id"])],
+                           terakhir[terakhir["aksi"] != "hapus"].drop(columns="aksi")])
+        return hasil.sort_values("id").reset_index(drop=True)
+
+    def rekonstruksi(self):
+        with self._lock:
+            # Satu transaksi baca: checkpoint latar tidak boleh terselip di antara query
+            self._conn.execute("BEGIN")
+            try:
+                return self._rekonstruksi(self._conn)
+            finally:
+                self._conn.commit()
+
+    def periksa(self):
+        # True kalau tabel jurnal cocok dengan checkpoint + ekor log (ringkasan, bukan per baris)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM checkpoint_log").fetchone()[0]
+                jurnal, harap = self._conn.execute(RINGKAS_JURNAL, (seq,)).fetchall()
+            finally:
+                self._conn.commit()
+        return jurnal == harap
+
+    def pulihkan(self, oleh="", sumber="pulihkan"):
+        # Tulis ulang tabel jurnal dari checkpoint + ekor log (mis. setelah file rusak
+        # sebagian); kubus periode ikut dibangun ulang. Pemulihan dicatat di log_batch.
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            jurnal = self._rekonstruksi(self._conn)
+            cur.execute(
+                "INSERT INTO log_batch (waktu, oleh, sumber) VALUES (datetime('now'), ?, ?)",
+                (str(oleh), f"{sumber} ({len(jurnal)} baris)"),
+            )
+            cur.execute("DELETE FROM jurnal")
+            cur.executemany(
+                f"INSERT INTO jurnal ({KOLOM_TABEL}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                jurnal.astype(object).where(jurnal.notna(), None).itertuples(index=False, name=None),
+            )
+            self._bangun_kubus(cur)
+            self.versi += 1
+        return len(jurnal)
+
+    def riwayat(self, batas=200, jurnal_id=None):
+        # Entri log terbaru (audit: siapa mengubah apa, kapan, dari mana)
+        syarat, param = ("WHERE l.jurnal_id = ?", [int(jurnal_id)]) if jurnal_id is not None else ("", [])
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT l.seq, b.waktu, b.oleh, b.sumber, l.aksi, l.jurnal_id, l.tanggal, l.keterangan, "
+                "a.ref, a.nama, l.debit, l.kredit FROM log_jurnal l JOIN log_batch b ON b.id = l.batch "
+                f"LEFT JOIN akun a ON a.id = l.akun_id {syarat} ORDER BY l.seq DESC LIMIT ?",
+                self._conn, params=param + [int(batas)],
+            )
+        df.columns = ["No", "Waktu", "Oleh", "Sumber", "Aksi", "id", "Tanggal", "Keterangan", "Ref", "Akun",
+                      "Debit (Rp)", "Kredit (Rp)"]
+        df["Ref"], df["Akun"] = df["Ref"].fillna(""), df["Akun"].fillna("")
+        return df
+
+    # === Tutup buku ===
+    def periode_tutup(self):
+        # Periode terakhir yang ditutup ("YYYY-MM"); semua periode s.d. itu terkunci
+        with self._lock:
+            return self._conn.execute("SELECT MAX(periode) FROM tutup_buku").fetchone()[0]
+
+    def _snapshot_sebelum(self, cur, periode):
+        # Snapshot tutup buku terakhir yang tidak melewati `periode` ("" kalau belum ada)
+        return cur.execute("SELECT MAX(periode) FROM tutup_buku WHERE periode <= ?", (periode,)).fetchone()[0] or ""
+
+    def tutup_periode(self, periode, oleh=""):
+        # Simpan saldo kumulatif per akun s.d. akhir `periode` dan kunci semua periode s.d. itu
+        periode = str(periode)
+        if periode >= pd.Timestamp.today().strftime("%Y-%m"):
+            raise ValueError(f"Periode {periode} belum berakhir; hanya bulan yang sudah selesai bisa ditutup.")
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            terakhir = cur.execute("SELECT MAX(periode) FROM tutup_buku").fetchone()[0]
+            if terakhir is not None and periode <= terakhir:
+                raise PeriodeTerkunci(f"Periode {periode} sudah ditutup (tutup buku s.d. {terakhir}).")
+            cur.execute(
+                "INSERT INTO saldo_penutup (periode, akun_id, debit, kredit) "
+                f"SELECT :sampai, akun_id, debit, kredit FROM ({SALDO_KUMULATIF})",
+                {"snapshot": terakhir or "", "sampai": periode},
+            )
+            cur.execute("INSERT INTO tutup_buku (periode, ditutup) VALUES (?, datetime('now'))", (periode,))
+            self._catat_periode(cur, "tutup", periode, oleh)
+
+    def buka_periode(self, periode, oleh=""):
+        # Buka kembali `periode` dan semua periode sesudahnya (snapshot-nya dibuang)
+        periode = str(periode)
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("DELETE FROM saldo_penutup WHERE periode >= ?", (periode,))
+            if cur.execute("DELETE FROM tutup_buku WHERE periode >= ?", (periode,)).rowcount:
+                self._catat_periode(cur, "buka", periode, oleh)
+
+    def _catat_periode(self, cur, aksi, periode, oleh):
+        cur.execute(
+            "INSERT INTO log_periode (waktu, oleh, aksi, periode) VALUES (datetime('now'), ?, ?, ?)",
+            (str(oleh), aksi, periode),
+        )
+
+    def riwayat_periode(self, batas=50):
+        # Jejak audit tutup buku / buka kembali, terbaru dulu
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT waktu, oleh, aksi, periode FROM log_periode ORDER BY id DESC LIMIT ?",
+                self._conn, params=[int(batas)],
+            )
+        df.columns = ["Waktu", "Oleh", "Aksi", "Periode"]
+        return df
+
+    def saldo_kumulatif(self, periode):
+        # Total debit/kredit per akun sejak awal s.d. akhir `periode` (bentuk sama dengan
+        # kubus()): snapshot tutup buku terakhir + mutasi bulan-bulan sesudahnya
+        periode = str(periode)
+        with self._lock:
+            cur = self._conn.cursor()
+            snapshot = self._snapshot_sebelum(cur, periode)
+            df = pd.read_sql_query(
+                "SELECT :sampai AS periode, s.akun_id, a.ref, a.nama, s.debit, s.kredit "
+                f"FROM ({SALDO_KUMULATIF}) s JOIN akun a ON a.id = s.akun_id ORDER BY s.akun_id",
+                self._conn, params={"snapshot": snapshot, "sampai": periode},
+            )
+        df.columns = ["periode", "akun_id", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
+        df["Debit (Rp)"], df["Kredit (Rp)"] = ke_rupiah(df["Debit (Rp)"]), ke_rupiah(df["Kredit (Rp)"])
+        return df
+
+    def _id_akun(self, cur, df):
+        # Daftarkan pasangan (Ref, Akun) baru ke bagan akun; kembalikan akun_id per baris
+        ref, nama = _teks(df, "Ref"), _teks(df, "Akun")
+        kosong = [not r.strip() and not n.strip() for r, n in zip(ref, nama)]
+        baru = list(dict.fromkeys((r, n) for r, n, k in zip(ref, nama, kosong) if not k))
+        if baru:
+            jumlah = cur.execute("SELECT COUNT(*) FROM akun").fetchone()[0]
+            jenis, saldo = jenis_akun([r for r, _ in baru], [n for _, n in baru])
+            cur.executemany(
+                "INSERT OR IGNORE INTO akun (ref, nama, jenis, saldo_normal) VALUES (?, ?, ?, ?)",
+                [(r, n, j, s) for (r, n), j, s in zip(baru, jenis, saldo)],
+            )
+            if cur.execute("SELECT COUNT(*) FROM akun").fetchone()[0] != jumlah:
+                self._bagan = None
+        peta = {(r, n): i for i, r, n in cur.execute("SELECT id, ref, nama FROM akun")}
+        return [None if k else peta[(r, n)] for r, n, k in zip(ref, nama, kosong)]
+
+    def bagan_akun(self):
+        # Bagan akun di-cache sampai ada akun baru yang terdaftar
+        if self._bagan is None:
+            with self._lock:
+                df = pd.read_sql_query("SELECT id, ref, nama, jenis, saldo_normal FROM akun ORDER BY id", self._conn)
+            df.columns = KOLOM_AKUN
+            self._bagan = BaganAkun(df)
+        return self._bagan
+
+    def muat(self, mulai=None, sampai=None, tanpa_tanggal=True):
+        # Working set: baris dengan tgl di [mulai, sampai] (pakai indeks tgl),
+        # plus baris yang tanggalnya kosong/tidak terbaca agar tidak "hilang"
+        syarat, param = [], []
+        if mulai is not None or sampai is not None:
+            rentang = "tgl BETWEEN ? AND ?"
+            param += [mulai or "0000-00-00", sampai or "9999-12-31"]
+            syarat.append(f"({rentang} OR tgl IS NULL)" if tanpa_tanggal else rentang)
+        where = f"WHERE {' AND '.join(syarat)}" if syarat else ""
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT id, tanggal, keterangan, akun_id, debit, kredit FROM jurnal {where} ORDER BY id",
+                self._conn, params=param,
+            )
+        df["Ref"], df["Akun"] = self.bagan_akun().kolom_akun(df["akun_id"])
+        df = df.rename(columns={"tanggal": "Tanggal", "keterangan": "Keterangan", "debit": "Debit (Rp)", "kredit": "Kredit (Rp)"})
+        df["Debit (Rp)"], df["Kredit (Rp)"] = ke_rupiah(df["Debit (Rp)"]), ke_rupiah(df["Kredit (Rp)"])
+        df["id"] = df["id"].astype("Int64")
+        return df[KOLOM_JURNAL + ["id"]]
+
+    def muat_tahun(self, tahun):
+        return self.muat(f"{int(tahun):04d}-01-01", f"{int(tahun):04d}-12-31")
+
+    def muat_bulan(self, bulan, tahun):
+        # Range query pada indeks tgl, hanya baris bertanggal valid di bulan itu
+        awal = f"{int(tahun):04d}-{int(bulan):02d}-01"
+        return self.muat(awal, awal[:8] + "31", tanpa_tanggal=False)
+
+    def _saring_halaman(self, tahun, cari):
+        # FROM + WHERE grid Jurnal Umum: tahun terpilih + baris tanpa tanggal, opsional pencarian
+        syarat = ["(j.tgl BETWEEN ? AND ? OR j.tgl IS NULL)"]
+        param = [f"{int(tahun):04d}-01-01", f"{int(tahun):04d}-12-31"]
+        if str(cari).strip():
+            syarat.append("(j.keterangan LIKE ? OR j.tanggal LIKE ? OR a.ref LIKE ? OR a.nama LIKE ?)")
+            param += [f"%{str(cari).strip()}%"] * 4
+        return f"FROM jurnal j LEFT JOIN akun a ON a.id = j.akun_id WHERE {' AND '.join(syarat)}", param
+
+    def jumlah_baris(self, tahun, cari=""):
+        dari, param = self._saring_halaman(tahun, cari)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) {dari}", param).fetchone()[0]
+
+    def halaman(self, tahun, nomor=0, ukuran=50, cari="", urut="id", turun=False):
+        # Satu halaman grid langsung dari database (Ref/Akun sebagai teks biasa):
+        # hanya baris halaman itu yang dikirim ke browser
+        dari, param = self._saring_halaman(tahun, cari)
+        arah = "DESC" if turun else "ASC"
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT j.tanggal, j.keterangan, COALESCE(a.ref, '') AS ref, COALESCE(a.nama, '') AS nama, "
+                f"j.debit, j.kredit, j.id {dari} "
+                f"ORDER BY {URUTAN_HALAMAN.get(urut, 'j.id')} {arah}, j.id {arah} LIMIT ? OFFSET ?",
+                self._conn, params=param + [int(ukuran), int(nomor) * int(ukuran)],
+            )
+        df.columns = KOLOM_JURNAL + ["id"]
+        df["Debit (Rp)"], df["Kredit (Rp)"] = ke_rupiah(df["Debit (Rp)"]), ke_rupiah(df["Kredit (Rp)"])
+        df["id"] = df["id"].astype("Int64")
+        return df
+
+    def tulis(self, tambah=None, ubah=None, hapus=(), oleh="", sumber="grid"):
+        # Satu transaksi batch untuk semua perubahan (+ satu batch log atas nama `oleh`);
+        # kembalikan id baris yang ditambahkan
+        id_baru = []
+        ada_ubah = ubah is not None and len(ubah)
+        ada_tambah = tambah is not None and len(tambah)
+        if not (len(hapus) or ada_ubah or ada_tambah):
+            return id_baru
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            disentuh = [int(i) for i in hapus] + ([int(i) for i in ubah["id"]] if ada_ubah else [])
+            if disentuh:
+                self._isi_sentuh(cur, disentuh)
+            tgl_baru = [t for df, ada in ((ubah, ada_ubah), (tambah, ada_tambah)) if ada for t in _tgl_iso(df["Tanggal"])]
+            self._cek_kunci(cur, tgl_baru, bool(disentuh))
+            if disentuh:
+                # Kontribusi lama baris yang diubah / dihapus dikeluarkan dari kubus dulu
+                self._keluarkan_dari_kubus(cur)
+            batch = cur.execute(
+                "INSERT INTO log_batch (waktu, oleh, sumber) VALUES (datetime('now'), ?, ?)", (str(oleh), str(sumber))
+            ).lastrowid
+            if len(hapus):
+                cur.executemany(CATAT_LOG.format(syarat="id = ?"), [(batch, "hapus", int(i)) for i in hapus])
+                cur.executemany("DELETE FROM jurnal WHERE id = ?", [(int(i),) for i in hapus])
+            if ada_ubah:
+                cur.executemany(
+                    "UPDATE jurnal SET tanggal=?, tgl=?, keterangan=?, akun_id=?, debit=?, kredit=? WHERE id=?",
+                    [rec + (int(i),) for rec, i in zip(_ke_record(ubah, self._id_akun(cur, ubah)), ubah["id"])],
+                )
+                cur.executemany(CATAT_LOG.format(syarat="id = ?"), [(batch, "ubah", int(i)) for i in ubah["id"]])
+                cur.execute(UBAH_KUBUS.format(syarat="id IN (SELECT id FROM temp.sentuh)"), (1, 1, 1))
+            if ada_tambah:
+                # id baru diambil dari penghitung di transaksi yang sama (bukan MAX(id) + 1),
+                # jadi id baris yang sudah dihapus tidak pernah dipakai lagi
+                cur.execute("UPDATE id_jurnal SET terakhir = terakhir + ?", (len(tambah),))
+                mulai = cur.execute("SELECT terakhir FROM id_jurnal").fetchone()[0] - len(tambah) + 1
+                id_baru = list(range(mulai, mulai + len(tambah)))
+                cur.executemany(
+                    "INSERT INTO jurnal (id, tanggal, tgl, keterangan, akun_id, debit, kredit) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(i,) + rec for i, rec in zip(id_baru, _ke_record(tambah, self._id_akun(cur, tambah)))],
+                )
+                cur.execute(CATAT_LOG.format(syarat="id BETWEEN ? AND ?"), (batch, "tambah", id_baru[0], id_baru[-1]))
+                cur.execute(UBAH_KUBUS.format(syarat="id BETWEEN ? AND ?"), (1, 1, 1, id_baru[0], id_baru[-1]))
+            if disentuh:
+                cur.execute(URUT_KUBUS)
+            cur.execute("DELETE FROM mutasi_periode WHERE baris = 0")
+            seq_checkpoint = cur.execute("SELECT COALESCE(MAX(seq), 0) FROM checkpoint_log").fetchone()[0]
+            perlu_checkpoint = (
+                cur.execute("SELECT COALESCE(MAX(seq), 0) FROM log_jurnal").fetchone()[0] - seq_checkpoint >= CHECKPOINT_SETIAP
+            )
+            self.versi += 1
+        # Checkpoint menyalin seluruh jurnal: jangan di dalam transaksi penulisan pengguna
+        if perlu_checkpoint:
+            self._checkpoint_latar()
+        return id_baru
+
+    def sinkron(self, lama, baru, oleh=""):
+        # Tulis change set grid ke database: hanya baris yang diubah / ditambah / dihapus.
+        # `baru` = frame hasil grid atau Perubahan terhadap `lama`. Baris kosong tidak
+        # disimpan; id baris baru diisi ke kolom "id".
+        if lama is None:
+            lama = pd.DataFrame({col: pd.Series(dtype=object) for col in KOLOM_JURNAL + ["id"]})
+        perubahan = baru if isinstance(baru, Perubahan) else Perubahan(lama, baru)
+        if not perubahan:
+            # Tidak ada perubahan: pertahankan objek lama supaya cache turunan (indeks
+            # tanggal, buku besar per periode) tetap berlaku
+            return lama
+
+        baru = perubahan.terapkan(lama)
+        if "id" not in baru:
+            baru["id"] = pd.NA
+        baru["id"] = pd.array(pd.to_numeric(baru["id"], errors="coerce"), dtype="Int64")
+        hapus = [int(i) for i in pd.Series(perubahan.id_dihapus, dtype="Int64").dropna()]
+        posisi = np.concatenate([perubahan.diubah, perubahan.ditambah])
+        kandidat = baru.iloc[posisi]
+        kosong = _baris_kosong(kandidat)
+        punya_id = kandidat["id"].notna().to_numpy()
+        # Baris yang dikosongkan lagi dihapus dari database
+        hapus += [int(i) for i in kandidat["id"][punya_id & kosong]]
+        ubah = kandidat[punya_id & ~kosong]
+        tambah = kandidat[~punya_id & ~kosong]
+
+        id_baru = self.tulis(tambah=tambah, ubah=ubah, hapus=hapus, oleh=oleh)
+        kolom_id = baru.columns.get_loc("id")
+        if id_baru:
+            baru.iloc[posisi[~punya_id & ~kosong], kolom_id] = id_baru
+        if (punya_id & kosong).any():
+            baru.iloc[posisi[punya_id & kosong], kolom_id] = pd.NA
+        return kategorikan(baru)
+
+
+def terapkan_halaman(data, lama, baru):
+    # Patch working set dengan hasil edit satu halaman grid (lama = halaman yang dikirim,
+    # baru = hasil sinkron, id sudah terisi). Baris lain tidak disentuh; baris yang
+    # diubah tetap di posisinya, baris baru di belakang, baris yang dihapus dibuang.
+    baru = baru[baru["id"].notna()]
+    tetap = data[~data["id"].isin(lama["id"].dropna())]
+    gabung = pd.concat([tanpa_kategori(tetap), tanpa_kategori(baru[data.columns])], ignore_index=True)
+    urutan = pd.Index(data["id"]).get_indexer(gabung["id"])
+    baris_baru = urutan < 0
+    urutan[baris_baru] = len(data) + np.arange(baris_baru.sum())
+    return kategorikan(gabung.iloc[np.argsort(urutan, kind="stable")].reset_index(drop=True))
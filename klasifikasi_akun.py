@@ -0,0 +1,123 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from uang import ke_rupiah, kolom_rupiah
+
+# === Klasifikasi akun Neraca Saldo → tabel Laporan Keuangan ===
+# Aturan kata kunci (nama akun) dan kode akun (awalan Ref) dikompilasi sekali
+# menjadi satu regex. Urutan aturan = prioritas: alternatif regex dicoba berurutan
+# di awal teks, jadi aturan pertama yang cocok yang menang (sama seperti rantai elif).
+
+# (kategori, kata kunci di nama akun)
+ATURAN_KATA = [
+    ("pendapatan", ["pendapatan", "penjualan", "penerimaan"]),
+    ("beban", ["beban", "biaya", "gaji", "sewa", "pembayaran"]),
+    ("aktiva_lancar", ["kas", "perlengkapan", "piutang"]),
+    ("aktiva_tetap", ["peralatan", "gedung", "kendaraan"]),
+    ("modal", ["modal"]),
+    ("kewajiban", ["hutang", "utang"]),
+]
+
+# (kategori, awalan Ref) — cadangan kalau nama akun tidak cocok kata kunci mana pun.
+# Hanya golongan yang tidak ambigu: golongan 1 bisa lancar atau tetap, dan golongan 3
+# juga berisi prive yang tidak boleh menimpa modal awal.
+ATURAN_KODE = [
+    ("kewajiban", ["2"]),
+    ("pendapatan", ["4"]),
+    ("beban", ["5"]),
+]
+
+KATEGORI = ["pendapatan", "beban", "aktiva_lancar", "aktiva_tetap", "modal", "kewajiban"]
+
+_PEMISAH = "\x1f"  # memisahkan nama akun dan Ref dalam satu teks kunci
+
+
+def _kompilasi(aturan_kata, aturan_kode):
+    alternatif, kategori = [], []
+    for nama, kata in aturan_kata:
+        pola = "|".join(re.escape(k) for k in kata)
+        alternatif.append(f"(?=[^{_PEMISAH}]*(?:{pola}))")
+        kategori.append(nama)
+    for nama, awalan in aturan_kode:
+        pola = "|".join(re.escape(a) for a in awalan)
+        alternatif.append(f"(?=[^{_PEMISAH}]*{_PEMISAH}\\s*(?:{pola}))")
+        kategori.append(nama)
+    # Satu grup bernama kosong per aturan; grup yang terisi ("") = aturan yang cocok
+    pola = "|".join(f"^{alt}(?P<a{i}>)" for i, alt in enumerate(alternatif))
+    return re.compile(pola), kategori
+
+
+POLA, KATEGORI_ATURAN = _kompilasi(ATURAN_KATA, ATURAN_KODE)
+
+
+def kategori_akun(akun, ref=None):
+    # Kategori per baris (None kalau tidak cocok aturan mana pun) dalam satu pass vektor
+    teks = akun.astype(str).str.lower()
+    if ref is not None:
+        teks = teks + _PEMISAH + ref.astype(str).str.strip()
+    cocok = teks.str.extract(POLA).notna().to_numpy()
+    ada = cocok.any(axis=1)
+    pilih = np.array(KATEGORI_ATURAN + [None], dtype=object)
+    return pd.Series(pilih[np.where(ada, cocok.argmax(axis=1), len(KATEGORI_ATURAN))], index=akun.index)
+
+
+def _tabel(kosong, isi):
+    # Tabel laporan selalu diawali satu baris kosong untuk input manual
+    tabel = pd.concat([pd.DataFrame([kosong]), pd.DataFrame(isi)], ignore_index=True)
+    for col in kolom_rupiah(tabel):
+        tabel[col] = ke_rupiah(tabel[col])
+    return tabel
+
+
+def klasifikasi_neraca(df_neraca):
+    # Neraca Saldo (Ref, Akun, Debit, Kredit) → semua tabel laporan sekaligus
+    df = df_neraca[df_neraca["Akun"].astype(str).str.strip() != ""].reset_index(drop=True)
+    akun = df["Akun"]
+    debit = ke_rupiah(df["Debit (Rp)"])
+    kredit = ke_rupiah(df["Kredit (Rp)"])
+    kategori = kategori_akun(akun, df["Ref"] if "Ref" in df else None)
+    grup = {k: np.flatnonzero(kategori.to_numpy() == k) for k in KATEGORI}
+
+    def ambil(k):
+        pos = grup[k]
+        return akun.iloc[pos].tolist(), debit.iloc[pos].tolist(), kredit.iloc[pos].tolist()
+
+    hasil = {}
+    nama, d, k = ambil("pendapatan")
+    hasil["pendapatan"] = _tabel({"Jenis Pendapatan": "", "Debit (Rp)": 0, "Kredit (Rp)": 0},
+                                 {"Jenis Pendapatan": nama, "Debit (Rp)": d, "Kredit (Rp)": k})
+    nama, d, k = ambil("beban")
+    hasil["beban"] = _tabel({"Jenis Beban": "", "Debit (Rp)": 0, "Kredit (Rp)": 0},
+                            {"Jenis Beban": nama, "Debit (Rp)": d, "Kredit (Rp)": k})
+    nama, d, _ = ambil("aktiva_lancar")
+    hasil["aktiva_lancar"] = _tabel({"Item": "", "Jumlah (Rp)": 0}, {"Item": nama, "Jumlah (Rp)": d})
+    nama, d, _ = ambil("aktiva_tetap")
+    hasil["aktiva_tetap"] = _tabel({"Item": "", "Jumlah (Rp)": 0}, {"Item": nama, "Jumlah (Rp)": d})
+    nama, _, k = ambil("kewajiban")
+    hasil["kewajiban"] = _tabel({"Item": "", "Jumlah (Rp)": 0}, {"Item": nama, "Jumlah (Rp)": k})
+    # Modal awal = kredit akun modal terakhir
+    hasil["modal_data"] = {"modal_awal": int(kredit.iloc[grup["modal"][-1]]) if len(grup["modal"]) else 0}
+
+    # Arus kas operasi: penerimaan pendapatan (+kredit) dan pembayaran beban (−debit),
+    # tetap dalam urutan Neraca Saldo
+    kat = kategori.to_numpy()
+    masuk = (kat == "pendapatan") & (kredit.to_numpy() > 0)
+    keluar = (kat == "beban") & (debit.to_numpy() > 0)
+    operasi = masuk | keluar
+    hasil["arus_kas_operasi"] = _tabel({"Aktivitas": "", "Jumlah (Rp)": 0}, {
+        "Aktivitas": akun[operasi].tolist(),
+        "Jumlah (Rp)": np.where(masuk, kredit, -debit)[operasi].tolist(),
+    })
+    beli = (kat == "aktiva_tetap") & (debit.to_numpy() > 0)
+    hasil["arus_kas_investasi"] = _tabel({"Aktivitas": "", "Jumlah (Rp)": 0}, {
+        "Aktivitas": ("Pembelian " + akun[beli].astype(str)).tolist(),
+        "Jumlah (Rp)": (-debit[beli]).tolist(),
+    })
+    setor = (kat == "modal") & (kredit.to_numpy() > 0)
+    hasil["arus_kas_pendanaan"] = _tabel({"Aktivitas": "", "Jumlah (Rp)": 0}, {
+        "Aktivitas": ["Setoran Modal"] * int(setor.sum()),
+        "Jumlah (Rp)": kredit[setor].tolist(),
+    })
+    return hasil
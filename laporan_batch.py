@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pandas as pd
+
+# === Laporan bulanan massal untuk banyak unit BUMDes ===
+# Satu file jurnal (CSV / XLSX / database .db) = satu unit BUMDes. Tiap unit diproses
+# di worker terpisah (process pool seukuran jumlah core): hitung semua laporan lewat
+# inti akuntansi lalu render semua PDF ke <keluaran>/<unit>/. Error di satu unit dicatat
+# di manifest dan tidak menghentikan unit lain.
+#
+#   python laporan_batch.py data_unit/ --bulan 01 --tahun 2025 --keluaran laporan/
+
+EKSTENSI = (".csv", ".xlsx", ".xlsm", ".db")
+
+
+def baca_jurnal(path):
+    # File unit → (jurnal, jumlah baris yang dilewati karena tidak valid, saldo normal
+    # per Ref dari bagan akun; None untuk CSV / XLSX)
+    path = Path(path)
+    if path.suffix.lower() == ".db":
+        from jurnal_store import JurnalStore
+
+        # Database unit bisa sedang dipakai aplikasi: buka hanya-baca, tanpa migrasi
+        store = JurnalStore(str(path), baca_saja=True)
+        try:
+            return store.muat().drop(columns=["id"]), 0, store.bagan_akun().saldo_ref
+        finally:
+            store.close()
+
+    from impor_jurnal import baca_bertahap, normalisasi
+
+    potongan, dilewati = [], 0
+    for mentah, _ in baca_bertahap(str(path)):
+        jurnal, _, alasan = normalisasi(mentah.reset_index(drop=True))
+        valid = alasan == ""
+        dilewati += int((~valid).sum())
+        potongan.append(jurnal[valid])
+    if not potongan:
+        from jurnal_store import KOLOM_JURNAL
+
+        return pd.DataFrame(columns=KOLOM_JURNAL), 0, None
+    return pd.concat(potongan, ignore_index=True), dilewati, None
+
+
+def proses_unit(path, bulan, tahun, keluaran):
+    # Dijalankan di worker; selalu mengembalikan entri manifest (tidak pernah raise)
+    from akuntansi import pdf_periode, proses_periode
+
+    unit = Path(path).stem
+    entri = {"unit": unit, "file": str(path), "status": "ok", "detik": {}}
+    mulai = waktu = time.perf_counter()
+
+    def catat(tahap):
+        nonlocal waktu
+        sekarang = time.perf_counter()
+        entri["detik"][tahap] = round(sekarang - waktu, 4)
+        waktu = sekarang
+
+    try:
+        jurnal, dilewati, saldo_normal = baca_jurnal(path)
+        entri["baris"] = len(jurnal)
+        entri["baris_dilewati"] = dilewati
+        catat("baca")
+
+        hasil = proses_periode(jurnal, bulan, tahun, saldo_normal=saldo_normal)
+        entri["laba_bersih"] = int(hasil["laba_bersih"])
+        catat("hitung")
+
+        folder = Path(keluaran) / unit
+        folder.mkdir(parents=True, exist_ok=True)
+        pdf = pdf_periode(hasil, bulan, tahun)
+        for nama, isi in pdf.items():
+            with open(folder / nama, "wb") as f:
+                for potongan in [isi] if isinstance(isi, bytes) else isi:
+                    f.write(potongan)
+        entri["pdf"] = sorted(pdf)
+        catat("pdf")
+    except Exception as e:
+        entri["status"] = "gagal"
+        entri["error"] = f"{type(e).__name__}: {e}"
+        entri["traceback"] = traceback.format_exc()
+    entri["detik"]["total"] = round(time.perf_counter() - mulai, 4)
+    return entri
+
+
+def cari_unit(direktori):
+    return sorted(p for p in Path(direktori).iterdir() if p.is_file() and p.suffix.lower() in EKSTENSI)
+
+
+def jalankan(direktori, bulan, tahun, keluaran, proses=None, log=print):
+    files = cari_unit(direktori)
+    proses = max(1, min(proses or os.cpu_count() or 1, len(files) or 1))
+    Path(keluaran).mkdir(parents=True, exist_ok=True)
+    mulai = time.perf_counter()
+
+    hasil = []
+    with ProcessPoolExecutor(max_workers=proses) as pool:
+        futures = {pool.submit(proses_unit, str(f), bulan, tahun, keluaran): f for f in files}
+        for future in as_completed(futures):
+            try:
+                entri = future.result()
+            except BrokenProcessPool as e:
+                # Worker mati (mis. kehabisan memori); unit lain yang belum selesai ikut gagal
+                entri = {"unit": futures[future].stem, "file": str(futures[future]), "status": "gagal",
+                         "error": f"worker berhenti: {e}", "detik": {}}
+            hasil.append(entri)
+            log(f"[{len(hasil)}/{len(files)}] {entri['unit']}: {entri['status']}"
+                + (f" ({entri['detik'].get('total', 0):.2f} s)" if entri["status"] == "ok" else f" — {entri.get('error')}"))
+
+    manifest = {
+        "bulan": bulan,
+        "tahun": int(tahun),
+        "dibuat": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "proses": proses,
+        "detik_total": round(time.perf_counter() - mulai, 4),
+        "jumlah_unit": len(files),
+        "gagal": sum(e["status"] != "ok" for e in hasil),
+        "unit": sorted(hasil, key=lambda e: e["unit"]),
+    }
+    with open(Path(keluaran) / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat laporan bulanan PDF untuk banyak unit BUMDes sekaligus")
+    parser.add_argument("direktori", help="folder berisi file jurnal per unit (.csv / .xlsx / .db)")
+    parser.add_argument("--bulan", required=True, help="bulan laporan, mis. 01")
+    parser.add_argument("--tahun", required=True, type=int)
+    parser.add_argument("--keluaran", default="laporan_batch")
+    parser.add_argument("--proses", type=int, default=None, help="jumlah worker (default: jumlah core)")
+    args = parser.parse_args(argv)
+
+    manifest = jalankan(args.direktori, f"{int(args.bulan):02d}", args.tahun, args.keluaran, args.proses)
+    print(f"{manifest['jumlah_unit'] - manifest['gagal']}/{manifest['jumlah_unit']} unit selesai "
+          f"dalam {manifest['detik_total']:.2f} s; manifest: {Path(args.keluaran) / 'manifest.json'}")
+    return 1 if manifest["gagal"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,680 @@
+import hashlib
+import numbers
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+import pandas as pd
+from fpdf import FPDF
+from fpdf.fonts import fpdf_charwidths
+
+# === Pembuat PDF laporan ===
+# Semua builder di sini murni (tanpa Streamlit) sehingga bisa dipanggil
+# belakangan, hanya ketika tombol download benar-benar diklik.
+
+bulan_dict = {
+    "01": "Januari", "02": "Februari", "03": "Maret",
+    "04": "April", "05": "Mei", "06": "Juni",
+    "07": "Juli", "08": "Agustus", "09": "September",
+    "10": "Oktober", "11": "November", "12": "Desember"
+}
+
+# Pilihan selectbox bulan: (kode, nama), dibuat sekali saat modul diimpor
+PILIHAN_BULAN = tuple(bulan_dict.items())
+
+
+def bytes_pdf(pdf):
+    # Dokumen FPDF → bytes langsung dari memori (tanpa file sementara di disk)
+    return pdf.output(dest="S").encode("latin1")
+
+
+# === Fungsi format rupiah aman ===
+# Satu-satunya tempat nominal (rupiah bulat int64, lihat uang.py) diubah jadi teks
+def format_rupiah(x):
+    try:
+        x = int(x) if isinstance(x, numbers.Integral) else round(float(x))
+        if x < 0:
+            return f"({abs(x):,})".replace(",", ".")
+        return f"{x:,}".replace(",", ".")
+    except (ValueError, TypeError, OverflowError):
+        return ""
+
+
+# === Writer PDF bertahap ===
+class PdfBertahap(FPDF):
+    # FPDF yang mengeluarkan halaman yang sudah selesai sebagai potongan bytes, lalu
+    # membuang isinya dari memori. Urutan objek sama dengan FPDF.output(): halaman + isi
+    # halaman, font, resource (obj 2), Pages (obj 1), info, katalog, xref; hanya offset
+    # xref yang dihitung absolut dari jumlah bytes yang sudah dikirim.
+    # Isi halaman dikumpulkan sebagai list (FPDF asli menyambung string per operasi).
+    # (Tanpa link antar halaman / alias jumlah halaman; laporan di sini tidak memakainya.)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._terkirim = 0
+        self._halaman_ditulis = 0
+        self._header_ditulis = False
+
+    def _beginpage(self, orientation):
+        super()._beginpage(orientation)
+        self.pages[self.page] = []
+
+    def _out(self, s):
+        if self.state != 2:
+            return super()._out(s)
+        if isinstance(s, bytes):
+            s = s.decode("latin1")
+        self.pages[self.page].append(f"{s}\n")
+
+    @property
+    def ada_halaman_selesai(self):
+        return self._halaman_ditulis < self.page - 1
+
+    def _newobj(self):
+        self.n += 1
+        self.offsets[self.n] = self._terkirim + len(self.buffer)
+        self._out(f"{self.n} 0 obj")
+
+    def _tulis_halaman(self, n):
+        w_pt, h_pt = (self.fw_pt, self.fh_pt) if self.def_orientation == "P" else (self.fh_pt, self.fw_pt)
+        self._newobj()
+        self._out("<</Type /Page")
+        self._out("/Parent 1 0 R")
+        if n in self.orientation_changes:
+            self._out(f"/MediaBox [0 0 {h_pt:.2f} {w_pt:.2f}]")
+        self._out("/Resources 2 0 R")
+        if self.pdf_version > "1.3":
+            self._out("/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>")
+        self._out(f"/Contents {self.n + 1} 0 R>>")
+        self._out("endobj")
+        isi = "".join(self.pages[n]).encode("latin1")
+        if self.compress:
+            isi = zlib.compress(isi)
+        self._newobj()
+        self._out(("<</Filter /FlateDecode " if self.compress else "<<") + f"/Length {len(isi)}>>")
+        self._putstream(isi)
+        self._out("endobj")
+        self.pages[n] = ""  # isi halaman sudah terkirim
+
+    def _tulis_selesai(self, sampai):
+        state, self.state = self.state, 1  # _out menulis ke buffer dokumen, bukan ke halaman
+        if not self._header_ditulis:
+            self._putheader()
+            self._header_ditulis = True
+        while self._halaman_ditulis < sampai:
+            self._halaman_ditulis += 1
+            self._tulis_halaman(self._halaman_ditulis)
+        self.state = state
+
+    def _kirim(self):
+        data = self.buffer.encode("latin1")
+        self._terkirim += len(data)
+        self.buffer = ""
+        return data
+
+    def ambil_potongan(self):
+        # Bytes semua halaman yang sudah selesai (halaman aktif masih ditulis)
+        self._tulis_selesai(self.page - 1)
+        return self._kirim()
+
+    def _putresources(self):
+        self._putfonts()
+        self._putimages()
+        self.offsets[2] = self._terkirim + len(self.buffer)
+        self._out("2 0 obj")
+        self._out("<<")
+        self._putresourcedict()
+        self._out(">>")
+        self._out("endobj")
+
+    def _enddoc(self):
+        self._tulis_selesai(self.page)
+        w_pt, h_pt = (self.fw_pt, self.fh_pt) if self.def_orientation == "P" else (self.fh_pt, self.fw_pt)
+        self.offsets[1] = self._terkirim + len(self.buffer)
+        self._out("1 0 obj")
+        self._out("<</Type /Pages")
+        self._out("/Kids [" + "".join(f"{3 + 2 * i} 0 R " for i in range(self.page)) + "]")
+        self._out(f"/Count {self.page}")
+        self._out(f"/MediaBox [0 0 {w_pt:.2f} {h_pt:.2f}]")
+        self._out(">>")
+        self._out("endobj")
+        self._putresources()
+        self._newobj()
+        self._out("<<")
+        self._putinfo()
+        self._out(">>")
+        self._out("endobj")
+        self._newobj()
+        self._out("<<")
+        self._putcatalog()
+        self._out(">>")
+        self._out("endobj")
+        xref = self._terkirim + len(self.buffer)
+        self._out("xref")
+        self._out(f"0 {self.n + 1}")
+        self._out("0000000000 65535 f ")
+        for i in range(1, self.n + 1):
+            self._out(f"{self.offsets[i]:010d} 00000 n ")
+        self._out("trailer")
+        self._out("<<")
+        self._puttrailer()
+        self._out(">>")
+        self._out("startxref")
+        self._out(xref)
+        self._out("%%EOF")
+        self.state = 3
+
+    def selesai(self):
+        # Tutup dokumen; kembalikan potongan terakhir (sisa halaman + trailer)
+        self.close()
+        return self._kirim()
+
+
+# === Ukur & bungkus teks sel tabel ===
+# Lebar kata diambil dari metrik font inti FPDF lewat memo per (font, ukuran, teks),
+# jadi kata/nominal yang berulang di ribuan baris cukup diukur sekali.
+_MM_PER_PT = 25.4 / 72
+
+
+@lru_cache(maxsize=1 << 16)
+def lebar_teks(font, ukuran_pt, teks):
+    # Lebar teks (mm) untuk font inti (mis. "helvetica", "helveticaB") pada ukuran pt
+    cw = fpdf_charwidths[font]
+    return sum(cw.get(c, 0) for c in teks) * ukuran_pt * _MM_PER_PT / 1000
+
+
+def pecah_teks(pdf, teks, lebar):
+    # Bungkus teks per kata ke baris selebar `lebar` (font aktif); kata yang lebih
+    # panjang dari kolom dipotong per huruf. Selalu minimal satu baris.
+    font, ukuran = pdf.font_family + pdf.font_style, pdf.font_size_pt
+    teks = str(teks)
+    if lebar_teks(font, ukuran, teks) <= lebar and "\n" not in teks:
+        return [teks]
+    spasi = lebar_teks(font, ukuran, " ")
+    baris, sekarang, terpakai = [], "", 0.0
+    for kata in teks.split():
+        w = lebar_teks(font, ukuran, kata)
+        if sekarang and terpakai + spasi + w <= lebar:
+            sekarang, terpakai = f"{sekarang} {kata}", terpakai + spasi + w
+            continue
+        if sekarang:
+            baris.append(sekarang)
+        sekarang, terpakai = kata, w
+        if w > lebar:
+            sekarang, terpakai = "", 0.0
+            for huruf in kata:
+                wh = lebar_teks(font, ukuran, huruf)
+                if sekarang and terpakai + wh > lebar:
+                    baris.append(sekarang)
+                    sekarang, terpakai = "", 0.0
+                sekarang, terpakai = sekarang + huruf, terpakai + wh
+    baris.append(sekarang)
+    return baris
+
+
+def buat_pdf(df, bulan, tahun):
+    pdf = PdfBertahap()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=False)  # handle manual
+    pdf.set_font("Arial", size=12)
+
+    # Nama bulan ("1" / 1 / "01" → "Januari")
+    try:
+        bulan_nama = bulan_dict.get(f"{int(bulan):02d}", "Unknown")
+    except (TypeError, ValueError):
+        bulan_nama = "Unknown"
+
+    # Judul
+    pdf.cell(0, 10, txt=f"Jurnal Umum BUMDes - {bulan_nama} {tahun}", ln=True, align="C")
+    pdf.ln(8)
+
+    # Lebar kolom: total 190 mm = lebar efektif A4 (210 mm, margin kiri+kanan 10 mm)
+    col_widths = [20, 60, 15, 25, 35, 35]
+    headers = ["Tanggal", "Keterangan", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
+    line_height = 6
+    align = ["C", "L", "C", "C", "R", "R"]
+
+    def print_header():
+        pdf.set_font("Arial", "B", 10)
+        for i, header in enumerate(headers):
+            pdf.cell(col_widths[i], line_height, header, border=1, align="C")
+        pdf.ln(line_height)
+        pdf.set_font("Arial", "", 9)
+
+    print_header()
+
+    # 1) Tata letak: teks semua sel dibungkus sekali di depan, tinggi baris = sel
+    #    dengan baris terbanyak, lalu halaman dibagi dalam satu lintasan
+    nilai = [
+        df["Tanggal"].astype(str).tolist(),
+        df["Keterangan"].astype(str).tolist(),
+        df["Ref"].astype(str).tolist(),
+        df["Akun"].astype(str).tolist(),
+        [format_rupiah(v) if pd.notna(v) else "0" for v in df["Debit (Rp)"]],
+        [format_rupiah(v) if pd.notna(v) else "0" for v in df["Kredit (Rp)"]],
+    ]
+    sel = [[pecah_teks(pdf, teks, lebar - 2 * pdf.c_margin) for teks in kolom]
+           for kolom, lebar in zip(nilai, col_widths)]
+    tinggi = [line_height * max(len(kolom[i]) for kolom in sel) for i in range(len(df))]
+
+    halaman_baru = set()
+    y = pdf.get_y()  # posisi baris pertama di bawah header tabel
+    for i, h in enumerate(tinggi):
+        if y + h > pdf.page_break_trigger and y > pdf.t_margin + line_height:
+            halaman_baru.add(i)
+            y = pdf.t_margin + line_height
+        y += h
+
+    # 2) Gambar: satu kotak per sel setinggi baris + teks per baris sel
+    potongan = []
+    for i, h in enumerate(tinggi):
+        if i in halaman_baru:
+            pdf.add_page()
+            print_header()
+            potongan.append(pdf.ambil_potongan())
+        x, y = pdf.l_margin, pdf.get_y()
+        for j, lebar in enumerate(col_widths):
+            pdf.rect(x, y, lebar, h)
+            for k, teks in enumerate(sel[j][i]):
+                pdf.set_xy(x, y + k * line_height)
+                pdf.cell(lebar, line_height, teks, align=align[j])
+            x += lebar
+        pdf.set_xy(pdf.l_margin, y + h)
+
+    # Footer
+    pdf.ln(5)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
+
+    potongan.append(pdf.selesai())
+    return b"".join(potongan)
+
+
+def alirkan_pdf_buku_besar(buku_besar):
+    # PDF buku besar semua akun sebagai potongan bytes, akun demi akun: setiap halaman
+    # yang penuh langsung dikirim dan dibuang, jadi memori tidak ikut membesar dengan
+    # jumlah akun / baris transaksi. Keterangan panjang dibungkus, tidak dipotong.
+    pdf = PdfBertahap()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=10)
+
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, txt="Buku Besar Semua Akun", ln=True, align="C")
+    pdf.ln(5)
+
+    col_widths = [22, 58, 35, 35, 40]
+    headers = ["Tanggal", "Keterangan", "Debit (Rp)", "Kredit (Rp)", "Saldo (Rp)"]
+    tinggi_baris = 6
+
+    def print_header():
+        pdf.set_font("Arial", 'B', 10)
+        for i, header in enumerate(headers):
+            pdf.cell(col_widths[i], 8, header, border=1, align="C")
+        pdf.ln()
+        pdf.set_font("Arial", '', 9)
+
+    for akun_no, akun_data in buku_besar.items():
+        # Judul akun
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 8, txt=f"{akun_no} - {akun_data['nama_akun']}", ln=True)
+
+        # Total debit/kredit
+        pdf.set_font("Arial", '', 10)
+        pdf.cell(0, 6, txt=f"Total Debit  : {format_rupiah(akun_data['debit'])}", ln=True)
+        pdf.cell(0, 6, txt=f"Total Kredit : {format_rupiah(akun_data['kredit'])}", ln=True)
+        pdf.ln(2)
+
+        print_header()
+
+        # Isi tabel transaksi; tinggi baris mengikuti jumlah baris keterangan
+        lebar_ket = col_widths[1] - 2 * pdf.c_margin
+        for trx in akun_data.get("transaksi", []):
+            ket = pecah_teks(pdf, trx["keterangan"], lebar_ket)
+            tinggi = tinggi_baris * len(ket)
+            if pdf.get_y() + tinggi > pdf.page_break_trigger:
+                pdf.add_page()
+                print_header()
+            x, y = pdf.get_x(), pdf.get_y()
+
+            pdf.cell(col_widths[0], tinggi, str(trx["tanggal"]), border=1, align="C")
+            pdf.rect(x + col_widths[0], y, col_widths[1], tinggi)
+            for i, teks in enumerate(ket):
+                pdf.set_xy(x + col_widths[0], y + i * tinggi_baris)
+                pdf.cell(col_widths[1], tinggi_baris, teks, align="L")
+            pdf.set_xy(x + col_widths[0] + col_widths[1], y)
+            pdf.cell(col_widths[2], tinggi, format_rupiah(trx["debit"]), border=1, align="R")
+            pdf.cell(col_widths[3], tinggi, format_rupiah(trx["kredit"]), border=1, align="R")
+            pdf.cell(col_widths[4], tinggi, format_rupiah(trx.get("saldo", 0)), border=1, align="R")
+            pdf.ln(tinggi)
+
+            if pdf.ada_halaman_selesai:
+                yield pdf.ambil_potongan()
+
+        pdf.ln(5)  # Jeda antar akun
+
+    # Footer
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
+    yield pdf.selesai()
+
+
+def buat_pdf_buku_besar(buku_besar):
+    return b"".join(alirkan_pdf_buku_besar(buku_besar))
+
+
+def buat_pdf_neraca(df, bulan, tahun):
+    pdf = FPDF()
+    pdf.add_page()
+
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, txt="Neraca Saldo BUMDes", ln=True, align="C")
+    pdf.set_font("Arial", '', 12)
+    pdf.cell(0, 8, txt=f"Periode: {bulan_dict[bulan]} {tahun}", ln=True, align="C")
+    pdf.ln(5)
+
+    pdf.set_font("Arial", 'B', 10)
+    col_widths = [15, 25, 70, 40, 40]
+    headers = ["No", "Ref", "Akun", "Debit (Rp)", "Kredit (Rp)"]
+
+    for i, header in enumerate(headers):
+        pdf.cell(col_widths[i], 10, header, border=1, align="C")
+    pdf.ln()
+
+    pdf.set_font("Arial", '', 9)
+    for idx, row in df.iterrows():
+        pdf.cell(col_widths[0], 8, str(idx), border=1, align="C")
+        pdf.cell(col_widths[1], 8, str(row["Ref"]), border=1, align="C")
+
+        akun = str(row["Akun"])
+        if len(akun) > 35:
+            akun = akun[:32] + "..."
+        pdf.cell(col_widths[2], 8, akun, border=1, align="L")
+
+        debit_val = row["Debit (Rp)"]
+        debit_text = format_rupiah(debit_val) if isinstance(debit_val, numbers.Number) and debit_val != 0 else "-"
+        pdf.cell(col_widths[3], 8, debit_text, border=1, align="R")
+
+        kredit_val = row["Kredit (Rp)"]
+        kredit_text = format_rupiah(kredit_val) if isinstance(kredit_val, numbers.Number) and kredit_val != 0 else "-"
+        pdf.cell(col_widths[4], 8, kredit_text, border=1, align="R")
+
+        pdf.ln()
+
+    pdf.ln(5)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
+
+    return bytes_pdf(pdf)
+
+
+def buat_pdf_labarugi(df, bulan, tahun):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, txt="Laporan Laba/Rugi", ln=True, align="C")
+    pdf.set_font("Arial", '', 12)
+    pdf.cell(0, 8, txt="BUMDes", ln=True, align="C")
+    pdf.cell(0, 8, txt=f"Periode: {bulan_dict[bulan]} {tahun}", ln=True, align="C")
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(90, 10, "Keterangan", border=1, align="C")
+    pdf.cell(45, 10, "Debit (Rp)", border=1, align="C")
+    pdf.cell(45, 10, "Kredit (Rp)", border=1, align="C")
+    pdf.ln()
+    pdf.set_font("Arial", '', 9)
+
+    for idx in range(len(df)):
+        row = df.iloc[idx]
+        is_bold = 'Total' in str(row['Keterangan']) or 'Laba' in str(row['Keterangan']) or 'Rugi' in str(row['Keterangan'])
+        if is_bold:
+            pdf.set_font("Arial", 'B', 9)
+
+        ket = str(row["Keterangan"])[:40] + "..." if len(str(row["Keterangan"])) > 43 else str(row["Keterangan"])
+        pdf.cell(90, 8, ket, border=1, align="L")
+
+        # ✅ FIX: Tampilkan SEMUA nilai (termasuk yang di Total)
+        debit_val = row["Debit"]
+        if isinstance(debit_val, numbers.Number) and debit_val != 0:
+            debit_text = format_rupiah(debit_val)
+        elif pd.notna(debit_val) and str(debit_val).strip() != "":
+            try:
+                debit_text = format_rupiah(debit_val)
+            except:
+                debit_text = ""
+        else:
+            debit_text = ""
+        pdf.cell(45, 8, debit_text, border=1, align="R")
+
+        kredit_val = row["Kredit"]
+        if isinstance(kredit_val, numbers.Number) and kredit_val != 0:
+            kredit_text = format_rupiah(kredit_val)
+        elif pd.notna(kredit_val) and str(kredit_val).strip() != "":
+            try:
+                kredit_text = format_rupiah(kredit_val)
+            except:
+                kredit_text = ""
+        else:
+            kredit_text = ""
+        pdf.cell(45, 8, kredit_text, border=1, align="R")
+
+        pdf.ln()
+
+        if is_bold:
+            pdf.set_font("Arial", '', 9)
+
+    pdf.ln(5)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
+
+    return bytes_pdf(pdf)
+
+
+def buat_pdf_neraca_lap(df, bulan, tahun):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, txt="Laporan Neraca", ln=True, align="C")
+    pdf.set_font("Arial", '', 12)
+    pdf.cell(0, 8, txt="BUMDes", ln=True, align="C")
+    pdf.cell(0, 8, txt=f"Periode: {bulan_dict[bulan]} {tahun}", ln=True, align="C")
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 10)
+
+    col_widths = [60, 30, 60, 30]
+    headers = ["Aktiva", "Jumlah (Rp)", "Passiva", "Jumlah (Rp)"]
+
+    for i, header in enumerate(headers):
+        pdf.cell(col_widths[i], 10, header, border=1, align="C")
+    pdf.ln()
+
+    pdf.set_font("Arial", '', 9)
+    for idx in range(len(df)):
+        row = df.iloc[idx]
+        is_bold = 'Jml' in str(row.get('Aktiva', '')) or 'Jml' in str(row.get('Passiva', ''))
+        if is_bold:
+            pdf.set_font("Arial", 'B', 9)
+
+        # Kolom 1: Aktiva
+        aktiva_text = str(row["Aktiva"])[:28] + "..." if len(str(row["Aktiva"])) > 30 else str(row["Aktiva"])
+        pdf.cell(col_widths[0], 8, aktiva_text, border=1, align="L")
+
+        # Kolom 2: Jumlah Aktiva (✅ FIXED - TAMPILKAN SEMUA)
+        jumlah1_val = row["Jumlah1"]
+        if isinstance(jumlah1_val, numbers.Number) and jumlah1_val != 0:
+            jumlah1_text = format_rupiah(jumlah1_val)
+        elif pd.notna(jumlah1_val) and str(jumlah1_val).strip() != "":
+            try:
+                jumlah1_text = format_rupiah(jumlah1_val)
+            except:
+                jumlah1_text = ""
+        else:
+            jumlah1_text = ""
+        pdf.cell(col_widths[1], 8, jumlah1_text, border=1, align="R")
+
+        # Kolom 3: Passiva
+        passiva_text = str(row["Passiva"])[:28] + "..." if len(str(row["Passiva"])) > 30 else str(row["Passiva"])
+        pdf.cell(col_widths[2], 8, passiva_text, border=1, align="L")
+
+        # Kolom 4: Jumlah Passiva (✅ FIXED - TAMPILKAN SEMUA)
+        jumlah2_val = row["Jumlah2"]
+        if isinstance(jumlah2_val, numbers.Number) and jumlah2_val != 0:
+            jumlah2_text = format_rupiah(jumlah2_val)
+        elif pd.notna(jumlah2_val) and str(jumlah2_val).strip() != "":
+            try:
+                jumlah2_text = format_rupiah(jumlah2_val)
+            except:
+                jumlah2_text = ""
+        else:
+            jumlah2_text = ""
+        pdf.cell(col_widths[3], 8, jumlah2_text, border=1, align="R")
+
+        pdf.ln()
+
+        if is_bold:
+            pdf.set_font("Arial", '', 9)
+
+    pdf.ln(5)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, txt="Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
+
+    return bytes_pdf(pdf)
+
+
+def buat_pdf_ak(df, b, t):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, "Laporan Arus Kas", ln=True, align="C")
+    pdf.set_font("Arial", '', 12)
+    pdf.cell(0, 8, "BUMDes", ln=True, align="C")
+    pdf.cell(0, 8, f"Periode: {bulan_dict[b]} {t}", ln=True, align="C")
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(120, 10, "Aktivitas", border=1, align="C")
+    pdf.cell(60, 10, "Jumlah (Rp)", border=1, align="C")
+    pdf.ln()
+    pdf.set_font("Arial", '', 9)
+    for i in range(len(df)):
+        r = df.iloc[i]
+        is_bold = 'Arus Kas' in str(r['Aktivitas'])
+        if is_bold:
+            pdf.set_font("Arial", 'B', 9)
+        pdf.cell(120, 8, str(r["Aktivitas"])[:47], border=1, align="L")
+        pdf.cell(60, 8, format_rupiah(r["Jumlah"]) if isinstance(r["Jumlah"], numbers.Number) else "", border=1, align="R")
+        pdf.ln()
+        if is_bold:
+            pdf.set_font("Arial", '', 9)
+    pdf.ln(5)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, "Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
+    return bytes_pdf(pdf)
+
+
+# === Laporan komparatif (kolom per periode) ===
+def label_periode(periode):
+    # "2025-03" → "Mar 2025" (judul kolom tabel / PDF komparatif)
+    tahun, bulan = str(periode).split("-")
+    return f"{bulan_dict[bulan][:3]} {tahun}"
+
+
+def buat_pdf_komparatif(df, judul):
+    # Tabel akuntansi.laporan_komparatif → PDF; lebih dari 4 periode dicetak landscape
+    periode = [col for col in df.columns if col != "Keterangan"]
+    landscape = len(periode) > 4
+    pdf = FPDF(orientation="L" if landscape else "P")
+    pdf.add_page()
+    lebar_total = 277 if landscape else 190
+    lebar_ket = 70 if len(periode) <= 8 else 55
+    lebar_nilai = (lebar_total - lebar_ket) / max(len(periode), 1)
+    ukuran = 9 if len(periode) <= 6 else 7
+
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, judul, ln=True, align="C")
+    pdf.set_font("Arial", '', 12)
+    pdf.cell(0, 8, "BUMDes", ln=True, align="C")
+    if periode:
+        pdf.cell(0, 8, f"Periode: {label_periode(periode[0])} s.d. {label_periode(periode[-1])}", ln=True, align="C")
+    pdf.ln(5)
+
+    def header():
+        pdf.set_font("Arial", 'B', ukuran)
+        pdf.cell(lebar_ket, 8, "Keterangan", border=1, align="C")
+        for p in periode:
+            pdf.cell(lebar_nilai, 8, label_periode(p), border=1, align="C")
+        pdf.ln()
+
+    header()
+    for i in range(len(df)):
+        r = df.iloc[i]
+        if pdf.get_y() + 7 > pdf.page_break_trigger:
+            pdf.add_page()
+            header()
+        ket = str(r["Keterangan"])
+        rinci = ket.startswith("  ")
+        pdf.set_font("Arial", '' if rinci else 'B', ukuran)
+        teks = pecah_teks(pdf, ket.strip(), lebar_ket - 6)[0]
+        pdf.cell(lebar_ket, 7, f"    {teks}" if rinci else teks, border=1, align="L")
+        for p in periode:
+            nilai = r[p]
+            pdf.cell(lebar_nilai, 7, format_rupiah(nilai) if isinstance(nilai, numbers.Number) else "", border=1, align="R")
+        pdf.ln()
+    pdf.ln(5)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, "Dicetak dari Sistem Akuntansi BUMDes", ln=True, align="C")
+    return bytes_pdf(pdf)
+
+
+# === Cache PDF berdasarkan hash isi ===
+def hash_frame(df):
+    # Sidik jari isi DataFrame (kolom, index dan nilai), murah dibanding render FPDF
+    h = hashlib.sha1()
+    h.update(repr(list(df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class CachePdf:
+    # LRU berukuran tetap: PDF yang isinya tidak berubah langsung diambil dari cache,
+    # entri paling lama tidak dipakai dibuang saat cache penuh.
+    # pencatat(nama builder, detik, data): dipanggil setiap kali PDF benar-benar dirender
+    def __init__(self, maks_entri=24, pencatat=None):
+        self.maks_entri = maks_entri
+        self.pencatat = pencatat
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def kosongkan(self):
+        with self._lock:
+            self._data.clear()
+
+    def ambil(self, kunci, buat):
+        with self._lock:
+            if kunci in self._data:
+                self._data.move_to_end(kunci)
+                return self._data[kunci]
+        hasil = buat()
+        with self._lock:
+            self._data[kunci] = hasil
+            self._data.move_to_end(kunci)
+            while len(self._data) > self.maks_entri:
+                self._data.popitem(last=False)
+        return hasil
+
+    def pdf_saat_diminta(self, builder, data, *periode, sumber=None):
+        # Callable untuk st.download_button(data=...): PDF baru dirender saat diklik.
+        # Kunci cache = nama builder + hash DataFrame input (`sumber`, default `data`) + periode.
+        def buat_bytes():
+            kunci = (builder.__name__, hash_frame(data if sumber is None else sumber), periode)
+            return self.ambil(kunci, lambda: self._render(builder, data, *periode))
+        return buat_bytes
+
+    def _render(self, builder, data, *periode):
+        mulai = time.perf_counter()
+        hasil = builder(data, *periode)
+        if self.pencatat is not None:
+            self.pencatat(builder.__name__, time.perf_counter() - mulai, data)
+        return hasil
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from jurnal_store import parse_tanggal
+
+# === Filter periode (bulan/tahun) ===
+# Jurnal diurutkan sekali menurut tanggal ter-parse; memilih periode cukup dua
+# binary search pada urutan itu, bukan scan seluruh jurnal.
+
+
+def batas_bulan(bulan, tahun):
+    # [awal, akhir) satu bulan kalender
+    awal = pd.Timestamp(year=int(tahun), month=int(bulan), day=1)
+    return awal, awal + pd.offsets.MonthBegin(1)
+
+
+class IndeksTanggal:
+    def __init__(self, df):
+        if "Tanggal" in df:
+            tgl = parse_tanggal(df["Tanggal"]).to_numpy()
+        else:
+            tgl = np.full(len(df), np.datetime64("NaT"), dtype="datetime64[us]")
+        valid = ~np.isnat(tgl)
+        posisi_valid = np.flatnonzero(valid)
+        urutan = np.argsort(tgl[posisi_valid], kind="stable")
+        self.urutan = posisi_valid[urutan]
+        self.tanggal = tgl[self.urutan]
+        self.jumlah_tanpa_tanggal = int(len(df) - len(posisi_valid))
+
+    def posisi(self, awal, akhir):
+        # Posisi baris dengan awal <= tanggal < akhir, dikembalikan dalam urutan jurnal
+        kiri = np.searchsorted(self.tanggal, np.datetime64(awal, "us"), "left")
+        kanan = np.searchsorted(self.tanggal, np.datetime64(akhir, "us"), "left")
+        return np.sort(self.urutan[kiri:kanan])
+
+    def posisi_bulan(self, bulan, tahun):
+        return self.posisi(*batas_bulan(bulan, tahun))
+
+
+def potong_periode(df, indeks, bulan, tahun):
+    return df.iloc[indeks.posisi_bulan(bulan, tahun)]
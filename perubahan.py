@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from uang import ke_rupiah
+
+# === Perbandingan sel (dipakai Perubahan dan buku_besar.diff_jurnal) ===
+def _sama(a, b):
+    # Perbandingan elemen per elemen, NaN dianggap sama dengan NaN
+    if isinstance(a.dtype, pd.CategoricalDtype) or isinstance(b.dtype, pd.CategoricalDtype):
+        return _sama_kategori(a, b)
+    a = a.array
+    b = b.array
+    if a.dtype != b.dtype:
+        a = a.to_numpy(dtype=object)
+        b = b.to_numpy(dtype=object)
+    sama = pd.array(a == b, dtype="boolean").to_numpy(dtype=bool, na_value=False)
+    return sama | (pd.isna(a) & pd.isna(b))
+
+
+def _sama_kategori(a, b):
+    # Bandingkan lewat kode terhadap kategori salah satu sisi, tanpa konversi ke object
+    if not isinstance(a.dtype, pd.CategoricalDtype):
+        a, b = b, a
+    kategori = a.cat.categories
+    kode_a = a.cat.codes.to_numpy()
+    if isinstance(b.dtype, pd.CategoricalDtype) and b.cat.categories.equals(kategori):
+        kode_b = b.cat.codes.to_numpy()
+    else:
+        kode_b = pd.Categorical(b, categories=kategori).codes
+    # Kode -1 di b bisa berarti NaN atau nilai di luar kategori a
+    kosong_b = pd.isna(b).to_numpy()
+    return (kode_a == kode_b) & ((kode_a >= 0) | kosong_b)
+
+
+def sel_berubah(lama, baru):
+    # Matriks bool (baris x kolom baru) untuk bagian yang sama panjang: True = sel berubah
+    n = min(len(lama), len(baru))
+    if not len(baru.columns):
+        return np.zeros((n, 0), dtype=bool)
+    return np.column_stack([~_sama(lama[col].iloc[:n], baru[col].iloc[:n]) for col in baru.columns])
+
+
+# === Change set hasil edit grid ===
+# AgGrid selalu mengirim balik seluruh isi grid. Isi itu dibandingkan sekali (kolumnar)
+# dengan frame yang dikirim; hasilnya baris ditambah / diubah / dihapus plus sel yang
+# berubah. Konversi tipe, penyalinan dan penulisan database hanya menyentuh sel itu.
+# Baris yang dicentang (seleksi checkbox AgGrid) ikut dibawa untuk hapus massal.
+
+
+def konversi_kolom(kolom, nilai):
+    # Aturan tipe sel grid: (Rp) → rupiah int64 (kosong = 0), Tanggal → teks, id → Int64
+    if "(Rp)" in kolom:
+        return ke_rupiah(nilai)
+    if kolom == "Tanggal":
+        return nilai.astype(str).where(nilai.notna(), "")
+    if kolom == "id":
+        return pd.Series(pd.array(pd.to_numeric(nilai, errors="coerce"), dtype="Int64"), index=nilai.index)
+    return nilai
+
+
+class Perubahan:
+    def __init__(self, lama, baru, dipilih=None):
+        self.lama = lama
+        # Posisi baris yang dicentang di grid (id baris AgGrid = posisi di frame yang dikirim)
+        if dipilih is None or not len(dipilih):
+            self.dipilih = np.array([], dtype=np.int64)
+        else:
+            self.dipilih = np.unique(pd.to_numeric(dipilih.index).to_numpy(dtype=np.int64))
+        baru = pd.DataFrame(baru)
+        if not set(baru.columns) <= set(lama.columns):
+            # Kolom grid berbeda dari yang dikirim: semua baris dianggap baru
+            lama = lama.iloc[:0].reindex(columns=baru.columns)
+        # Baris lama yang masih ada (posisi di `lama`), sejajar dengan awal `baru`. Tanpa id
+        # hanya ekor yang bisa terdeteksi hilang (grid mengirim baris per posisi); dengan
+        # kolom "id" baris yang hilang di tengah dikenali dari id-nya, baris sesudahnya
+        # tidak terbaca sebagai "diubah".
+        self._tetap = None
+        if len(baru) < len(lama) and "id" in lama and "id" in baru:
+            id_lama = konversi_kolom("id", lama["id"])
+            hilang = (id_lama.notna() & ~id_lama.isin(konversi_kolom("id", baru["id"]).dropna())).to_numpy()
+            if hilang[:len(baru)].any():
+                self._tetap = np.flatnonzero(~hilang)
+        tetap = lama if self._tetap is None else lama.iloc[self._tetap]
+        berubah = sel_berubah(tetap, baru)
+        n = berubah.shape[0]
+        self.kolom = list(baru.columns)
+        self.diubah = np.flatnonzero(berubah.any(axis=1))
+        if self._tetap is None:
+            self.dihapus = np.arange(n, len(lama))
+        else:
+            self.dihapus = np.setdiff1d(np.arange(len(lama)), self._tetap[:n])
+            self._tetap = self._tetap[:n]
+        self.ditambah = np.arange(n, len(baru))
+        # {kolom: (posisi baris, nilai baru terkonversi)} hanya untuk sel yang berubah
+        self.sel = {}
+        for j, col in enumerate(self.kolom):
+            posisi = np.flatnonzero(berubah[:, j])
+            if len(posisi):
+                self.sel[col] = (posisi, konversi_kolom(col, baru[col].iloc[posisi]))
+        ekor = baru.iloc[n:]
+        self.baris_baru = pd.DataFrame({col: konversi_kolom(col, ekor[col]) for col in self.kolom})
+
+    def __bool__(self):
+        return bool(len(self.diubah) or len(self.dihapus) or len(self.ditambah))
+
+    def __repr__(self):
+        return (f"Perubahan(diubah={len(self.diubah)}, ditambah={len(self.ditambah)}, "
+                f"dihapus={len(self.dihapus)}, sel={sum(len(p) for p, _ in self.sel.values())})")
+
+    def _id(self, posisi, df):
+        # ID baris: kolom "id" kalau ada (jurnal), selain itu label index
+        ids = df["id"] if "id" in df else df.index.to_series()
+        return ids.iloc[posisi].tolist()
+
+    @property
+    def id_diubah(self):
+        # diubah = posisi di hasil terapkan(); posisi baris asalnya di `lama` bisa bergeser
+        posisi = self.diubah if self._tetap is None else self._tetap[self.diubah]
+        return self._id(posisi, self.lama)
+
+    @property
+    def id_dihapus(self):
+        return self._id(self.dihapus, self.lama)
+
+    def terapkan(self, df=None):
+        # Frame hasil = df (default: frame yang dikirim ke grid) + selisih. Tanpa perubahan
+        # objek yang sama dikembalikan; dengan copy-on-write hanya kolom yang disentuh disalin.
+        df = self.lama if df is None else df
+        if not self:
+            return df
+        if self._tetap is None:
+            hasil = df.iloc[:len(df) - len(self.dihapus)].copy(deep=False)
+        else:
+            hasil = df.iloc[self._tetap].reset_index(drop=True)
+        for col, (posisi, nilai) in self.sel.items():
+            if col not in hasil:
+                hasil[col] = pd.Series([pd.NA] * len(hasil), index=hasil.index)
+            hasil.iloc[posisi, hasil.columns.get_loc(col)] = nilai.to_numpy()
+        if len(self.baris_baru):
+            hasil = pd.concat([hasil, self.baris_baru], ignore_index=True)
+        return hasil
+
+    def hapus_dipilih(self, df):
+        # Buang semua baris yang dicentang sekaligus (satu mask boolean), index diurutkan ulang
+        simpan = np.ones(len(df), dtype=bool)
+        simpan[self.dipilih[self.dipilih < len(df)]] = False
+        return df[simpan].reset_index(drop=True)
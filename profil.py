@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# === Profiling per tahap ===
+# Setiap rerun mengukur tahap-tahap utama (grid AgGrid, sinkron, buku besar, auto-load
+# laporan, Styler, builder PDF): durasi, jumlah baris dan memori DataFrame. Hasilnya
+# disimpan di memori (histogram + sampel untuk panel admin). Ekspor ke file metrik JSON
+# lines (satu baris per tahap) dan histogram format teks Prometheus (<file>.prom) hanya
+# kalau diminta: BUMDES_METRIK diisi, atau mode admin (default metrik.jsonl).
+
+PANEL_ADMIN = os.environ.get("BUMDES_ADMIN", "") not in ("", "0")
+LOKASI_METRIK = os.environ.get("BUMDES_METRIK", "metrik.jsonl" if PANEL_ADMIN else "")  # "" = tidak ditulis ke file
+# File JSONL diputar (→ <file>.1, salinan lama ditimpa) setelah melewati ukuran ini
+MAKS_METRIK_BYTE = int(os.environ.get("BUMDES_METRIK_MAKS_MB", "50")) * 1024 * 1024
+PROM_SETIAP = 15  # file .prom ditulis ulang paling sering sekali per sekian detik
+# Batas atas bucket histogram durasi (detik)
+BUCKET = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SAMPEL_PANEL = 500  # durasi terakhir per tahap yang disimpan untuk persentil di panel
+
+
+def ukuran_frame(df):
+    # (jumlah baris, byte memori) DataFrame; (None, None) untuk objek lain
+    if isinstance(df, pd.DataFrame):
+        return len(df), int(df.memory_usage(index=True).sum())
+    return None, None
+
+
+class Metrik:
+    # Satu per proses: histogram durasi per tahap + sampel terakhir untuk panel admin
+    def __init__(self, lokasi=LOKASI_METRIK):
+        self.lokasi = lokasi
+        self._lock = threading.Lock()
+        self._histogram = {}  # tahap → [hitungan per bucket (+Inf), total detik, jumlah]
+        self._sampel = {}
+        self._prom_terakhir = None  # time.monotonic() penulisan .prom terakhir
+
+    def catat(self, hasil):
+        # hasil: list dict {"tahap", "detik", ...}; ditulis ke JSONL lalu .prom diperbarui
+        # (dibatasi PROM_SETIAP: histogram di memori tetap lengkap untuk penulisan berikutnya)
+        if not hasil:
+            return
+        with self._lock:
+            for r in hasil:
+                h = self._histogram.setdefault(r["tahap"], [[0] * (len(BUCKET) + 1), 0.0, 0])
+                h[0][bisect_left(BUCKET, r["detik"])] += 1
+                h[1] += r["detik"]
+                h[2] += 1
+                self._sampel.setdefault(r["tahap"], deque(maxlen=SAMPEL_PANEL)).append(r["detik"])
+            if self.lokasi:
+                self._putar()
+                with open(self.lokasi, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in hasil)
+                sekarang = time.monotonic()
+                if self._prom_terakhir is None or sekarang - self._prom_terakhir >= PROM_SETIAP:
+                    self._tulis_prometheus()
+                    self._prom_terakhir = sekarang
+
+    def _putar(self):
+        # Rotasi berdasarkan ukuran: file penuh jadi <file>.1, penulisan lanjut ke file baru
+        try:
+            penuh = os.path.getsize(self.lokasi) >= MAKS_METRIK_BYTE
+        except OSError:
+            return
+        if penuh:
+            os.replace(self.lokasi, f"{self.lokasi}.1")
+
+    def catat_satu(self, tahap, detik, df=None, **label):
+        baris, memori = ukuran_frame(df)
+        self.catat([{"waktu": round(time.time(), 3), "tahap": tahap, "detik": round(detik, 6),
+                     "baris": baris, "memori": memori, **label}])
+
+    def prometheus(self):
+        # Histogram kumulatif per tahap dalam format eksposisi teks Prometheus
+        baris = ["# HELP bumdes_tahap_detik Durasi tahap rerun / builder PDF (detik)",
+                 "# TYPE bumdes_tahap_detik histogram"]
+        for tahap, (hitungan, total, jumlah) in sorted(self._histogram.items()):
+            nama = tahap.replace("\\", "\\\\").replace('"', '\\"')
+            kumulatif = np.cumsum(hitungan)
+            for batas, n in zip([*map(str, BUCKET), "+Inf"], kumulatif):
+                baris.append(f'bumdes_tahap_detik_bucket{{tahap="{nama}",le="{batas}"}} {n}')
+            baris.append(f'bumdes_tahap_detik_sum{{tahap="{nama}"}} {total:.6f}')
+            baris.append(f'bumdes_tahap_detik_count{{tahap="{nama}"}} {jumlah}')
+        return "\n".join(baris) + "\n"
+
+    def _tulis_prometheus(self):
+        # Ditulis ke file sementara lalu diganti, jadi scraper tidak membaca file setengah jadi
+        tujuan = Path(self.lokasi).with_suffix(".prom")
+        sementara = tujuan.with_name(tujuan.name + ".tmp")
+        sementara.write_text(self.prometheus(), encoding="utf-8")
+        os.replace(sementara, tujuan)
+
+    def ringkasan(self):
+        # Persentil dari sampel terakhir per tahap (untuk panel admin)
+        with self._lock:
+            sampel = {tahap: np.fromiter(d, dtype=float) for tahap, d in self._sampel.items()}
+        return pd.DataFrame([
+            {"Tahap": tahap, "n": len(d), "p50 (ms)": np.percentile(d, 50) * 1000,
+             "p95 (ms)": np.percentile(d, 95) * 1000, "maks (ms)": d.max() * 1000}
+            for tahap, d in sorted(sampel.items())
+        ], columns=["Tahap", "n", "p50 (ms)", "p95 (ms)", "maks (ms)"])
+
+
+class Profiler:
+    # Pengukuran satu rerun; tahap dikumpulkan lalu dikirim sekali ke Metrik saat selesai
+    def __init__(self, metrik=None, **label):
+        self.metrik = metrik
+        self.label = label
+        self.hasil = []
+        self.terkirim = False
+        self._mulai = time.perf_counter()
+
+    @contextmanager
+    def ukur(self, tahap, df=None):
+        # `with profil.ukur("tahap", df) as catatan:`; catatan["df"] = frame hasil (opsional)
+        catatan = {}
+        mulai = time.perf_counter()
+        try:
+            yield catatan
+        finally:
+            baris, memori = ukuran_frame(catatan.get("df", df))
+            self.hasil.append({"tahap": tahap, "detik": round(time.perf_counter() - mulai, 6),
+                               "baris": baris, "memori": memori})
+
+    def selesai(self, tahap_total="rerun"):
+        # Tambah total rerun (None = tanpa total, mis. rerun terputus) lalu kirim semua
+        # tahap, sekali saja
+        if self.terkirim:
+            return self.hasil
+        self.terkirim = True
+        if tahap_total:
+            self.hasil.append({"tahap": tahap_total, "detik": round(time.perf_counter() - self._mulai, 6),
+                               "baris": None, "memori": None})
+        waktu = round(time.time(), 3)
+        self.hasil = [{"waktu": waktu, **r, **self.label} for r in self.hasil]
+        if self.metrik is not None:
+            self.metrik.catat(self.hasil)
+        return self.hasil
+
+    def tabel(self):
+        return pd.DataFrame(self.hasil, columns=["tahap", "detik", "baris", "memori"]).rename(columns={
+            "tahap": "Tahap", "detik": "Detik", "baris": "Baris", "memori": "Memori (byte)"
+        })
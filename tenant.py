@@ -0,0 +1,35 @@
+import os
+import re
+from pathlib import Path
+
+from jurnal_store import LOKASI_DB
+
+# === Multi-tenant: satu database SQLite per BUMDes ===
+# Tenant bawaan memakai database lama (BUMDES_DB / bumdes.db) supaya instalasi yang
+# sudah ada tetap jalan; BUMDes lain masing-masing punya file <slug>.db di
+# BUMDES_DATA_DIR. Data antar tenant tidak pernah berada di file yang sama.
+
+DIREKTORI_TENANT = os.environ.get("BUMDES_DATA_DIR", "data")
+TENANT_BAWAAN = os.environ.get("BUMDES_TENANT", "bumdes")
+
+
+def slug(nama):
+    # Nama BUMDes → nama file aman ("BUMDes Maju Jaya" → "bumdes_maju_jaya")
+    return re.sub(r"[^a-z0-9]+", "_", str(nama).strip().lower()).strip("_")
+
+
+def lokasi_db(tenant, direktori=DIREKTORI_TENANT):
+    tenant = slug(tenant)
+    if not tenant:
+        raise ValueError("Nama BUMDes tidak boleh kosong")
+    if tenant == slug(TENANT_BAWAAN):
+        return LOKASI_DB
+    Path(direktori).mkdir(parents=True, exist_ok=True)
+    return str(Path(direktori) / f"{tenant}.db")
+
+
+def daftar_tenant(direktori=DIREKTORI_TENANT):
+    # Tenant bawaan selalu ada, sisanya dari file .db di direktori tenant
+    lain = sorted(p.stem for p in Path(direktori).glob("*.db")) if Path(direktori).is_dir() else []
+    bawaan = slug(TENANT_BAWAAN)
+    return [bawaan] + [t for t in lain if t != bawaan]
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Modul aplikasi ada di root repo (bukan paket)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jurnal_store import JurnalStore  # noqa: E402
+
+
+def buat_jurnal_acak(n, seed=0):
+    # Jurnal acak dengan kasus tepi: Ref / Akun kosong, tanggal kosong, nominal tidak terbaca
+    rng = np.random.default_rng(seed)
+    refs = ["101", "102", "201", "301", "401", "501", "", ""]
+    akun = ["Kas", "Piutang", "Utang", "Modal", "Pendapatan", "Beban Gaji", "Kas Kecil", ""]
+    i = rng.integers(0, len(refs), n)
+    j = rng.integers(0, len(akun), n)
+    return pd.DataFrame({
+        "Tanggal": rng.choice(["2025-01-0%d" % d for d in range(1, 10)] + ["", None], n),
+        "Keterangan": rng.choice([" beli ", "jual", "gaji"], n),
+        "Ref": [refs[x] for x in i],
+        "Akun": [akun[x] for x in j],
+        "Debit (Rp)": rng.choice([0, 1001, 2500, -3, "x", None], n),
+        "Kredit (Rp)": rng.choice([0, 700, 1001, "12"], n),
+    })
+
+
+@pytest.fixture
+def jurnal_acak():
+    return buat_jurnal_acak
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JurnalStore(str(tmp_path / "bumdes.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def contoh_jurnal():
+    return pd.DataFrame([
+        {"Tanggal": "2025-01-02", "Keterangan": "Setoran modal", "Ref": "101", "Akun": "Kas", "Debit (Rp)": 5_000_000, "Kredit (Rp)": 0},
+        {"Tanggal": "2025-01-02", "Keterangan": "Setoran modal", "Ref": "301", "Akun": "Modal", "Debit (Rp)": 0, "Kredit (Rp)": 5_000_000},
+        {"Tanggal": "2025-01-05", "Keterangan": "Penjualan", "Ref": "101", "Akun": "Kas", "Debit (Rp)": 750_000, "Kredit (Rp)": 0},
+        {"Tanggal": "2025-01-05", "Keterangan": "Penjualan", "Ref": "401", "Akun": "Pendapatan Usaha", "Debit (Rp)": 0, "Kredit (Rp)": 750_000},
+        {"Tanggal": "2025-02-07", "Keterangan": "Bayar gaji", "Ref": "501", "Akun": "Beban Gaji", "Debit (Rp)": 200_000, "Kredit (Rp)": 0},
+        {"Tanggal": "2025-02-07", "Keterangan": "Bayar gaji", "Ref": "101", "Akun": "Kas", "Debit (Rp)": 0, "Kredit (Rp)": 200_000},
+    ])
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from buku_besar import diff_jurnal, frame_transaksi, perbarui_buku_besar, posting_jurnal
+
+
+def sama_dengan_posting_ulang(bb, df):
+    # Buku besar inkremental harus identik dengan posting_jurnal dari nol, termasuk urutan akun
+    penuh = posting_jurnal(df, bb.saldo_normal)
+    assert list(bb) == list(penuh)
+    for key, data in penuh.items():
+        for kolom in ["nama_akun", "debit", "kredit", "saldo_normal"]:
+            assert bb[key][kolom] == data[kolom], (key, kolom)
+        assert list(bb[key]["transaksi"]) == list(data["transaksi"]), key
+        pd.testing.assert_frame_equal(
+            frame_transaksi(bb[key]["transaksi"]).astype(object),
+            frame_transaksi(data["transaksi"]).astype(object),
+        )
+    assert (bb.total_debit, bb.total_kredit, bb.jumlah_posting) == (penuh.total_debit, penuh.total_kredit, penuh.jumlah_posting)
+
+
+def langkah_acak(df, rng, jurnal_acak, pakai_id, id_berikut):
+    # Satu edit grid acak: ubah sel, tambah baris, hapus baris, ganti akun beberapa baris
+    baru = df.copy()
+    kolom_isi = [c for c in baru.columns if c != "id"]
+    op = rng.integers(0, 4)
+    if op == 0 and len(baru):
+        i = rng.integers(0, len(baru))
+        kolom = rng.choice(kolom_isi)
+        baru.iloc[i, baru.columns.get_loc(kolom)] = jurnal_acak(1, int(rng.integers(0, 1000))).iloc[0][kolom]
+    elif op == 1:
+        tambah = jurnal_acak(int(rng.integers(1, 3)), int(rng.integers(0, 1000)))
+        if pakai_id:
+            tambah.insert(0, "id", pd.array(range(id_berikut, id_berikut + len(tambah)), dtype="Int64"))
+        baru = pd.concat([baru, tambah], ignore_index=True)
+    elif op == 2 and len(baru) > 1:
+        # Tanpa id hanya ekor yang bisa dihapus (grid); dengan id baris mana pun
+        jumlah = int(rng.integers(1, 3))
+        buang = rng.choice(len(baru), jumlah, replace=False) if pakai_id else np.arange(len(baru) - 1, len(baru))
+        baru = baru.drop(baru.index[buang]).reset_index(drop=True)
+    else:
+        for _ in range(3):
+            if len(baru):
+                i = rng.integers(0, len(baru))
+                baru.iloc[i, baru.columns.get_loc("Ref")] = rng.choice(["101", "401", "", "999"])
+                baru.iloc[i, baru.columns.get_loc("Akun")] = rng.choice(["Kas", "Pendapatan Jasa", ""])
+    return baru
+
+
+@pytest.mark.parametrize("pakai_id", [False, True])
+def test_perbarui_sama_dengan_posting_ulang(jurnal_acak, pakai_id):
+    rng = np.random.default_rng(11)
+    for percobaan in range(8):
+        df = jurnal_acak(int(rng.integers(1, 30)), percobaan)
+        if pakai_id:
+            df.insert(0, "id", pd.array(np.arange(1, len(df) + 1) * 2, dtype="Int64"))
+        id_berikut = 1000
+        bb = posting_jurnal(df)
+        for _ in range(12):
+            baru = langkah_acak(df, rng, jurnal_acak, pakai_id, id_berikut)
+            id_berikut += 10
+            bb = perbarui_buku_besar(bb, df, baru)
+            sama_dengan_posting_ulang(bb, baru)
+            df = baru
+
+
+def test_hapus_baris_tengah_hanya_membalik_baris_itu(contoh_jurnal):
+    df = contoh_jurnal.assign(id=pd.array([10, 11, 12, 13, 14, 15], dtype="Int64"))
+    baru = df.drop(df.index[2]).reset_index(drop=True)
+    dibalik, diposting, peta = diff_jurnal(df, baru)
+    assert dibalik.tolist() == [2]
+    assert diposting.tolist() == []
+    assert peta.tolist() == [0, 1, -1, 2, 3, 4]
+
+    bb = posting_jurnal(df)
+    hasil = perbarui_buku_besar(bb, df, baru)
+    assert hasil is bb
+    sama_dengan_posting_ulang(hasil, baru)
+
+
+def test_akun_baru_disisipkan_menurut_urutan_posting(contoh_jurnal):
+    # Baris akun baru dengan id di tengah: urutan akun mengikuti baris pertamanya di jurnal
+    df = contoh_jurnal.assign(id=pd.array([10, 20, 30, 40, 50, 60], dtype="Int64"))
+    sisip = pd.DataFrame([{"id": 25, "Tanggal": "2025-01-03", "Keterangan": "Beli alat", "Ref": "121",
+                           "Akun": "Peralatan", "Debit (Rp)": 300_000, "Kredit (Rp)": 0}])
+    baru = pd.concat([df.iloc[:2], sisip, df.iloc[2:]], ignore_index=True)
+    baru["id"] = baru["id"].astype("Int64")
+    bb = perbarui_buku_besar(posting_jurnal(df), df, baru)
+    assert list(bb) == ["101", "301", "121", "401", "501"]
+    sama_dengan_posting_ulang(bb, baru)
+
+
+def test_signature_tidak_dipakai_ulang_setelah_objek_dibuang(contoh_jurnal):
+    # id() objek yang sudah dibuang bisa dipakai lagi; nomor generasi tidak
+    lama = posting_jurnal(contoh_jurnal).signature()
+    assert posting_jurnal(contoh_jurnal).signature() != lama
@@ -0,0 +1,47 @@
+import csv
+import io
+
+import pytest
+
+from impor_jurnal import impor_jurnal
+
+# Voucher B2 (3 baris) dan B3 (tidak seimbang) sengaja melintasi batas potongan
+BARIS = [
+    ("B1", "02/01/2025", "Setoran modal", "101", "Kas", "5.000.000", ""),
+    ("B1", "02/01/2025", "Setoran modal", "301", "Modal", "", "5.000.000"),
+    ("B2", "05/01/2025", "Penjualan", "101", "Kas", "750.000", ""),
+    ("B2", "05/01/2025", "Penjualan", "401", "Pendapatan Usaha", "", "500.000"),
+    ("B2", "05/01/2025", "Penjualan", "402", "Pendapatan Lain", "", "250.000"),
+    ("B3", "07/01/2025", "Bayar gaji", "501", "Beban Gaji", "200.000", ""),
+    ("B3", "07/01/2025", "Bayar gaji", "101", "Kas", "", "150.000"),
+    ("B4", "09/01/2025", "Beli alat", "121", "Peralatan", "300.000", ""),
+    ("B4", "09/01/2025", "Beli alat", "201", "Utang Usaha", "", "300.000"),
+]
+
+
+def tulis_csv(path, dengan_bukti=True):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        penulis = csv.writer(f)
+        header = ["No Bukti", "Tanggal", "Keterangan", "Ref", "Akun", "Debit", "Kredit"]
+        penulis.writerow(header if dengan_bukti else header[1:])
+        for baris in BARIS:
+            penulis.writerow(baris if dengan_bukti else baris[1:])
+
+
+@pytest.mark.parametrize("dengan_bukti", [True, False])
+@pytest.mark.parametrize("ukuran", [1, 2, 3, 4, 100])
+def test_voucher_terbawa_lintas_potongan(store, tmp_path, dengan_bukti, ukuran):
+    path = tmp_path / "jurnal.csv"
+    tulis_csv(path, dengan_bukti)
+    tolak = io.StringIO()
+    hasil = impor_jurnal(store, str(path), tolak, ukuran=ukuran)
+
+    # Hasil tidak bergantung pada ukuran potongan: B1, B2, B4 utuh, B3 ditolak utuh
+    assert (hasil.dibaca, hasil.diterima, hasil.ditolak, hasil.voucher_ditolak) == (9, 7, 2, 1)
+    jurnal = store.muat()
+    assert jurnal["Keterangan"].tolist() == ["Setoran modal"] * 2 + ["Penjualan"] * 3 + ["Beli alat"] * 2
+    assert int(jurnal["Debit (Rp)"].sum()) == int(jurnal["Kredit (Rp)"].sum()) == 6_050_000
+
+    laporan = list(csv.reader(io.StringIO(tolak.getvalue())))[1:]
+    assert [baris[0] for baris in laporan] == ["7", "8"]
+    assert {baris[-1] for baris in laporan} == {"voucher tidak seimbang (debit ≠ kredit)"}
@@ -0,0 +1,269 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import jurnal_store
+from jurnal_store import KOLOM_JURNAL, VERSI_SKEMA, JurnalStore, PeriodeTerkunci
+
+
+def isi_tabel_jurnal(store):
+    with store._lock:
+        df = pd.read_sql_query(f"SELECT {jurnal_store.KOLOM_TABEL} FROM jurnal ORDER BY id", store._conn)
+    return df
+
+
+# === Log perubahan & rekonstruksi ===
+def test_rekonstruksi_sama_dengan_tabel_jurnal(store, contoh_jurnal, monkeypatch):
+    # Checkpoint kecil supaya rekonstruksi memakai checkpoint + ekor log sekaligus
+    monkeypatch.setattr(jurnal_store, "CHECKPOINT_SETIAP", 4)
+    ids = store.tulis(tambah=contoh_jurnal)
+    ubah = store.muat().iloc[[1, 3]].assign(**{"Keterangan": "koreksi"})
+    store.tulis(ubah=ubah, hapus=[ids[0]])
+    store.tulis(tambah=contoh_jurnal.iloc[:2])
+    store.tulis(hapus=[ids[-1]])
+    # Checkpoint berjalan di thread latar sesudah commit, bukan di dalam tulis()
+    store._thread_checkpoint.join()
+    with store._lock:
+        seq, baris = store._conn.execute("SELECT seq, baris FROM checkpoint_log").fetchone()
+    assert seq > 0 and baris > 0
+
+    pd.testing.assert_frame_equal(store.rekonstruksi(), isi_tabel_jurnal(store), check_dtype=False)
+
+
+def test_pulihkan_menulis_ulang_jurnal_dari_log(store, contoh_jurnal):
+    store.tulis(tambah=contoh_jurnal)
+    sebelum = isi_tabel_jurnal(store)
+    with store._lock, store._conn:
+        store._conn.execute("DELETE FROM jurnal WHERE id > 2")
+    assert not store.periksa()
+    assert store.pulihkan(oleh="admin") == len(contoh_jurnal)
+    pd.testing.assert_frame_equal(isi_tabel_jurnal(store), sebelum)
+    assert store.periksa()
+    with store._lock:
+        oleh, sumber = store._conn.execute("SELECT oleh, sumber FROM log_batch ORDER BY id DESC").fetchone()
+    assert (oleh, sumber) == ("admin", f"pulihkan ({len(contoh_jurnal)} baris)")
+
+
+def test_jurnal_rusak_dipulihkan_saat_dibuka(tmp_path, contoh_jurnal):
+    lokasi = str(tmp_path / "bumdes.db")
+    store = JurnalStore(lokasi)
+    ids = store.tulis(tambah=contoh_jurnal)
+    store.tulis(ubah=store.muat().iloc[[0]].assign(**{"Debit (Rp)": 123}))
+    sebelum = isi_tabel_jurnal(store)
+    store.close()
+    # Perubahan di luar aplikasi (tanpa log) = tabel jurnal tidak sesuai log
+    conn = sqlite3.connect(lokasi)
+    conn.execute("UPDATE jurnal SET debit = debit + 1 WHERE id = ?", (ids[2],))
+    conn.commit()
+    conn.close()
+
+    store = JurnalStore(lokasi)
+    try:
+        pd.testing.assert_frame_equal(isi_tabel_jurnal(store), sebelum)
+        with store._lock:
+            oleh, sumber = store._conn.execute("SELECT oleh, sumber FROM log_batch ORDER BY id DESC").fetchone()
+        assert oleh == "sistem" and sumber.startswith("pulihkan otomatis")
+        kubus = store.kubus(["2025-01", "2025-02"])
+        assert int(kubus["Debit (Rp)"].sum()) == int(sebelum["debit"].sum())
+    finally:
+        store.close()
+
+
+def test_sinkron_hapus_baris_tengah_menurut_id(store, contoh_jurnal):
+    store.tulis(tambah=contoh_jurnal)
+    lama = store.muat()
+    baru = lama.drop(lama.index[[1, 3]]).reset_index(drop=True)
+    baru.loc[2, "Keterangan"] = "koreksi"
+    hasil = store.sinkron(lama, baru)
+
+    # Hanya dua baris itu yang dihapus; baris sesudahnya tidak terbaca sebagai "diubah"
+    assert hasil["id"].tolist() == baru["id"].tolist()
+    riwayat = store.riwayat()
+    assert sorted(zip(riwayat["Aksi"][:3], riwayat["id"][:3])) == [
+        ("hapus", lama["id"][1]), ("hapus", lama["id"][3]), ("ubah", baru["id"][2]),
+    ]
+    assert len(riwayat) == len(contoh_jurnal) + 3
+    pd.testing.assert_frame_equal(store.muat()[KOLOM_JURNAL], hasil[KOLOM_JURNAL], check_dtype=False,
+                                  check_categorical=False)
+
+
+def test_id_tidak_dipakai_ulang_setelah_baris_terakhir_dihapus(store, contoh_jurnal):
+    ids = store.tulis(tambah=contoh_jurnal)
+    store.tulis(hapus=ids[-2:])
+    baru = store.tulis(tambah=contoh_jurnal.iloc[:1])
+    assert baru == [ids[-1] + 1]
+
+
+# === Tutup buku ===
+def test_tulis_ditolak_di_periode_tertutup(store, contoh_jurnal):
+    ids = store.tulis(tambah=contoh_jurnal)
+    store.tutup_periode("2025-01")
+    sebelum = isi_tabel_jurnal(store)
+
+    januari = contoh_jurnal.iloc[:1]
+    with pytest.raises(PeriodeTerkunci):
+        store.tulis(tambah=januari)
+    with pytest.raises(PeriodeTerkunci):
+        store.tulis(hapus=[ids[0]])
+    # Baris Februari dipindah ke Januari: tanggal baru jatuh di periode tertutup
+    pindah = store.muat().iloc[[4]].assign(Tanggal="2025-01-31")
+    with pytest.raises(PeriodeTerkunci):
+        store.tulis(ubah=pindah)
+    pd.testing.assert_frame_equal(isi_tabel_jurnal(store), sebelum)
+
+    # Periode sesudahnya dan baris tanpa tanggal tetap boleh
+    store.tulis(tambah=contoh_jurnal.iloc[4:].assign(Tanggal="2025-03-01"))
+    store.tulis(tambah=contoh_jurnal.iloc[:1].assign(Tanggal=""))
+    store.buka_periode("2025-01")
+    store.tulis(hapus=[ids[0]])
+
+
+def test_tutup_dan_buka_periode_tercatat(store, contoh_jurnal):
+    store.tulis(tambah=contoh_jurnal)
+    store.tutup_periode("2025-02", oleh="bendahara")
+    store.buka_periode("2025-02", oleh="admin")
+    # Membuka periode yang tidak ditutup tidak meninggalkan jejak palsu
+    store.buka_periode("2025-02", oleh="admin")
+    riwayat = store.riwayat_periode()
+    assert riwayat[["Oleh", "Aksi", "Periode"]].values.tolist() == [
+        ["admin", "buka", "2025-02"], ["bendahara", "tutup", "2025-02"],
+    ]
+    with pytest.raises(sqlite3.IntegrityError):
+        with store._conn:
+            store._conn.execute("DELETE FROM log_periode")
+
+
+def test_bulan_berjalan_tidak_bisa_ditutup(store):
+    with pytest.raises(ValueError):
+        store.tutup_periode(pd.Timestamp.today().strftime("%Y-%m"))
+    assert store.periode_tutup() is None
+
+
+# === Migrasi skema ===
+JURNAL_V1 = [
+    (1, "02/01/2025", "2025-01-02", "Setoran modal", "101", "Kas", 5000000.0, 0.0),
+    (2, "02/01/2025", "2025-01-02", "Setoran modal", "301", "Modal", 0.0, 5000000.0),
+    (3, "05/01/2025", "2025-01-05", "Penjualan", "101", "Kas", 750000.4, 0.0),
+    (4, "05/01/2025", "2025-01-05", "Penjualan", "401", "Pendapatan Usaha", 0.0, 750000.4),
+    (5, "", None, "Tanpa tanggal", "", "", 0.0, 0.0),
+]
+
+
+def buat_db_v1(lokasi):
+    conn = sqlite3.connect(lokasi)
+    conn.executescript("""
+    CREATE TABLE jurnal (
+        id INTEGER PRIMARY KEY, tanggal TEXT NOT NULL DEFAULT '', tgl TEXT,
+        keterangan TEXT NOT NULL DEFAULT '', ref TEXT NOT NULL DEFAULT '', akun TEXT NOT NULL DEFAULT '',
+        debit REAL NOT NULL DEFAULT 0, kredit REAL NOT NULL DEFAULT 0
+    );
+    CREATE INDEX idx_jurnal_tgl ON jurnal(tgl);
+    CREATE INDEX idx_jurnal_ref ON jurnal(ref);
+    CREATE INDEX idx_jurnal_akun ON jurnal(akun);
+    PRAGMA user_version=1;
+    """)
+    conn.executemany("INSERT INTO jurnal VALUES (?, ?, ?, ?, ?, ?, ?, ?)", JURNAL_V1)
+    conn.commit()
+    conn.close()
+
+
+def buat_db_v2(lokasi):
+    # Skema 2: bagan akun sudah terpisah, debit/kredit masih REAL
+    conn = sqlite3.connect(lokasi)
+    conn.executescript("""
+    CREATE TABLE akun (
+        id INTEGER PRIMARY KEY, ref TEXT NOT NULL DEFAULT '', nama TEXT NOT NULL DEFAULT '',
+        jenis TEXT, saldo_normal TEXT NOT NULL DEFAULT 'debit', UNIQUE (ref, nama)
+    );
+    CREATE TABLE jurnal (
+        id INTEGER PRIMARY KEY, tanggal TEXT NOT NULL DEFAULT '', tgl TEXT,
+        keterangan TEXT NOT NULL DEFAULT '', akun_id INTEGER REFERENCES akun(id),
+        debit REAL NOT NULL DEFAULT 0, kredit REAL NOT NULL DEFAULT 0
+    );
+    CREATE INDEX idx_jurnal_tgl ON jurnal(tgl);
+    CREATE INDEX idx_jurnal_akun ON jurnal(akun_id);
+    PRAGMA user_version=2;
+    """)
+    akun = {}
+    for _, _, _, _, ref, nama, _, _ in JURNAL_V1:
+        if (ref or nama) and (ref, nama) not in akun:
+            akun[(ref, nama)] = len(akun) + 1
+            conn.execute("INSERT INTO akun (id, ref, nama) VALUES (?, ?, ?)", (akun[(ref, nama)], ref, nama))
+    conn.executemany(
+        "INSERT INTO jurnal VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(i, t, tgl, ket, akun.get((ref, nama)), d, k) for i, t, tgl, ket, ref, nama, d, k in JURNAL_V1],
+    )
+    conn.commit()
+    conn.close()
+
+
+def buat_db_v6(lokasi):
+    # Skema 6 = skema sekarang tanpa penghitung id jurnal
+    store = JurnalStore(lokasi)
+    store.tulis(tambah=pd.DataFrame(
+        [{"Tanggal": t, "Keterangan": ket, "Ref": ref, "Akun": nama, "Debit (Rp)": d, "Kredit (Rp)": k}
+         for _, t, _, ket, ref, nama, d, k in JURNAL_V1[:4]]
+    ))
+    store.close()
+    conn = sqlite3.connect(lokasi)
+    conn.executescript("DROP TABLE id_jurnal; PRAGMA user_version=6;")
+    conn.close()
+
+
+@pytest.mark.parametrize("buat_db, id_berikut", [(buat_db_v1, 6), (buat_db_v2, 6), (buat_db_v6, 5)])
+def test_migrasi_ke_skema_terbaru(tmp_path, buat_db, id_berikut):
+    lokasi = str(tmp_path / "lama.db")
+    buat_db(lokasi)
+    store = JurnalStore(lokasi)
+    try:
+        with store._lock:
+            versi = store._conn.execute("PRAGMA user_version").fetchone()[0]
+            tipe = {r[1]: r[2] for r in store._conn.execute("PRAGMA table_info(jurnal)")}
+        assert versi == VERSI_SKEMA
+        assert tipe["debit"] == tipe["kredit"] == "INTEGER"
+
+        df = store.muat()
+        bertanggal = [baris for baris in JURNAL_V1 if baris[2]]
+        assert df["id"].tolist()[:len(bertanggal)] == [baris[0] for baris in bertanggal]
+        assert df[KOLOM_JURNAL[2:4]].iloc[:4].astype(str).values.tolist() == [[b[4], b[5]] for b in JURNAL_V1[:4]]
+        assert df["Debit (Rp)"].iloc[:4].tolist() == [5_000_000, 0, 750_000, 0]
+
+        # Jenis akun hasil migrasi terisi; kubus periode & checkpoint dibangun
+        assert store.bagan_akun().saldo_ref["401"] == "kredit"
+        kubus = store.kubus(["2025-01"])
+        assert int(kubus["Debit (Rp)"].sum()) == int(kubus["Kredit (Rp)"].sum()) == 5_750_000
+        pd.testing.assert_frame_equal(store.rekonstruksi(), isi_tabel_jurnal(store), check_dtype=False)
+
+        # Id baru melanjutkan id lama
+        assert store.tulis(tambah=df[KOLOM_JURNAL].iloc[:1]) == [id_berikut]
+    finally:
+        store.close()
+
+
+def test_baca_saja_tidak_memigrasi(tmp_path):
+    lokasi = str(tmp_path / "lama.db")
+    buat_db_v1(lokasi)
+    with pytest.raises(ValueError):
+        JurnalStore(lokasi, baca_saja=True)
+    conn = sqlite3.connect(lokasi)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    conn.close()
+
+
+def test_migrasi_v6_penghitung_id_dari_log(tmp_path, contoh_jurnal):
+    # Baris terakhir sudah dihapus sebelum migrasi: id-nya hanya tersisa di log
+    lokasi = str(tmp_path / "lama.db")
+    store = JurnalStore(lokasi)
+    ids = store.tulis(tambah=contoh_jurnal)
+    store.tulis(hapus=ids[-1:])
+    store.close()
+    conn = sqlite3.connect(lokasi)
+    conn.executescript("DROP TABLE id_jurnal; PRAGMA user_version=6;")
+    conn.close()
+
+    store = JurnalStore(lokasi)
+    try:
+        assert store.tulis(tambah=contoh_jurnal.iloc[:1]) == [ids[-1] + 1]
+    finally:
+        store.close()
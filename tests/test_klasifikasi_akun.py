@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from klasifikasi_akun import kategori_akun, klasifikasi_neraca
+
+
+def kategori_elif(nama_akun):
+    # Rantai elif lama dari Tab 4 (sebelum klasifikasi_akun), per baris
+    nama_akun = str(nama_akun).lower()
+    if "pendapatan" in nama_akun or "penjualan" in nama_akun or "penerimaan" in nama_akun:
+        return "pendapatan"
+    elif "beban" in nama_akun or "biaya" in nama_akun or "gaji" in nama_akun or "sewa" in nama_akun or "pembayaran" in nama_akun:
+        return "beban"
+    elif "kas" in nama_akun or "perlengkapan" in nama_akun or "piutang" in nama_akun:
+        return "aktiva_lancar"
+    elif "peralatan" in nama_akun or "gedung" in nama_akun or "kendaraan" in nama_akun:
+        return "aktiva_tetap"
+    elif "modal" in nama_akun:
+        return "modal"
+    elif "hutang" in nama_akun or "utang" in nama_akun:
+        return "kewajiban"
+    return ""
+
+
+def kategori(akun, ref=None):
+    # Tanpa kategori ("" di rantai elif) = NA di hasil vektor
+    return kategori_akun(akun, ref).fillna("").tolist()
+
+
+NAMA_AKUN = [
+    "Kas", "Kas Kecil", "Piutang Usaha", "Perlengkapan Kantor", "Peralatan", "Gedung", "Kendaraan",
+    "Modal Awal", "Prive", "Utang Usaha", "Hutang Bank", "Pendapatan Jasa", "Penjualan", "Penerimaan Hibah",
+    "Beban Gaji", "Biaya Listrik", "Sewa Kantor", "Pembayaran Utang", "Gaji Kasir", "Pendapatan Sewa",
+    "Utang Gaji", "Beban Kas Kecil", "Modal Kendaraan", "KAS BANK", "lain-lain", "", "Akumulasi",
+]
+
+
+def test_kategori_sama_dengan_rantai_elif():
+    rng = np.random.default_rng(5)
+    # Nama tunggal plus gabungan dua nama supaya beberapa aturan cocok sekaligus
+    gabungan = [f"{a} {b}" for a, b in zip(rng.choice(NAMA_AKUN, 300), rng.choice(NAMA_AKUN, 300))]
+    akun = pd.Series(NAMA_AKUN + gabungan)
+    assert kategori(akun) == [kategori_elif(nama) for nama in akun]
+
+
+def test_ref_hanya_cadangan_kalau_nama_tidak_cocok():
+    akun = pd.Series(["Kas", "Titipan Anggota", "Komisi", "Ongkos Kirim", "Prive", "Simpanan"])
+    ref = pd.Series(["401", "211", "402", "512", "302", "111"])
+    assert kategori(akun, ref) == ["aktiva_lancar", "kewajiban", "pendapatan", "beban", "", ""]
+
+
+def test_tabel_laporan_sama_dengan_loop_lama():
+    neraca = pd.DataFrame({
+        "Ref": ["101", "121", "201", "301", "401", "501", "502", "302"],
+        "Akun": ["Kas", "Peralatan", "Utang Usaha", "Modal", "Pendapatan Usaha", "Beban Gaji", "Sewa", "Modal Tambahan"],
+        "Debit (Rp)": [4_000_000, 300_000, 0, 0, 0, 200_000, 50_000, 0],
+        "Kredit (Rp)": [0, 0, 300_000, 5_000_000, 750_000, 0, 0, 1_000_000],
+    })
+    hasil = klasifikasi_neraca(neraca)
+    assert hasil["pendapatan"]["Jenis Pendapatan"].tolist() == ["", "Pendapatan Usaha"]
+    assert hasil["beban"]["Jenis Beban"].tolist() == ["", "Beban Gaji", "Sewa"]
+    assert hasil["aktiva_lancar"]["Jumlah (Rp)"].tolist() == [0, 4_000_000]
+    assert hasil["aktiva_tetap"]["Item"].tolist() == ["", "Peralatan"]
+    assert hasil["kewajiban"]["Jumlah (Rp)"].tolist() == [0, 300_000]
+    # Loop lama menimpa modal_awal dengan akun modal terakhir
+    assert hasil["modal_data"] == {"modal_awal": 1_000_000}
+    assert hasil["arus_kas_operasi"]["Jumlah (Rp)"].tolist() == [0, 750_000, -200_000, -50_000]
+    assert hasil["arus_kas_investasi"]["Aktivitas"].tolist() == ["", "Pembelian Peralatan"]
+    assert hasil["arus_kas_pendanaan"]["Jumlah (Rp)"].tolist() == [0, 5_000_000, 1_000_000]
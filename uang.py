@@ -0,0 +1,45 @@
+import numbers
+
+import numpy as np
+import pandas as pd
+
+# === Nominal uang: rupiah bulat (int64) ===
+# Semua nominal (input grid, impor, database, buku besar, laporan) disimpan sebagai
+# bilangan bulat rupiah, jadi penjumlahan selalu eksak dan neraca seimbang tanpa
+# toleransi. Pecahan dibulatkan ke rupiah terdekat (setengah menjauhi nol) sekali saat
+# nilai masuk. Format tampilan (titik ribuan) hanya di tepi render: format_rupiah,
+# valueFormatter AgGrid dan builder PDF.
+
+RUPIAH = np.int64
+
+
+def _bulatkan(angka):
+    # Pembulatan setengah menjauhi nol (np.rint membulatkan ke genap: 0,5 → 0)
+    return np.sign(angka) * np.floor(np.abs(angka) + 0.5)
+
+
+def ke_rupiah(nilai):
+    # Series / array / skalar → rupiah int64; kosong atau tidak terbaca = 0
+    if isinstance(nilai, pd.Series):
+        if nilai.dtype == RUPIAH:
+            return nilai
+        if pd.api.types.is_integer_dtype(nilai.dtype):
+            return nilai.fillna(0).astype(RUPIAH)
+        angka = pd.to_numeric(nilai, errors="coerce").astype(float).fillna(0.0)
+        return pd.Series(_bulatkan(angka.to_numpy()).astype(RUPIAH), index=nilai.index, name=nilai.name)
+    if isinstance(nilai, np.ndarray):
+        if nilai.dtype == RUPIAH:
+            return nilai
+        return ke_rupiah(pd.Series(nilai)).to_numpy()
+    if isinstance(nilai, numbers.Integral):
+        return int(nilai)
+    try:
+        angka = float(nilai)
+    except (TypeError, ValueError):
+        return 0
+    return 0 if not np.isfinite(angka) else int(_bulatkan(angka))
+
+
+def kolom_rupiah(df):
+    # Kolom nominal sebuah tabel (nama berakhiran "(Rp)")
+    return [col for col in df.columns if "(Rp)" in str(col)]